@@ -0,0 +1,262 @@
+"""Benchmark of the upload HTTP client settings against a local stand-in
+for S3.
+
+The stand-in server runs in a background thread, accepts multipart POST
+uploads over HTTP/1.1 with keep-alive, and responds after a fixed latency
+that simulates the round trip to S3. Each configuration uploads the same
+set of small files, as ``ltd upload`` does, and the throughput is printed
+for each::
+
+    python benchmarks/upload_client.py --files 2000 --concurrency 64
+
+The configurations are httpx's default connection limits, the limits of
+`ltdconveyor.services.httpclient.HTTPClientSettings`, and, if uvloop is
+installed, the same limits on uvloop's event loop. The stand-in server only
+speaks HTTP/1.1; to include HTTP/2, pass the ``--http2-url`` of a server
+that accepts POST requests over HTTP/2 with TLS (such as hypercorn) and
+install ``httpx[http2]``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import httpx
+
+from ltdconveyor.s3.formdata import MultipartFileEncoder
+from ltdconveyor.services.concurrency import run_workers
+from ltdconveyor.services.httpclient import HTTPClientSettings
+
+
+class StandInServer:
+    """A minimal HTTP/1.1 server that accepts uploads after a delay."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.port = 0
+        self.connections = 0
+        self._ready = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/upload"
+
+    def start(self) -> None:
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self) -> None:
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join()
+
+    def _run(self) -> None:
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(
+            self._handle, "127.0.0.1", 0, backlog=1024
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await self._stop.wait()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                await reader.readexactly(length)
+                await asyncio.sleep(self.latency)
+                writer.write(
+                    b"HTTP/1.1 204 No Content\r\n"
+                    b"Connection: keep-alive\r\n\r\n"
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def create_files(directory: Path, count: int, size: int) -> List[Path]:
+    """Create the files to upload."""
+    paths = []
+    for i in range(count):
+        path = directory / f"page{i}.html"
+        path.write_bytes(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+async def upload_files(
+    client: httpx.AsyncClient,
+    url: str,
+    paths: List[Path],
+    concurrency: int,
+) -> float:
+    """Upload files like ``ProjectService`` does, and return the elapsed
+    time in seconds.
+    """
+
+    async def upload(path: Path) -> None:
+        body = MultipartFileEncoder({"key": path.name}, path)
+        r = await client.post(
+            url,
+            content=body.aiter_body(),
+            headers={
+                "Content-Type": body.content_type,
+                "Content-Length": str(len(body)),
+            },
+        )
+        r.raise_for_status()
+
+    start = time.perf_counter()
+    await run_workers(paths, upload, max_concurrency=concurrency)
+    return time.perf_counter() - start
+
+
+def run_configuration(
+    create_client: Callable[[], httpx.AsyncClient],
+    url: str,
+    paths: List[Path],
+    concurrency: int,
+    *,
+    use_uvloop: bool = False,
+) -> float:
+    async def run() -> float:
+        async with create_client() as client:
+            return await upload_files(client, url, paths, concurrency)
+
+    if use_uvloop:
+        import uvloop  # type: ignore[import]
+
+        policy = asyncio.get_event_loop_policy()
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        try:
+            return asyncio.run(run())
+        finally:
+            asyncio.set_event_loop_policy(policy)
+    return asyncio.run(run())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=16 * 1024)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="Response latency of the stand-in server, in seconds.",
+    )
+    parser.add_argument(
+        "--http2-url",
+        default=None,
+        help="URL of a server that accepts uploads over HTTP/2.",
+    )
+    args = parser.parse_args()
+
+    settings = HTTPClientSettings()
+    server = StandInServer(args.latency)
+    server.start()
+    try:
+        uvloop_available = True
+        try:
+            import uvloop  # type: ignore[import]  # noqa: F401
+        except ImportError:
+            uvloop_available = False
+
+        configurations: List[Tuple[str, Callable[[], float]]] = []
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = create_files(Path(tmp), args.files, args.size)
+
+            def run(
+                create_client: Callable[[], httpx.AsyncClient],
+                url: str = server.url,
+                use_uvloop: bool = False,
+            ) -> Callable[[], float]:
+                return lambda: run_configuration(
+                    create_client,
+                    url,
+                    paths,
+                    args.concurrency,
+                    use_uvloop=use_uvloop,
+                )
+
+            configurations.append(
+                ("httpx default limits", run(httpx.AsyncClient))
+            )
+            configurations.append(
+                (
+                    "tuned limits",
+                    run(lambda: settings.create_client(args.concurrency)),
+                )
+            )
+            if uvloop_available:
+                configurations.append(
+                    (
+                        "tuned limits, uvloop",
+                        run(
+                            lambda: settings.create_client(args.concurrency),
+                            use_uvloop=True,
+                        ),
+                    )
+                )
+            if args.http2_url:
+                http2_settings = HTTPClientSettings(http2=True)
+                configurations.append(
+                    (
+                        "tuned limits, HTTP/2",
+                        run(
+                            lambda: http2_settings.create_client(
+                                args.concurrency
+                            ),
+                            url=args.http2_url,
+                        ),
+                    )
+                )
+
+            total_mb = args.files * args.size / 1e6
+            print(
+                f"{args.files} files of {args.size} bytes, "
+                f"{args.concurrency} concurrent uploads, "
+                f"{args.latency * 1000:.0f} ms latency"
+            )
+            for name, benchmark in configurations:
+                connections = server.connections
+                elapsed = benchmark()
+                print(
+                    f"{name:>24}: {elapsed:6.2f} s, "
+                    f"{args.files / elapsed:7.1f} files/s, "
+                    f"{total_mb / elapsed:6.1f} MB/s, "
+                    f"{server.connections - connections} connections"
+                )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
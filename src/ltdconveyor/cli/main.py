@@ -43,6 +43,28 @@ CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
     envvar="LTD_PASSWORD",
     help="Password for LTD Keeper (or `$LTD_PASSWORD`).",
 )
+@click.option(
+    "--token-cache",
+    "token_cache",
+    default=None,
+    type=click.Path(dir_okay=False),
+    envvar="LTD_TOKEN_CACHE",
+    help="File that caches LTD Keeper tokens (or `$LTD_TOKEN_CACHE`), so "
+    "that consecutive commands reuse a token rather than authenticating "
+    "again. The file is created with owner-only (0600) permissions. For "
+    "example: `~/.cache/ltd-conveyor/tokens.json`.",
+)
+@click.option(
+    "--version-cache",
+    "version_cache",
+    default=None,
+    type=click.Path(dir_okay=False),
+    envvar="LTD_VERSION_CACHE",
+    help="File that caches the API version of LTD Keeper servers for an "
+    "hour (or `$LTD_VERSION_CACHE`), so that consecutive commands don't "
+    "request it again. For example: "
+    "`~/.cache/ltd-conveyor/versions.json`.",
+)
 @click.version_option()
 @click.pass_context
 def main(
@@ -51,6 +73,8 @@ def main(
     keeper_hostname: str,
     username: str,
     password: str,
+    token_cache: Optional[str],
+    version_cache: Optional[str],
 ) -> None:
     """ltd is a command-line client for LSST the Docs.
 
@@ -77,6 +101,8 @@ def main(
         "keeper_hostname": keeper_hostname,
         "username": username,
         "password": password,
+        "token_cache": token_cache,
+        "version_cache": version_cache,
         "token": None,
     }
 
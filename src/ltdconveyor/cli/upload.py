@@ -8,14 +8,27 @@ from pathlib import Path
 from typing import List, Optional
 
 import click
-import httpx
 
+from ..compression import CompressionSettings
 from ..exceptions import ConveyorError
 from ..factory import Factory
-from .utils import run_with_asyncio
+from ..services import concurrency, httpclient
+from ..services.retry import RetryPolicy
+from .utils import install_uvloop, run_with_asyncio
 
 __all__ = ["upload"]
 
+_MB = 1024 * 1024
+
+
+def _use_uvloop(
+    ctx: click.Context, param: click.Parameter, value: bool
+) -> None:
+    # The event loop policy must be set before run_with_asyncio starts the
+    # command's event loop.
+    if value:
+        install_uvloop()
+
 
 @click.command()
 @click.option(
@@ -58,6 +71,95 @@ __all__ = ["upload"]
     "Useful in CI environments to disable a site upload just by setting "
     "this option or the environment variable $LTD_SKIP_UPLOAD=true.",
 )
+@click.option(
+    "--concurrency",
+    "max_concurrency",
+    default=concurrency.DEFAULT_MAX_CONCURRENCY,
+    show_default=True,
+    type=click.IntRange(min=1),
+    envvar="LTD_UPLOAD_CONCURRENCY",
+    help="Maximum number of files uploaded at once.",
+)
+@click.option(
+    "--max-in-flight-mb",
+    "max_in_flight_mb",
+    default=concurrency.DEFAULT_MAX_IN_FLIGHT_BYTES // _MB,
+    show_default=True,
+    type=click.IntRange(min=1),
+    envvar="LTD_UPLOAD_MAX_IN_FLIGHT_MB",
+    help="Maximum total size, in megabytes, of the files being uploaded at "
+    "once. Larger files are uploaded on their own.",
+)
+@click.option(
+    "--max-attempts",
+    "max_attempts",
+    default=RetryPolicy.max_attempts,
+    show_default=True,
+    type=click.IntRange(min=1),
+    envvar="LTD_UPLOAD_MAX_ATTEMPTS",
+    help="Maximum number of attempts to upload each file. Uploads are "
+    "retried, with backoff, after connection errors and server errors.",
+)
+@click.option(
+    "--compress",
+    "compress",
+    default=None,
+    type=click.Choice(["gzip", "br"]),
+    envvar="LTD_UPLOAD_COMPRESS",
+    help="Precompress text files (HTML, CSS, JavaScript, and so on) with "
+    "gzip or Brotli (br, which requires the brotli package), and upload them "
+    "with a Content-Encoding header. Files that don't compress well are "
+    "uploaded as-is. The server's presigned POST policy must allow the "
+    "Content-Encoding field.",
+)
+@click.option(
+    "--http2/--no-http2",
+    "http2",
+    default=False,
+    show_default=True,
+    envvar="LTD_UPLOAD_HTTP2",
+    help="Upload with HTTP/2 (requires the h2 package: pip install "
+    "httpx[http2]), which multiplexes concurrent uploads over a single "
+    "connection.",
+)
+@click.option(
+    "--max-connections",
+    "max_connections",
+    default=None,
+    type=click.IntRange(min=1),
+    envvar="LTD_UPLOAD_MAX_CONNECTIONS",
+    help="Maximum number of open HTTP connections. Default: the concurrency "
+    "plus two.",
+)
+@click.option(
+    "--max-keepalive",
+    "max_keepalive_connections",
+    default=None,
+    type=click.IntRange(min=0),
+    envvar="LTD_UPLOAD_MAX_KEEPALIVE",
+    help="Maximum number of idle HTTP connections kept open for reuse. "
+    "Default: the maximum number of connections.",
+)
+@click.option(
+    "--timeout",
+    "timeout",
+    default=httpclient.DEFAULT_TIMEOUT,
+    show_default=True,
+    type=click.FloatRange(min=0, min_open=True),
+    envvar="LTD_UPLOAD_TIMEOUT",
+    help="Timeout, in seconds, for connecting and for each network read and "
+    "write.",
+)
+@click.option(
+    "--uvloop",
+    is_flag=True,
+    default=False,
+    expose_value=False,
+    is_eager=True,
+    callback=_use_uvloop,
+    envvar="LTD_UPLOAD_UVLOOP",
+    help="Run with the uvloop event loop (requires the uvloop package).",
+)
 @click.pass_context
 @run_with_asyncio
 async def upload(
@@ -69,6 +171,14 @@ async def upload(
     dirname: str,
     ci_env: str,
     skip_upload: bool,
+    max_concurrency: int,
+    max_in_flight_mb: int,
+    max_attempts: int,
+    compress: Optional[str],
+    http2: bool,
+    max_connections: Optional[int],
+    max_keepalive_connections: Optional[int],
+    timeout: float,
 ) -> None:
     """Upload a new site build to LSST the Docs."""
     logger = logging.getLogger(__name__)
@@ -86,17 +196,45 @@ async def upload(
 
     logger.debug("CI environment: %s", ci_env)
 
+    compression: Optional[CompressionSettings] = None
+    if compress is not None:
+        try:
+            compression = CompressionSettings(
+                encoding="br" if compress == "br" else "gzip"
+            )
+        except ValueError as e:
+            raise click.UsageError(str(e))
+
+    http_settings = httpclient.HTTPClientSettings(
+        http2=http2,
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        timeout=timeout,
+    )
+    try:
+        http_client = Factory.create_http_client(
+            http_settings, upload_concurrency=max_concurrency
+        )
+    except ImportError as e:
+        raise click.UsageError(str(e))
+
     try:
         # Detect git refs
         git_refs = _get_git_refs(ci_env, git_ref)
         base_dir = Path(dirname)
 
-        async with httpx.AsyncClient() as http_client:
+        async with http_client:
             factory = Factory(
                 api_base=ctx.obj["keeper_hostname"],
                 api_username=ctx.obj["username"],
                 api_password=ctx.obj["password"],
                 http_client=http_client,
+                upload_concurrency=max_concurrency,
+                upload_max_in_flight_bytes=max_in_flight_mb * _MB,
+                upload_retry_policy=RetryPolicy(max_attempts=max_attempts),
+                upload_compression=compression,
+                token_cache_path=ctx.obj["token_cache"],
+                version_cache_path=ctx.obj["version_cache"],
             )
             project_service = factory.get_project_service()
             await project_service.upload_build(
@@ -12,8 +12,9 @@ from typing import Any, TypeVar
 import click
 
 from ltdconveyor.keeper.v1.login import get_keeper_token
+from ltdconveyor.storage.tokencache import TokenCache
 
-__all__ = ["ensure_login", "run_with_asyncio"]
+__all__ = ["ensure_login", "install_uvloop", "run_with_asyncio"]
 
 T = TypeVar("T")
 
@@ -46,10 +47,12 @@ def ensure_login(ctx: click.Context) -> None:
             ctx.obj["keeper_hostname"],
         )
 
+        token_cache = ctx.obj.get("token_cache")
         token = get_keeper_token(
             ctx.obj["keeper_hostname"],
             ctx.obj["username"],
             ctx.obj["password"],
+            token_cache=TokenCache(token_cache) if token_cache else None,
         )
         ctx.obj["token"] = token
 
@@ -63,6 +66,26 @@ def ensure_login(ctx: click.Context) -> None:
         logger.debug("Token already exists.")
 
 
+def install_uvloop() -> None:
+    """Make `asyncio.run`, and so `run_with_asyncio`, use uvloop's event
+    loop.
+
+    Raises
+    ------
+    click.UsageError
+        Raised if the ``uvloop`` package isn't installed.
+    """
+    try:
+        import uvloop  # type: ignore[import]
+    except ImportError:
+        raise click.UsageError(
+            "--uvloop requires the uvloop package "
+            "(pip install ltd-conveyor[uvloop])."
+        )
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logging.getLogger(__name__).debug("Using the uvloop event loop")
+
+
 def run_with_asyncio(
     f: Callable[..., Coroutine[Any, Any, T]]
 ) -> Callable[..., T]:
@@ -0,0 +1,304 @@
+"""Precompression of text files, which are uploaded with a
+``Content-Encoding`` header.
+"""
+
+from __future__ import annotations
+
+import gzip
+import multiprocessing
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Any, Literal, NamedTuple, Optional, Type, Union
+
+try:
+    import brotli  # type: ignore[import]
+except ImportError:
+    brotli = None
+
+__all__ = [
+    "COMPRESSIBLE_CONTENT_TYPES",
+    "CompressedFile",
+    "CompressionSettings",
+    "Precompressor",
+    "compress_file",
+]
+
+COMPRESSIBLE_CONTENT_TYPES = frozenset(
+    {
+        "application/javascript",
+        "application/json",
+        "application/ld+json",
+        "application/manifest+json",
+        "application/rss+xml",
+        "application/atom+xml",
+        "application/x-javascript",
+        "application/xhtml+xml",
+        "application/xml",
+        "image/svg+xml",
+        "image/x-icon",
+        "image/vnd.microsoft.icon",
+    }
+)
+"""Content types that are compressed, in addition to all ``text/*`` types.
+"""
+
+_CHUNK_SIZE = 1024 * 1024
+
+_FILE_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+@dataclass(frozen=True)
+class CompressionSettings:
+    """Settings for precompressing files before they're uploaded.
+
+    Compressed files are uploaded with a ``Content-Encoding`` header, and
+    served as-is: clients (and CDNs) must accept the encoding.
+    """
+
+    encoding: Literal["gzip", "br"] = "gzip"
+    """The encoding: ``"gzip"``, or ``"br"`` (Brotli, which requires the
+    ``brotli`` package).
+    """
+
+    level: Optional[int] = None
+    """Compression level (quality, for Brotli). The default is 9, which for
+    Brotli is much faster than its maximum of 11.
+    """
+
+    min_size: int = 1024
+    """Files smaller than this, in bytes, aren't compressed."""
+
+    max_ratio: float = 0.9
+    """Compressed files that are larger than this fraction of the original
+    size are discarded, and the original is uploaded.
+    """
+
+    max_workers: Optional[int] = None
+    """Number of processes that compress files. The default is the number
+    of CPUs. With ``0``, files are compressed in the calling thread.
+    """
+
+    def __post_init__(self) -> None:
+        if self.encoding not in _FILE_SUFFIXES:
+            raise ValueError(f"Unsupported encoding {self.encoding!r}")
+        if self.encoding == "br" and brotli is None:
+            raise ValueError(
+                "Brotli compression requires the brotli package "
+                "(pip install ltd-conveyor[brotli])"
+            )
+
+    def is_eligible(self, content_type: Optional[str], size: int) -> bool:
+        """Test if a file should be compressed.
+
+        Parameters
+        ----------
+        content_type : `str` or `None`
+            The file's content type.
+        size : `int`
+            The file's size, in bytes.
+        """
+        if content_type is None or size < self.min_size:
+            return False
+        content_type = content_type.split(";")[0].strip().lower()
+        return (
+            content_type.startswith("text/")
+            or content_type in COMPRESSIBLE_CONTENT_TYPES
+        )
+
+
+class CompressedFile(NamedTuple):
+    """A compressed copy of a file."""
+
+    path: str
+    """Path of the compressed file."""
+
+    encoding: str
+    """The ``Content-Encoding`` of the compressed file."""
+
+    size: int
+    """Size of the compressed file, in bytes."""
+
+    original_size: int
+    """Size of the original file, in bytes."""
+
+
+def compress_file(
+    path: Union[str, os.PathLike[str]],
+    output_path: Union[str, os.PathLike[str]],
+    settings: CompressionSettings,
+) -> Optional[CompressedFile]:
+    """Compress a file, if compression pays off.
+
+    The output is deterministic (gzip headers have no timestamp or file
+    name), so unchanged files compress to the same bytes and ETags.
+
+    Parameters
+    ----------
+    path : `str` or path-like
+        Path of the file.
+    output_path : `str` or path-like
+        Path of the compressed file to write.
+    settings : `CompressionSettings`
+        The compression settings.
+
+    Returns
+    -------
+    compressed : `CompressedFile` or `None`
+        The compressed file, or `None` if the compressed file isn't smaller
+        than ``settings.max_ratio`` of the original (in which case it's
+        removed).
+    """
+    original_size = os.path.getsize(path)
+    if settings.encoding == "br":
+        _compress_brotli(path, output_path, settings.level)
+    else:
+        _compress_gzip(path, output_path, settings.level)
+    size = os.path.getsize(output_path)
+    if size > original_size * settings.max_ratio:
+        os.remove(output_path)
+        return None
+    return CompressedFile(
+        path=os.fspath(output_path),
+        encoding=settings.encoding,
+        size=size,
+        original_size=original_size,
+    )
+
+
+def _compress_gzip(
+    path: Union[str, os.PathLike[str]],
+    output_path: Union[str, os.PathLike[str]],
+    level: Optional[int],
+) -> None:
+    with open(path, "rb") as src, open(output_path, "wb") as raw:
+        with gzip.GzipFile(
+            filename="",
+            mode="wb",
+            compresslevel=9 if level is None else level,
+            fileobj=raw,
+            mtime=0,
+        ) as dest:
+            shutil.copyfileobj(src, dest, _CHUNK_SIZE)
+
+
+def _compress_brotli(
+    path: Union[str, os.PathLike[str]],
+    output_path: Union[str, os.PathLike[str]],
+    level: Optional[int],
+) -> None:
+    compressor = brotli.Compressor(quality=9 if level is None else level)
+    with open(path, "rb") as src, open(output_path, "wb") as dest:
+        while True:
+            chunk = src.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            dest.write(compressor.process(chunk))
+        dest.write(compressor.finish())
+
+
+class Precompressor:
+    """Compress files in a process pool, into a temporary directory.
+
+    Use the precompressor as a context manager, which removes the
+    temporary directory and shuts down the pool on exit. Methods are
+    thread-safe.
+
+    Parameters
+    ----------
+    settings : `CompressionSettings`
+        The compression settings.
+    """
+
+    def __init__(self, settings: CompressionSettings) -> None:
+        self.settings = settings
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="ltd-precompress-")
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if settings.max_workers != 0:
+            # Uploads create the pool once their threads are running, and
+            # forking a process with threads can copy locks in a held state.
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def __enter__(self) -> Precompressor:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def submit(
+        self,
+        path: Union[str, os.PathLike[str]],
+        content_type: Optional[str],
+        size: int,
+    ) -> Future[Optional[CompressedFile]]:
+        """Start compressing a file, if it's eligible.
+
+        Parameters
+        ----------
+        path : `str` or path-like
+            Path of the file.
+        content_type : `str` or `None`
+            The file's content type.
+        size : `int`
+            The file's size, in bytes.
+
+        Returns
+        -------
+        future : `concurrent.futures.Future`
+            The future result of `compress_file`, which is `None` if the file
+            isn't eligible or doesn't compress well.
+        """
+        if not self.settings.is_eligible(content_type, size):
+            return _completed(None)
+        output_path = os.path.join(
+            self._tmpdir.name,
+            uuid.uuid4().hex + _FILE_SUFFIXES[self.settings.encoding],
+        )
+        if self._executor is None:
+            return _completed(compress_file(path, output_path, self.settings))
+        return self._executor.submit(
+            compress_file, os.fspath(path), output_path, self.settings
+        )
+
+    def compress(
+        self,
+        path: Union[str, os.PathLike[str]],
+        content_type: Optional[str],
+        size: int,
+    ) -> Optional[CompressedFile]:
+        """Compress a file, if it's eligible, and wait for the result (see
+        `submit`).
+        """
+        return self.submit(path, content_type, size).result()
+
+    def discard(self, compressed: Optional[CompressedFile]) -> None:
+        """Remove a compressed file once it's uploaded."""
+        if compressed is not None:
+            try:
+                os.remove(compressed.path)
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        """Shut down the process pool and remove the compressed files."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._tmpdir.cleanup()
+
+
+def _completed(result: Any) -> Future[Any]:
+    future: Future[Any] = Future()
+    future.set_result(result)
+    return future
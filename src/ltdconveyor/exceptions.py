@@ -2,7 +2,7 @@
 
 __all__ = ["ConveyorError", "LtdKeeperHttpError", "LtdKeeperParsingError"]
 
-from typing import Any
+from typing import Any, List, Tuple
 
 import httpx
 
@@ -65,3 +65,38 @@ class S3PresignedUploadError(ConveyorError):
             )
         else:
             return self.message
+
+
+class S3PresignedUploadBatchError(ConveyorError):
+    """Error uploading the files of a build, after retries.
+
+    Parameters
+    ----------
+    message : `str`
+        Summary of the error.
+    failures : `list` of (`str`, `Exception`) tuples
+        The path of each file (or directory object) that failed, and its
+        error.
+    not_uploaded : `int`
+        Number of other files that weren't uploaded, because the upload
+        was cancelled.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        failures: List[Tuple[str, BaseException]],
+        not_uploaded: int = 0,
+    ) -> None:
+        self.message = message
+        self.failures = sorted(failures, key=lambda failure: failure[0])
+        self.not_uploaded = not_uploaded
+
+    def __str__(self) -> str:
+        lines = [self.message]
+        lines.extend(f"  {path}: {error}" for path, error in self.failures)
+        if self.not_uploaded:
+            lines.append(
+                f"{self.not_uploaded} other file(s) weren't uploaded."
+            )
+        return "\n".join(lines)
@@ -2,10 +2,22 @@
 
 from __future__ import annotations
 
+import os
+from typing import Optional, Union
+
 from httpx import AsyncClient
 
+from ltdconveyor.compression import CompressionSettings
+from ltdconveyor.services.concurrency import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_IN_FLIGHT_BYTES,
+)
+from ltdconveyor.services.httpclient import HTTPClientSettings
 from ltdconveyor.services.projects import ProjectService
+from ltdconveyor.services.retry import RetryPolicy
 from ltdconveyor.storage import keeper
+from ltdconveyor.storage.tokencache import TokenCache
+from ltdconveyor.storage.versioncache import VersionCache
 
 
 class Factory:
@@ -17,11 +29,42 @@ class Factory:
         api_base: str,
         api_username: str,
         api_password: str,
+        upload_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        upload_max_in_flight_bytes: int = DEFAULT_MAX_IN_FLIGHT_BYTES,
+        upload_retry_policy: Optional[RetryPolicy] = None,
+        upload_compression: Optional[CompressionSettings] = None,
+        token_cache_path: Optional[Union[str, os.PathLike[str]]] = None,
+        version_cache_path: Optional[Union[str, os.PathLike[str]]] = None,
     ) -> None:
         self.http_client = http_client
         self.api_base = api_base
         self.api_username = api_username
         self.api_password = api_password
+        self.upload_concurrency = upload_concurrency
+        self.upload_max_in_flight_bytes = upload_max_in_flight_bytes
+        self.upload_retry_policy = upload_retry_policy
+        self.upload_compression = upload_compression
+        self.token_cache_path = token_cache_path
+        self.version_cache_path = version_cache_path
+
+    @staticmethod
+    def create_http_client(
+        settings: Optional[HTTPClientSettings] = None,
+        *,
+        upload_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> AsyncClient:
+        """Create an HTTP client for a factory, with connection limits that
+        match the upload concurrency.
+
+        Parameters
+        ----------
+        settings : `ltdconveyor.services.httpclient.HTTPClientSettings`
+            HTTP/2, connection limit, and timeout settings.
+        upload_concurrency : `int`, optional
+            The factory's ``upload_concurrency``.
+        """
+        settings = settings or HTTPClientSettings()
+        return settings.create_client(upload_concurrency)
 
     def get_keeper_client(self) -> keeper.KeeperClient:
         return keeper.KeeperClient(
@@ -29,10 +72,24 @@ class Factory:
             username=self.api_username,
             password=self.api_password,
             http_client=self.http_client,
+            token_cache=(
+                TokenCache(self.token_cache_path)
+                if self.token_cache_path is not None
+                else None
+            ),
+            version_cache=(
+                VersionCache(self.version_cache_path)
+                if self.version_cache_path is not None
+                else None
+            ),
         )
 
     def get_project_service(self) -> ProjectService:
         return ProjectService(
             keeper_client=self.get_keeper_client(),
             http_client=self.http_client,
+            max_concurrency=self.upload_concurrency,
+            max_in_flight_bytes=self.upload_max_in_flight_bytes,
+            retry_policy=self.upload_retry_policy,
+            compression=self.upload_compression,
         )
@@ -1,15 +1,23 @@
 """Login functionality for the LTD Keeper API."""
 
+from typing import Optional
 from urllib.parse import urljoin
 
 import requests
 
 from ltdconveyor.keeper.exceptions import KeeperError
+from ltdconveyor.storage.tokencache import CachedToken, TokenCache
 
 __all__ = ["get_keeper_token"]
 
 
-def get_keeper_token(host: str, username: str, password: str) -> str:
+def get_keeper_token(
+    host: str,
+    username: str,
+    password: str,
+    *,
+    token_cache: Optional[TokenCache] = None,
+) -> str:
     """Get a temporary auth token from LTD Keeper.
 
     Parameters
@@ -20,6 +28,9 @@ def get_keeper_token(host: str, username: str, password: str) -> str:
         Username.
     password : `str`
         Password.
+    token_cache : `ltdconveyor.storage.tokencache.TokenCache`, optional
+        A token cache file. A valid cached token is returned without
+        authenticating, and a new token is cached.
 
     Returns
     -------
@@ -31,10 +42,17 @@ def get_keeper_token(host: str, username: str, password: str) -> str:
     KeeperError
         Raised if the LTD Keeper API cannot return a token.
     """
+    if token_cache is not None:
+        cached = token_cache.get(host, username)
+        if cached is not None:
+            return cached.token
     token_endpoint = urljoin(host, "/token")
     r = requests.get(token_endpoint, auth=(username, password))
     if r.status_code != 200:
         raise KeeperError(
             f"Could not authenticate to {host}", r.status_code, r.text
         )
-    return r.json()["token"]
+    token = r.json()["token"]
+    if token_cache is not None:
+        token_cache.set(host, username, CachedToken.from_token(token))
+    return token
@@ -10,11 +10,13 @@ import requests
 import uritemplate
 
 from ltdconveyor.keeper.exceptions import KeeperError
+from ltdconveyor.s3.concurrency import DEFAULT_MAX_WORKERS
 from ltdconveyor.s3.presignedpost import (
-    prescan_directory,
+    create_session,
     upload_dir,
     upload_directory_objects,
 )
+from ltdconveyor.site import scan_site
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -33,7 +35,9 @@ def run_build_upload_v2(
     base_dir: Path,
 ) -> None:
     """Service function for running a build with the v1 LTD Keeper API."""
-    dirnames = prescan_directory(base_dir)
+    site = scan_site(base_dir, max_workers=DEFAULT_MAX_WORKERS)
+    logger.info("Uploading %s", site.describe())
+    dirnames = list(site.dirnames)
 
     build_resource = register_build(
         base_url=base_url,
@@ -44,14 +48,22 @@ def run_build_upload_v2(
         dirnames=dirnames,
     )
 
-    # Do the upload.
-    upload_dir(post_urls=build_resource["post_prefix_urls"], base_dir=base_dir)
-    logger.debug("Upload complete for %r", build_resource["self_url"])
+    # Do the upload, reusing connections across all files and directory
+    # objects.
+    with create_session() as session:
+        upload_dir(
+            post_urls=build_resource["post_prefix_urls"],
+            base_dir=base_dir,
+            session=session,
+            site=site,
+        )
+        logger.debug("Upload complete for %r", build_resource["self_url"])
 
-    # Upload directory objects for redirects
-    upload_directory_objects(
-        post_urls=build_resource["post_dir_urls"],
-    )
+        # Upload directory objects for redirects
+        upload_directory_objects(
+            post_urls=build_resource["post_dir_urls"],
+            session=session,
+        )
 
     # Confim the upload
     confirm_build(build_url=build_resource["self_url"], keeper_token=token)
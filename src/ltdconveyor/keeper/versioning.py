@@ -5,10 +5,11 @@ Keeper API server.
 from __future__ import annotations
 
 import re
-from typing import Tuple
+from typing import Optional, Tuple
 
 import requests
 
+from ..storage.versioncache import VersionCache, get_default_version_cache
 from .exceptions import KeeperError
 
 version_type = Tuple[int, int, int]
@@ -16,7 +17,34 @@ version_type = Tuple[int, int, int]
 _version_pattern = re.compile(r"(^\d+)\.(\d+)\.(\d+)")
 
 
-def get_server_version(base_url: str) -> version_type:
+def get_server_version(
+    base_url: str, *, cache: Optional[VersionCache] = None
+) -> version_type:
+    """Get the API version of an LTD Keeper server.
+
+    Parameters
+    ----------
+    base_url : `str`
+        Base URL of the LTD Keeper API.
+    cache : `ltdconveyor.storage.versioncache.VersionCache`, optional
+        Cache of server versions. The default is an in-memory cache that's
+        shared by the process.
+
+    Returns
+    -------
+    version : `tuple` of `int`
+        The major, minor, and patch version.
+    """
+    if cache is None:
+        cache = get_default_version_cache()
+    version = cache.get(base_url)
+    if version is None:
+        version = _request_server_version(base_url)
+        cache.set(base_url, version)
+    return version
+
+
+def _request_server_version(base_url: str) -> version_type:
     r = requests.get(base_url)
     if r.status_code != 200:
         raise KeeperError(f"Could not connect to server {base_url}")
@@ -1,8 +1,13 @@
-from .copy import copy_dir
-from .delete import delete_dir
-from .exceptions import S3Error
+from .context import S3Context
+from .copy import CopyResult, copy_dir
+from .delete import DeleteResult, delete_dir
+from .exceptions import S3BatchError, S3Error
+from .index import BucketIndex
+from .listing import ObjectRecord, iter_objects
+from .transfer import TransferSettings
 from .upload import (
     ObjectManager,
+    SyncResult,
     create_dir_redirect_object,
     upload_dir,
     upload_file,
@@ -12,9 +17,18 @@ from .utils import open_bucket
 
 __all__ = [
     "copy_dir",
+    "CopyResult",
     "delete_dir",
+    "DeleteResult",
+    "S3Context",
     "S3Error",
+    "S3BatchError",
+    "BucketIndex",
+    "ObjectRecord",
+    "iter_objects",
     "ObjectManager",
+    "SyncResult",
+    "TransferSettings",
     "create_dir_redirect_object",
     "upload_dir",
     "upload_file",
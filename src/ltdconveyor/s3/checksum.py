@@ -0,0 +1,155 @@
+"""Checksums of local files that are comparable to S3 object ETags."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import TYPE_CHECKING, NamedTuple, Union
+
+if TYPE_CHECKING:
+    from ltdconveyor.s3.listing import ObjectRecord
+
+__all__ = [
+    "DEFAULT_MULTIPART_THRESHOLD",
+    "DEFAULT_MULTIPART_CHUNKSIZE",
+    "FileDigest",
+    "compute_file_digest",
+    "adjust_chunksize",
+]
+
+DEFAULT_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+"""Size, in bytes, at which boto3 switches to multipart uploads by default.
+"""
+
+DEFAULT_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+"""Size, in bytes, of each part in boto3's default multipart uploads."""
+
+_MAX_PARTS = 10000
+
+_MAX_PART_SIZE = 5 * 1024**3
+
+_READ_SIZE = 1024 * 1024
+
+
+class FileDigest(NamedTuple):
+    """Checksums of a local file."""
+
+    size: int
+    """Size of the file, in bytes."""
+
+    md5: str
+    """Hex-encoded MD5 digest of the file's content."""
+
+    etag: str
+    """The ETag that S3 assigns to the file when it is uploaded with the
+    multipart settings that the digest was computed for. For files that are
+    uploaded in a single request, this is the same as ``md5``.
+    """
+
+    def matches(self, record: ObjectRecord) -> bool:
+        """Test if an object in S3 has the same content as this file.
+
+        Parameters
+        ----------
+        record : `ltdconveyor.s3.listing.ObjectRecord`
+            A record of the object from a bucket listing.
+
+        Returns
+        -------
+        matches : `bool`
+            `True` if the sizes match and the object's ETag matches either
+            the file's MD5 digest or its multipart ETag.
+        """
+        if record.size != self.size:
+            return False
+        return record.etag in (self.md5, self.etag)
+
+
+def adjust_chunksize(chunksize: int, size: int) -> int:
+    """Adjust a multipart chunk size the same way that boto3 does so that
+    an upload doesn't exceed S3's limits on the number and size of parts.
+
+    Parameters
+    ----------
+    chunksize : `int`
+        The configured part size, in bytes.
+    size : `int`
+        Size of the file, in bytes.
+
+    Returns
+    -------
+    chunksize : `int`
+        The part size that boto3 uses for the file.
+    """
+    while size > 0 and -(-size // chunksize) > _MAX_PARTS:
+        chunksize *= 2
+    return min(chunksize, _MAX_PART_SIZE)
+
+
+def compute_file_digest(
+    path: Union[str, os.PathLike[str]],
+    *,
+    multipart_threshold: int = DEFAULT_MULTIPART_THRESHOLD,
+    multipart_chunksize: int = DEFAULT_MULTIPART_CHUNKSIZE,
+) -> FileDigest:
+    """Compute the MD5 digest and expected S3 ETag of a local file.
+
+    The file is read once; the whole-file MD5 and the per-part MD5s needed
+    for a multipart ETag are computed together.
+
+    Parameters
+    ----------
+    path : `str` or path-like
+        Path of the local file.
+    multipart_threshold : `int`, optional
+        Size, in bytes, at which files are uploaded in multiple parts.
+    multipart_chunksize : `int`, optional
+        Size, in bytes, of each part of a multipart upload.
+
+    Returns
+    -------
+    digest : `FileDigest`
+        The file's size and checksums.
+    """
+    whole = hashlib.md5()
+    part_digests = []
+    part = hashlib.md5()
+    part_remaining = 0
+    size = 0
+    chunksize = 0
+
+    with open(path, "rb") as f:
+        # The part size depends on the file size, so stat the open file.
+        total_size = os.fstat(f.fileno()).st_size
+        if total_size >= multipart_threshold:
+            chunksize = adjust_chunksize(multipart_chunksize, total_size)
+            part_remaining = chunksize
+        while True:
+            data = f.read(_READ_SIZE)
+            if not data:
+                break
+            size += len(data)
+            whole.update(data)
+            if chunksize == 0:
+                continue
+            view = memoryview(data)
+            while len(view) > 0:
+                n = min(part_remaining, len(view))
+                part.update(view[:n])
+                view = view[n:]
+                part_remaining -= n
+                if part_remaining == 0:
+                    part_digests.append(part.digest())
+                    part = hashlib.md5()
+                    part_remaining = chunksize
+
+    md5 = whole.hexdigest()
+    if chunksize == 0:
+        return FileDigest(size=size, md5=md5, etag=md5)
+
+    if part_remaining != chunksize:
+        part_digests.append(part.digest())
+    combined = hashlib.md5(b"".join(part_digests)).hexdigest()
+    return FileDigest(
+        size=size, md5=md5, etag=f"{combined}-{len(part_digests)}"
+    )
@@ -0,0 +1,142 @@
+"""Bounded thread pools for bulk S3 operations."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Dict, List, Optional, Tuple, TypeVar
+
+from ltdconveyor.s3.exceptions import S3BatchError
+
+__all__ = ["DEFAULT_MAX_WORKERS", "run_tasks"]
+
+T = TypeVar("T")
+
+DEFAULT_MAX_WORKERS = 16
+"""Default number of worker threads for bulk S3 operations."""
+
+
+def run_tasks(
+    tasks: Iterable[Tuple[str, Callable[[], T]]],
+    *,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_pending: Optional[int] = None,
+    description: str = "S3 operation",
+    fail_fast: bool = False,
+) -> Iterator[Tuple[str, T]]:
+    """Run named tasks in a bounded thread pool.
+
+    The ``tasks`` iterable is consumed lazily: no more than ``max_pending``
+    tasks are submitted to the pool at once, so a generator of tasks (such
+    as one driven by a bucket listing) never needs to be held in memory.
+
+    Parameters
+    ----------
+    tasks : iterable of (`str`, callable) tuples
+        Each task is a name (typically an object key) and a callable that
+        takes no arguments. Callables must only use thread-safe resources,
+        such as boto3 clients.
+    max_workers : `int`, optional
+        Maximum number of tasks that run concurrently. With ``1``, tasks
+        run sequentially in the calling thread.
+    max_pending : `int`, optional
+        Maximum number of submitted tasks that haven't completed. The
+        default is twice ``max_workers``.
+    description : `str`, optional
+        Description of the operation, used in the error message.
+    fail_fast : `bool`, optional
+        If `True`, stop at the first failure: no more tasks are started,
+        tasks that haven't started are cancelled, and the error is raised
+        once the running tasks finish.
+
+    Yields
+    ------
+    name : `str`
+        Name of a task that succeeded.
+    result
+        The return value of the task's callable.
+
+    Raises
+    ------
+    ltdconveyor.s3.S3BatchError
+        Raised once all tasks are finished if any task raised an exception.
+        Every failure is reported, ordered by task name.
+    """
+    logger = logging.getLogger(__name__)
+    failures: List[Tuple[str, BaseException]] = []
+
+    if max_workers <= 1:
+        for name, func in tasks:
+            try:
+                result = func()
+            except Exception as e:
+                logger.debug("%s failed for %s: %s", description, name, e)
+                failures.append((name, e))
+                if fail_fast:
+                    break
+            else:
+                yield name, result
+        _raise_failures(description, failures)
+        return
+
+    if max_pending is None:
+        max_pending = 2 * max_workers
+    max_pending = max(max_pending, max_workers)
+
+    pending: Dict[Future[T], str] = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for name, func in tasks:
+            if len(pending) >= max_pending:
+                for item in _collect(pending, failures, description):
+                    yield item
+            if fail_fast and failures:
+                break
+            pending[executor.submit(func)] = name
+        while pending:
+            if fail_fast and failures:
+                for future in list(pending):
+                    if future.cancel():
+                        del pending[future]
+                if not pending:
+                    break
+            for item in _collect(pending, failures, description):
+                yield item
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+    _raise_failures(description, failures)
+
+
+def _collect(
+    pending: Dict[Future[T], str],
+    failures: List[Tuple[str, BaseException]],
+    description: str,
+) -> Iterator[Tuple[str, T]]:
+    """Wait for at least one pending task to finish and collect the results
+    of all finished tasks.
+    """
+    done, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        name = pending.pop(future)
+        error = future.exception()
+        if error is not None:
+            logging.getLogger(__name__).debug(
+                "%s failed for %s: %s", description, name, error
+            )
+            failures.append((name, error))
+        else:
+            yield name, future.result()
+
+
+def _raise_failures(
+    description: str, failures: List[Tuple[str, BaseException]]
+) -> None:
+    if failures:
+        raise S3BatchError(
+            f"{description} failed for {len(failures)} object(s)", failures
+        )
@@ -0,0 +1,190 @@
+"""A reusable boto3 session and S3 client with tunable connection
+settings.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Literal, Optional
+
+import boto3
+from botocore.config import Config
+
+__all__ = [
+    "DEFAULT_MAX_POOL_CONNECTIONS",
+    "S3Context",
+    "resolve_context",
+]
+
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+"""Default size of the connection pool of an `S3Context`."""
+
+
+class S3Context:
+    """A boto3 session and S3 resource that can be shared by several S3
+    operations.
+
+    Creating a session and resource is relatively slow, and each resource
+    has its own pool of connections. Passing the same context to
+    `ltdconveyor.s3.upload_dir`, `ltdconveyor.s3.copy_dir`,
+    `ltdconveyor.s3.delete_dir`, and `ltdconveyor.s3.open_bucket` reuses the
+    session and its open (TLS) connections across these steps.
+
+    Parameters
+    ----------
+    aws_access_key_id : `str`, optional
+        The access key for your AWS account. Also set
+        ``aws_secret_access_key``.
+    aws_secret_access_key : `str`, optional
+        The secret key for your AWS account.
+    aws_profile : `str`, optional
+        Name of AWS profile in :file:`~/.aws/credentials`. Use this instead
+        of ``aws_access_key_id`` and ``aws_secret_access_key`` for file-based
+        credentials.
+    session : `boto3.session.Session`, optional
+        An existing session to use instead of creating one from the
+        credentials.
+    max_pool_connections : `int`, optional
+        Maximum number of connections kept in the pool. This should be at
+        least the number of concurrent requests (such as ``max_workers``
+        of `ltdconveyor.s3.upload_dir`).
+    retry_mode : `str`, optional
+        The botocore retry mode: ``"standard"``, ``"adaptive"``, or
+        ``"legacy"``.
+    max_attempts : `int`, optional
+        Maximum number of attempts of each request, including the first.
+    connect_timeout : `float`, optional
+        Timeout, in seconds, for making a connection.
+    read_timeout : `float`, optional
+        Timeout, in seconds, for reading from a connection.
+
+    Notes
+    -----
+    The S3 resource is created on first use. Its underlying client (see
+    `client`) is thread-safe, but the resource and the objects it creates
+    should only be used from a single thread.
+    """
+
+    def __init__(
+        self,
+        *,
+        aws_access_key_id: Optional[str] = None,
+        aws_secret_access_key: Optional[str] = None,
+        aws_profile: Optional[str] = None,
+        session: Optional[boto3.session.Session] = None,
+        max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+        retry_mode: Literal["standard", "adaptive", "legacy"] = "standard",
+        max_attempts: int = 5,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+    ) -> None:
+        if session is None:
+            session = boto3.session.Session(
+                profile_name=aws_profile,
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+            )
+        self._session = session
+        self._max_pool_connections = max_pool_connections
+        self._config = Config(
+            max_pool_connections=max_pool_connections,
+            retries={"mode": retry_mode, "max_attempts": max_attempts},
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+        )
+        self._resource: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> boto3.session.Session:
+        """The boto3 session."""
+        return self._session
+
+    @property
+    def config(self) -> Config:
+        """The botocore configuration of the S3 client."""
+        return self._config
+
+    @property
+    def max_pool_connections(self) -> int:
+        """Maximum number of connections kept in the pool."""
+        return self._max_pool_connections
+
+    @property
+    def resource(self) -> Any:
+        """The S3 service resource."""
+        with self._lock:
+            if self._resource is None:
+                self._resource = self._session.resource(
+                    "s3", config=self._config
+                )
+            return self._resource
+
+    @property
+    def client(self) -> Any:
+        """The (thread-safe) S3 client of `resource`."""
+        return self.resource.meta.client
+
+    def bucket(self, bucket_name: str) -> Any:
+        """Get a Bucket resource.
+
+        Parameters
+        ----------
+        bucket_name : `str`
+            Name of the S3 bucket.
+
+        Returns
+        -------
+        bucket : Boto3 S3 Bucket instance
+            The S3 bucket, which shares this context's client.
+        """
+        return self.resource.Bucket(bucket_name)
+
+
+def resolve_context(
+    s3_context: Optional[S3Context],
+    *,
+    aws_access_key_id: Optional[str] = None,
+    aws_secret_access_key: Optional[str] = None,
+    aws_profile: Optional[str] = None,
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+) -> S3Context:
+    """Get the S3 context for an operation, creating one from credentials
+    if necessary.
+
+    Parameters
+    ----------
+    s3_context : `S3Context` or `None`
+        A context passed by the caller, which is returned as-is.
+    aws_access_key_id : `str`, optional
+        The access key for your AWS account.
+    aws_secret_access_key : `str`, optional
+        The secret key for your AWS account.
+    aws_profile : `str`, optional
+        Name of AWS profile in :file:`~/.aws/credentials`.
+    max_pool_connections : `int`, optional
+        Number of concurrent connections that the operation needs. A new
+        context is created with this pool size. For a caller's context, a
+        smaller pool is only logged: requests still succeed, but extra
+        connections are discarded after use rather than reused.
+
+    Returns
+    -------
+    s3_context : `S3Context`
+        The S3 context.
+    """
+    if s3_context is None:
+        return S3Context(
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            aws_profile=aws_profile,
+            max_pool_connections=max_pool_connections,
+        )
+    if s3_context.max_pool_connections < max_pool_connections:
+        logging.getLogger(__name__).debug(
+            "S3 context pool size %d is less than %d concurrent requests",
+            s3_context.max_pool_connections,
+            max_pool_connections,
+        )
+    return s3_context
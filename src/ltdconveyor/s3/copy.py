@@ -1,13 +1,73 @@
 """Copy an S3 directory to another prefix in the same bucket."""
 
+from __future__ import annotations
+
+import logging
 import os
-from typing import Optional
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from ltdconveyor.s3.concurrency import DEFAULT_MAX_WORKERS, run_tasks
+from ltdconveyor.s3.context import S3Context, resolve_context
+from ltdconveyor.s3.delete import delete_dir, delete_keys
+from ltdconveyor.s3.listing import ObjectRecord, iter_objects
+from ltdconveyor.s3.manifest import MANIFEST_FILENAME
+from ltdconveyor.s3.progress import ProgressLogger
+from ltdconveyor.s3.transfer import TransferSettings
 
-import boto3
+__all__ = ["copy_dir", "CopyResult", "DEFAULT_COPY_TRANSFER_SETTINGS"]
 
-from ltdconveyor.s3.delete import delete_dir
+DEFAULT_COPY_TRANSFER_SETTINGS = TransferSettings(
+    multipart_threshold=1024 * 1024 * 1024,
+    multipart_chunksize=256 * 1024 * 1024,
+    max_concurrency=8,
+)
+"""Default settings for server-side copies of large objects: objects of
+1 GiB or more are copied in 256 MiB parts, with up to 8 parts at a time.
+Server-side copies don't buffer data locally, so ``max_memory`` doesn't
+apply.
+"""
 
-__all__ = ["copy_dir"]
+_PRESERVED_HEADERS = (
+    "CacheControl",
+    "ContentDisposition",
+    "ContentEncoding",
+    "ContentLanguage",
+    "ContentType",
+    "Expires",
+    "WebsiteRedirectLocation",
+)
+"""Headers of a source object that are kept when its metadata is
+replaced.
+"""
+
+
+@dataclass
+class CopyResult:
+    """Summary of a `copy_dir` operation."""
+
+    copied: int = 0
+    """Number of objects copied (excluding the directory redirect
+    object).
+    """
+
+    copied_bytes: int = 0
+    """Total size of the copied objects, in bytes."""
+
+    skipped: int = 0
+    """Number of unchanged objects that weren't copied (in incremental
+    mode).
+    """
+
+    deleted: int = 0
+    """Number of stale destination objects that were deleted (in
+    incremental mode).
+    """
+
+    elapsed: float = 0.0
+    """Time taken to copy the objects, in seconds."""
 
 
 def copy_dir(
@@ -21,7 +81,11 @@ def copy_dir(
     cache_control: Optional[str] = None,
     surrogate_control: Optional[str] = None,
     create_directory_redirect_object: bool = True,
-) -> None:
+    s3_context: Optional[S3Context] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    transfer_settings: Optional[TransferSettings] = None,
+    incremental: bool = False,
+) -> CopyResult:
     """Copy objects from one directory in a bucket to another directory in
     the same bucket.
 
@@ -31,6 +95,15 @@ def copy_dir(
     - If ``cache_control`` and ``surrogate_control`` values are provided they
       will replace the old one.
 
+    The source directory's sync manifest object (see
+    `ltdconveyor.s3.manifest`) isn't copied, since it only describes the
+    source directory.
+
+    Without any of these overrides, S3 copies each object's headers and
+    metadata directly. With overrides, each object's headers are read (as
+    objects are copied, concurrently) and copied along with the new
+    values.
+
     Parameters
     ----------
     bucket_name : `str`
@@ -75,11 +148,45 @@ def copy_dir(
         ``x-amz-meta-dir-redirect=true`` HTTP header. LSST the Docs' Fastly
         VCL is configured to redirect requests for a directory path to the
         directory's ``index.html`` (known as *courtesy redirects*).
+    s3_context : `ltdconveyor.s3.S3Context`, optional
+        A shared S3 session and connection pool. If set, the AWS credential
+        parameters are ignored.
+    max_workers : `int`, optional
+        Maximum number of objects that are copied concurrently. Objects are
+        copied as the source directory is listed.
+    transfer_settings : `ltdconveyor.s3.TransferSettings`, optional
+        Settings for copying large objects. Objects of at least
+        ``multipart_threshold`` bytes are copied with a multipart upload
+        whose parts (of ``multipart_chunksize`` bytes) are copied
+        concurrently, up to ``max_concurrency`` parts at a time. This also
+        allows copying objects larger than 5 GB. The default is
+        `DEFAULT_COPY_TRANSFER_SETTINGS`.
+    incremental : `bool`, optional
+        If `True`, update the destination directory in place rather than
+        deleting it and copying every object. The source and destination
+        directories are listed concurrently, and objects that are new, or
+        whose size or ETag differ, are copied. Objects with the same
+        content are read (with a ``HEAD`` request for each of the source
+        and destination objects) and only copied if the destination's
+        headers and metadata differ from the source's, with any header
+        overrides applied. Objects that aren't in the source are deleted
+        after all copies, so the destination is never empty. Since objects
+        are compared by ETag, objects that were uploaded or copied in
+        multiple parts are usually copied again.
+
+    Returns
+    -------
+    result : `CopyResult`
+        The number and total size of the copied objects, and the time
+        taken.
 
     Raises
     ------
     ltdconveyor.s3.S3Error
         Thrown by any unexpected faults from the S3 API.
+    ltdconveyor.s3.S3BatchError
+        Thrown if any objects fail to copy. All other objects are copied
+        first, and the error lists every object that failed.
     RuntimeError
         Thrown when the source and destination directories are the same.
     """
@@ -101,64 +208,467 @@ def copy_dir(
         )
         raise RuntimeError(msg)
 
-    # Delete any existing objects in the destination
-    delete_dir(
-        bucket_name, dest_path, aws_access_key_id, aws_secret_access_key
-    )
+    logger = logging.getLogger(__name__)
 
-    session = boto3.session.Session(
+    settings = transfer_settings or DEFAULT_COPY_TRANSFER_SETTINGS
+    context = resolve_context(
+        s3_context,
         aws_access_key_id=aws_access_key_id,
         aws_secret_access_key=aws_secret_access_key,
-        profile_name=aws_profile,
+        aws_profile=aws_profile,
+        max_pool_connections=max(max_workers * settings.max_concurrency, 10),
     )
-    s3 = session.resource("s3")
-    bucket = s3.Bucket(bucket_name)
 
-    # Copy each object from source to destination
-    for src_obj in bucket.objects.filter(Prefix=src_path):
-        src_rel_path = os.path.relpath(src_obj.key, start=src_path)
-        dest_key_path = os.path.join(dest_path, src_rel_path)
+    client = context.client
+    copy_args: Dict[str, Any] = {
+        "surrogate_key": surrogate_key,
+        "cache_control": cache_control,
+        "surrogate_control": surrogate_control,
+        "transfer_settings": settings,
+    }
+    result = CopyResult()
+    stale_keys: List[str] = []
 
-        # the src_obj (ObjectSummary) doesn't include headers afaik
-        head = s3.meta.client.head_object(Bucket=bucket_name, Key=src_obj.key)
-        metadata = head["Metadata"]
-        content_type = head["ContentType"]
+    def iter_tasks() -> (
+        Iterator[Tuple[str, Callable[[], Optional[ObjectRecord]]]]
+    ):
+        for record in iter_objects(
+            client,
+            bucket_name,
+            prefix=src_path,
+            max_workers=max_workers,
+            ordered=False,
+        ):
+            if _is_manifest(record.key, src_path):
+                continue
+            yield record.key, partial(
+                _copy_object,
+                client,
+                bucket_name,
+                record,
+                _get_dest_key(record.key, src_path, dest_path),
+                **copy_args,
+            )
 
-        # try to use original Cache-Control header if new one is not set
-        if cache_control is None and "CacheControl" in head:
-            cache_control = head["CacheControl"]
+    def iter_changed_tasks() -> (
+        Iterator[Tuple[str, Callable[[], Optional[ObjectRecord]]]]
+    ):
+        src_records, dest_records = _list_directories(
+            client, bucket_name, src_path, dest_path, max_workers=max_workers
+        )
+        # A destination manifest, which no longer describes the
+        # destination, is deleted as a stale object.
+        src_records.pop(MANIFEST_FILENAME, None)
+        stale_keys.extend(
+            dest_record.key
+            for rel_path, dest_record in dest_records.items()
+            if rel_path not in src_records
+        )
+        for rel_path, record in src_records.items():
+            dest_record = dest_records.get(rel_path)
+            if dest_record is not None and (
+                dest_record.size == record.size
+                and dest_record.etag == record.etag
+            ):
+                # Only the headers and metadata can differ
+                yield record.key, partial(
+                    _copy_object_if_changed,
+                    client,
+                    bucket_name,
+                    record,
+                    dest_record.key,
+                    **copy_args,
+                )
+            else:
+                yield record.key, partial(
+                    _copy_object,
+                    client,
+                    bucket_name,
+                    record,
+                    _get_dest_key(record.key, src_path, dest_path),
+                    **copy_args,
+                )
 
-        if surrogate_control is not None:
-            metadata["surrogate-control"] = surrogate_control
+    if incremental:
+        tasks = iter_changed_tasks()
+    else:
+        # Delete any existing objects in the destination
+        delete_dir(
+            bucket_name,
+            dest_path,
+            s3_context=context,
+            max_workers=max_workers,
+        )
+        tasks = iter_tasks()
 
-        if surrogate_key is not None:
-            metadata["surrogate-key"] = surrogate_key
+    # Copy each object from source to destination as it's listed
+    progress = ProgressLogger("Copied", logger=logger)
+    for _, copied in run_tasks(
+        tasks, max_workers=max_workers, description="Copy"
+    ):
+        if copied is None:
+            result.skipped += 1
+        else:
+            progress.update(nbytes=copied.size)
+    progress.finish()
 
-        s3.meta.client.copy_object(
-            Bucket=bucket_name,
-            Key=dest_key_path,
-            CopySource={"Bucket": bucket_name, "Key": src_obj.key},
-            MetadataDirective="REPLACE",
-            Metadata=metadata,
-            ACL="public-read",
-            CacheControl=cache_control,
-            ContentType=content_type,
+    # Delete stale objects after copies so the destination is never
+    # missing objects.
+    if stale_keys:
+        result.deleted = delete_keys(
+            client, bucket_name, stale_keys, max_workers=max_workers
         )
 
     if create_directory_redirect_object:
         dest_dirname = dest_path.rstrip("/")
-        obj = bucket.Object(dest_dirname)
-        metadata = {"dir-redirect": "true"}
+        args: Dict[str, Any] = {}
         if cache_control is not None:
-            obj.put(
-                Body="",
-                ACL="public-read",
-                Metadata=metadata,
-                CacheControl=cache_control,
+            args["CacheControl"] = cache_control
+        client.put_object(
+            Bucket=bucket_name,
+            Key=dest_dirname,
+            Body="",
+            ACL="public-read",
+            Metadata={"dir-redirect": "true"},
+            **args,
+        )
+
+    result.copied = progress.count
+    result.copied_bytes = progress.nbytes
+    result.elapsed = progress.elapsed
+    logger.info(
+        "Copied %s to %s: %d copied, %d skipped, %d deleted",
+        src_path,
+        dest_path,
+        result.copied,
+        result.skipped,
+        result.deleted,
+    )
+    return result
+
+
+def _has_overrides(
+    surrogate_key: Optional[str],
+    cache_control: Optional[str],
+    surrogate_control: Optional[str],
+) -> bool:
+    return (
+        surrogate_key is not None
+        or cache_control is not None
+        or surrogate_control is not None
+    )
+
+
+def _get_relative_key(key: str, dirname: str) -> str:
+    """Get the path of an object relative to a directory."""
+    return os.path.relpath(key, start=dirname)
+
+
+def _is_manifest(key: str, dirname: str) -> bool:
+    """Test if an object is the sync manifest of a directory."""
+    return _get_relative_key(key, dirname) == MANIFEST_FILENAME
+
+
+def _get_dest_key(src_key: str, src_path: str, dest_path: str) -> str:
+    """Get the key that a source object is copied to."""
+    return os.path.join(dest_path, _get_relative_key(src_key, src_path))
+
+
+def _list_directories(
+    client: Any,
+    bucket_name: str,
+    src_path: str,
+    dest_path: str,
+    *,
+    max_workers: int,
+) -> Tuple[Dict[str, ObjectRecord], Dict[str, ObjectRecord]]:
+    """List the source and destination directories concurrently.
+
+    Returns records of the objects in each directory, keyed by path
+    relative to the directory.
+    """
+    listings = dict(
+        run_tasks(
+            [
+                (
+                    path,
+                    partial(
+                        _list_relative,
+                        client,
+                        bucket_name,
+                        path,
+                        max_workers=max(max_workers // 2, 1),
+                    ),
+                )
+                for path in (src_path, dest_path)
+            ],
+            max_workers=2,
+            description="List",
+        )
+    )
+    return listings[src_path], listings[dest_path]
+
+
+def _list_relative(
+    client: Any, bucket_name: str, dirname: str, *, max_workers: int
+) -> Dict[str, ObjectRecord]:
+    return {
+        _get_relative_key(record.key, dirname): record
+        for record in iter_objects(
+            client,
+            bucket_name,
+            prefix=dirname,
+            max_workers=max_workers,
+            ordered=False,
+        )
+    }
+
+
+def _copy_object(
+    client: Any,
+    bucket_name: str,
+    record: ObjectRecord,
+    dest_key: str,
+    *,
+    surrogate_key: Optional[str],
+    cache_control: Optional[str],
+    surrogate_control: Optional[str],
+    transfer_settings: TransferSettings,
+    head: Optional[Dict[str, Any]] = None,
+) -> ObjectRecord:
+    """Copy an object, applying any header overrides.
+
+    ``head`` is the source object's ``head_object`` response, if it's
+    already been read.
+
+    Returns the source object's record.
+    """
+    copy_source = {"Bucket": bucket_name, "Key": record.key}
+    multipart = record.size >= transfer_settings.multipart_threshold
+    if not multipart and not _has_overrides(
+        surrogate_key, cache_control, surrogate_control
+    ):
+        # S3 copies the source's headers and metadata, so the source
+        # doesn't need to be fetched.
+        client.copy_object(
+            Bucket=bucket_name,
+            Key=dest_key,
+            CopySource=copy_source,
+            MetadataDirective="COPY",
+            ACL="public-read",
+        )
+        return record
+
+    # Replacing metadata (or a multipart copy) replaces all of the object's
+    # headers, and the listing doesn't include headers.
+    if head is None:
+        head = client.head_object(Bucket=bucket_name, Key=record.key)
+    args, metadata = _get_copied_headers(
+        head,
+        surrogate_key=surrogate_key,
+        cache_control=cache_control,
+        surrogate_control=surrogate_control,
+    )
+
+    if multipart:
+        _copy_multipart(
+            client,
+            bucket_name,
+            record,
+            dest_key,
+            source_etag=head["ETag"],
+            transfer_settings=transfer_settings,
+            Metadata=metadata,
+            ACL="public-read",
+            **args,
+        )
+        return record
+
+    client.copy_object(
+        Bucket=bucket_name,
+        Key=dest_key,
+        CopySource=copy_source,
+        MetadataDirective="REPLACE",
+        Metadata=metadata,
+        ACL="public-read",
+        **args,
+    )
+    return record
+
+
+def _copy_object_if_changed(
+    client: Any,
+    bucket_name: str,
+    record: ObjectRecord,
+    dest_key: str,
+    *,
+    surrogate_key: Optional[str],
+    cache_control: Optional[str],
+    surrogate_control: Optional[str],
+    transfer_settings: TransferSettings,
+) -> Optional[ObjectRecord]:
+    """Copy an object unless the existing destination object, which has
+    the same content, already has the source's headers and metadata, with
+    the header overrides applied.
+
+    Returns the source object's record if it's copied, or `None`.
+    """
+    head = client.head_object(Bucket=bucket_name, Key=record.key)
+    dest_head = client.head_object(Bucket=bucket_name, Key=dest_key)
+    expected = _get_copied_headers(
+        head,
+        surrogate_key=surrogate_key,
+        cache_control=cache_control,
+        surrogate_control=surrogate_control,
+    )
+    actual = _get_copied_headers(
+        dest_head,
+        surrogate_key=None,
+        cache_control=None,
+        surrogate_control=None,
+    )
+    if actual == expected:
+        return None
+    return _copy_object(
+        client,
+        bucket_name,
+        record,
+        dest_key,
+        surrogate_key=surrogate_key,
+        cache_control=cache_control,
+        surrogate_control=surrogate_control,
+        transfer_settings=transfer_settings,
+        head=head,
+    )
+
+
+def _get_copied_headers(
+    head: Dict[str, Any],
+    *,
+    surrogate_key: Optional[str],
+    cache_control: Optional[str],
+    surrogate_control: Optional[str],
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Get the headers and user metadata of a copy of an object, from its
+    ``head_object`` response, with any header overrides applied.
+    """
+    args: Dict[str, Any] = {
+        name: head[name] for name in _PRESERVED_HEADERS if name in head
+    }
+    metadata = dict(head["Metadata"])
+    # try to use original Cache-Control header if new one is not set
+    if cache_control is not None:
+        args["CacheControl"] = cache_control
+
+    if surrogate_control is not None:
+        metadata["surrogate-control"] = surrogate_control
+
+    if surrogate_key is not None:
+        metadata["surrogate-key"] = surrogate_key
+    return args, metadata
+
+
+def _copy_multipart(
+    client: Any,
+    bucket_name: str,
+    record: ObjectRecord,
+    dest_key: str,
+    *,
+    source_etag: str,
+    transfer_settings: TransferSettings,
+    **args: Any,
+) -> None:
+    """Copy an object with a multipart upload whose parts are copied
+    concurrently with ``UploadPartCopy``.
+
+    Additional keyword arguments (the headers and metadata of the new
+    object) are passed to ``CreateMultipartUpload``. The upload is aborted
+    if any part fails.
+    """
+    logger = logging.getLogger(__name__)
+    chunksize = transfer_settings.chunksize_for(record.size)
+    response = client.create_multipart_upload(
+        Bucket=bucket_name, Key=dest_key, **args
+    )
+    upload_id = response["UploadId"]
+    logger.debug(
+        "Copying %s to %s in %d MiB parts",
+        record.key,
+        dest_key,
+        chunksize // (1024 * 1024),
+    )
+    try:
+        tasks = (
+            (
+                f"{record.key} (part {part_number})",
+                partial(
+                    _copy_part,
+                    client,
+                    bucket_name,
+                    dest_key,
+                    upload_id,
+                    part_number,
+                    CopySource={"Bucket": bucket_name, "Key": record.key},
+                    # Ensure every part is copied from the same version
+                    CopySourceIfMatch=source_etag,
+                    CopySourceRange=f"bytes={first}-{last}",
+                ),
             )
-        else:
-            obj.put(
-                Body="",
-                ACL="public-read",
-                Metadata=metadata,
+            for part_number, (first, last) in enumerate(
+                _iter_byte_ranges(record.size, chunksize), start=1
             )
+        )
+        parts = [
+            part
+            for _, part in run_tasks(
+                tasks,
+                max_workers=transfer_settings.max_concurrency,
+                description="Part copy",
+            )
+        ]
+        parts.sort(key=lambda part: part["PartNumber"])
+        client.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=dest_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except BaseException:
+        try:
+            client.abort_multipart_upload(
+                Bucket=bucket_name, Key=dest_key, UploadId=upload_id
+            )
+        except Exception:
+            logger.exception(
+                "Failed to abort multipart copy to %s (upload ID %s)",
+                dest_key,
+                upload_id,
+            )
+        raise
+
+
+def _iter_byte_ranges(size: int, chunksize: int) -> Iterator[Tuple[int, int]]:
+    """Iterate over the first and last (inclusive) byte of each part."""
+    for first in range(0, size, chunksize):
+        yield first, min(first + chunksize, size) - 1
+
+
+def _copy_part(
+    client: Any,
+    bucket_name: str,
+    dest_key: str,
+    upload_id: str,
+    part_number: int,
+    **args: Any,
+) -> Dict[str, Any]:
+    response = client.upload_part_copy(
+        Bucket=bucket_name,
+        Key=dest_key,
+        UploadId=upload_id,
+        PartNumber=part_number,
+        **args,
+    )
+    return {
+        "PartNumber": part_number,
+        "ETag": response["CopyPartResult"]["ETag"],
+    }
@@ -1,14 +1,39 @@
 """Delete an S3 directory."""
 
+from __future__ import annotations
+
+import itertools
 import logging
-from typing import Any, Dict, Optional, cast
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from ltdconveyor.s3.concurrency import DEFAULT_MAX_WORKERS, run_tasks
+from ltdconveyor.s3.context import S3Context, resolve_context
+from ltdconveyor.s3.exceptions import S3BatchError, S3Error
+from ltdconveyor.s3.listing import iter_objects
+from ltdconveyor.s3.progress import ProgressLogger
+
+__all__ = ["delete_dir", "delete_keys", "DeleteResult"]
+
+
+@dataclass
+class DeleteResult:
+    """Summary of a `delete_dir` operation."""
 
-import boto3
-from mypy_boto3_s3.type_defs import DeleteTypeDef
+    deleted: int = 0
+    """Number of objects deleted."""
 
-from ltdconveyor.s3.exceptions import S3Error
+    elapsed: float = 0.0
+    """Time taken, in seconds."""
 
-__all__ = ["delete_dir"]
+
+MAX_DELETE_BATCH_SIZE = 1000
+"""Maximum number of keys that the S3 ``DeleteObjects`` API accepts in a
+single request.
+"""
 
 
 def delete_dir(
@@ -17,9 +42,12 @@ def delete_dir(
     aws_access_key_id: Optional[str] = None,
     aws_secret_access_key: Optional[str] = None,
     aws_profile: Optional[str] = None,
-) -> None:
+    s3_context: Optional[S3Context] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> DeleteResult:
     """Delete all objects in the S3 bucket named ``bucket_name`` that are
-    found in the ``root_path`` directory.
+    found in the ``root_path`` directory, and the directory's redirect
+    object (named ``root_path`` without a trailing slash).
 
     Parameters
     ----------
@@ -36,54 +64,222 @@ def delete_dir(
         Name of AWS profile in :file:`~/.aws/credentials`. Use this instead
         of ``aws_access_key_id`` and ``aws_secret_access_key`` for file-based
         credentials.
+    s3_context : `ltdconveyor.s3.S3Context`, optional
+        A shared S3 session and connection pool. If set, the AWS credential
+        parameters are ignored.
+    max_workers : `int`, optional
+        Maximum number of ``DeleteObjects`` requests (of up to 1000 keys
+        each) in flight at once, and of concurrent listing requests.
+        Objects are deleted while the directory is still being listed.
+
+    Returns
+    -------
+    result : `DeleteResult`
+        The number of deleted objects and the time taken.
 
     Raises
     ------
     ltdconveyor.s3.S3Error
         Thrown by any unexpected faults from the S3 API.
+    ltdconveyor.s3.S3BatchError
+        Thrown if any objects couldn't be deleted, after retries. The
+        error lists each key that failed.
     """
     logger = logging.getLogger(__name__)
 
-    session = boto3.session.Session(
+    client = resolve_context(
+        s3_context,
         aws_access_key_id=aws_access_key_id,
         aws_secret_access_key=aws_secret_access_key,
+        aws_profile=aws_profile,
+        # Listing and deleting requests are concurrent
+        max_pool_connections=max(2 * max_workers, 10),
+    ).client
+
+    # Treat root_path as a directory, so that deleting "v1" doesn't also
+    # delete "v10/"
+    if root_path and not root_path.endswith("/"):
+        root_path += "/"
+
+    # The listing is consumed as batches are deleted, so listing and
+    # deleting overlap.
+    keys = itertools.chain(
+        _iter_redirect_object_key(client, bucket_name, root_path),
+        (
+            record.key
+            for record in iter_objects(
+                client,
+                bucket_name,
+                prefix=root_path,
+                max_workers=max_workers,
+                ordered=False,
+            )
+        ),
+    )
+    progress = ProgressLogger("Deleted", logger=logger)
+    try:
+        delete_keys(
+            client,
+            bucket_name,
+            keys,
+            max_workers=max_workers,
+            progress=progress,
+        )
+    except S3BatchError as e:
+        logger.error(
+            "Deleted %d objects from %r in %.1f s; %d objects failed",
+            progress.count,
+            root_path,
+            progress.elapsed,
+            len(e.failures),
+        )
+        raise
+    except Exception as e:
+        message = "Error deleting objects from %r" % root_path
+        logger.exception(message)
+        raise S3Error(message) from e
+    progress.finish()
+    return DeleteResult(deleted=progress.count, elapsed=progress.elapsed)
+
+
+def _iter_redirect_object_key(
+    client: Any, bucket_name: str, root_path: str
+) -> Iterator[str]:
+    """Yield the key of a directory's redirect object, if it exists.
+
+    The redirect object is named after the directory, without a trailing
+    slash, so it isn't listed with the directory's contents. Since it sorts
+    first, a one-key listing finds it without listing sibling prefixes
+    like ``v10/``.
+    """
+    key = root_path.rstrip("/")
+    if not key:
+        return
+    response = client.list_objects_v2(
+        Bucket=bucket_name, Prefix=key, MaxKeys=1
+    )
+    for item in response.get("Contents", []):
+        if item["Key"] == key:
+            yield key
+
+
+def delete_keys(
+    client: Any,
+    bucket_name: str,
+    keys: Iterable[str],
+    *,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    max_attempts: int = 3,
+    progress: Optional[ProgressLogger] = None,
+) -> int:
+    """Delete objects from a bucket in concurrent batches.
+
+    Keys are grouped into batches of up to 1000 (the limit of the
+    ``DeleteObjects`` API) and the batches are deleted concurrently. Keys
+    that S3 reports in a response's ``Errors`` are retried, on their own,
+    up to ``max_attempts`` times.
+
+    Parameters
+    ----------
+    client : boto3 S3 client
+        An S3 client, such as ``bucket.meta.client``.
+    bucket_name : `str`
+        Name of the S3 bucket.
+    keys : iterable of `str`
+        Keys of the objects to delete. The iterable is consumed lazily.
+    max_workers : `int`, optional
+        Maximum number of ``DeleteObjects`` requests in flight at once.
+    max_attempts : `int`, optional
+        Maximum number of times that deleting a key is attempted.
+    progress : `ltdconveyor.s3.progress.ProgressLogger`, optional
+        If set, updated with the number of deleted objects as each batch
+        completes.
+
+    Returns
+    -------
+    count : `int`
+        Number of objects deleted.
+
+    Raises
+    ------
+    ltdconveyor.s3.S3BatchError
+        Raised if any keys could not be deleted after ``max_attempts``. All
+        other batches are deleted first, and the error lists each key that
+        failed.
+    """
+    count = 0
+    failures: List[Tuple[str, BaseException]] = []
+    tasks = (
+        (
+            batch[0],
+            partial(_delete_batch, client, bucket_name, batch, max_attempts),
+        )
+        for batch in _iter_batches(keys, MAX_DELETE_BATCH_SIZE)
     )
-    s3 = session.resource("s3")
-    client = s3.meta.client
+    for _, (deleted, batch_failures) in run_tasks(
+        tasks, max_workers=max_workers, description="Delete"
+    ):
+        count += deleted
+        failures.extend(batch_failures)
+        if progress is not None:
+            progress.update(count=deleted)
+    if failures:
+        raise S3BatchError(
+            f"Delete failed for {len(failures)} object(s)", failures
+        )
+    return count
+
 
-    # Normalize directory path for searching patch prefixes of objects
-    if not root_path.endswith("/"):
-        root_path.rstrip("/")
+def _iter_batches(keys: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-    paginator = client.get_paginator("list_objects_v2")
-    pages = paginator.paginate(Bucket=bucket_name, Prefix=root_path)
 
-    keys: Dict[str, Any] = dict(Objects=[])
-    for item in pages.search("Contents"):
+def _delete_batch(
+    client: Any, bucket_name: str, keys: Sequence[str], max_attempts: int
+) -> Tuple[int, List[Tuple[str, BaseException]]]:
+    """Delete a batch of keys, retrying the keys that fail.
+
+    Returns the number of deleted keys and the keys that could not be
+    deleted, with their errors.
+    """
+    logger = logging.getLogger(__name__)
+    remaining = list(keys)
+    errors: Dict[str, BaseException] = {}
+    deleted = 0
+    for attempt in range(max_attempts):
+        if attempt > 0:
+            time.sleep(0.1 * 2**attempt)
+            logger.debug(
+                "Retrying deletion of %d object(s) (attempt %d)",
+                len(remaining),
+                attempt + 1,
+            )
         try:
-            keys["Objects"].append({"Key": item["Key"]})
-        except TypeError:  # item is None; nothing to delete
+            response = client.delete_objects(
+                Bucket=bucket_name,
+                Delete={
+                    "Objects": [{"Key": key} for key in remaining],
+                    "Quiet": True,
+                },
+            )
+        except Exception as e:
+            errors = {key: e for key in remaining}
             continue
-        # Delete immediately when 1000 objects are listed
-        # the delete_objects method can only take a maximum of 1000 keys
-        if len(keys["Objects"]) >= 1000:
-            try:
-                client.delete_objects(
-                    Bucket=bucket_name, Delete=cast(DeleteTypeDef, keys)
-                )
-            except Exception:
-                message = "Error deleting objects from %r" % root_path
-                logger.exception(message)
-                raise S3Error(message)
-            keys = dict(Objects=[])
-
-    # Delete remaining keys
-    if len(keys["Objects"]) > 0:
-        try:
-            client.delete_objects(
-                Bucket=bucket_name, Delete=cast(DeleteTypeDef, keys)
+        errors = {
+            error["Key"]: S3Error(
+                f"{error.get('Code', 'Error')}: {error.get('Message', '')}"
             )
-        except Exception:
-            message = "Error deleting objects from %r" % root_path
-            logger.exception(message)
-            raise S3Error(message)
+            for error in response.get("Errors", [])
+        }
+        deleted += len(remaining) - len(errors)
+        remaining = [key for key in remaining if key in errors]
+        if not remaining:
+            break
+    return deleted, sorted(errors.items())
@@ -1,7 +1,36 @@
-__all__ = ("S3Error",)
+__all__ = ("S3Error", "S3BatchError")
+
+from typing import List, Sequence, Tuple
 
 from ..exceptions import ConveyorError
 
 
 class S3Error(ConveyorError):
     """Error related to AWS S3 usage."""
+
+
+class S3BatchError(S3Error):
+    """Error raised when operations on one or more objects in a bulk S3
+    operation fail.
+
+    Parameters
+    ----------
+    message : `str`
+        Summary of the error.
+    failures : sequence of (`str`, `BaseException`) tuples
+        The name (typically the object key) and error of each failed
+        operation.
+    """
+
+    def __init__(
+        self, message: str, failures: Sequence[Tuple[str, BaseException]]
+    ) -> None:
+        self.message = message
+        self.failures: List[Tuple[str, BaseException]] = sorted(
+            failures, key=lambda failure: failure[0]
+        )
+        super().__init__(message)
+
+    def __str__(self) -> str:
+        lines = [f"- {name}: {error}" for name, error in self.failures]
+        return f"{self.message}\n\n" + "\n".join(lines)
@@ -0,0 +1,163 @@
+"""Streaming ``multipart/form-data`` bodies for presigned POST uploads."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+from collections.abc import AsyncIterator, Iterator, Mapping
+from concurrent.futures import Executor
+from typing import Any, BinaryIO, Optional, Union
+
+__all__ = ["DEFAULT_CHUNK_SIZE", "MultipartFileEncoder"]
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+"""Default size, in bytes, of the chunks that a file is streamed in."""
+
+
+class MultipartFileEncoder:
+    """A ``multipart/form-data`` request body of form fields followed by a
+    file, which is read from disk as the body is sent.
+
+    Pass the encoder as the ``data`` of a `requests` request, along with
+    its `content_type` header. Because the encoder has a length, requests
+    sends a ``Content-Length`` header rather than a chunked body (which S3
+    doesn't accept for POST uploads), and streams the body by iterating
+    over the encoder, so memory use doesn't depend on the file's size.
+
+    Parameters
+    ----------
+    fields : `dict`
+        Form fields, such as the fields of a presigned POST URL. They are
+        sent in order, before the file.
+    path : `str` or path-like
+        Path of the file.
+    file_field : `str`, optional
+        Name of the file's form field. S3 requires ``"file"``.
+    filename : `str`, optional
+        Name of the file sent in the form. The default is the file's base
+        name.
+    chunk_size : `int`, optional
+        Size, in bytes, of the chunks that the file is read and sent in.
+    size : `int`, optional
+        Size of the file, in bytes, if already known (such as from a
+        `ltdconveyor.site.SiteManifest`). By default, the file is stat'd.
+
+    Notes
+    -----
+    The body's length is computed from the file's size when the encoder
+    is created, so the file must not change until it's uploaded. The
+    encoder can be iterated over more than once, such as when a request is
+    redirected.
+
+    For asyncio clients such as `httpx.AsyncClient`, send `aiter_body`
+    instead, which reads the file in a thread pool.
+    """
+
+    def __init__(
+        self,
+        fields: Mapping[str, Any],
+        path: Union[str, os.PathLike[str]],
+        *,
+        file_field: str = "file",
+        filename: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        size: Optional[int] = None,
+    ) -> None:
+        self._path = os.fspath(path)
+        self._chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+        """The multipart boundary."""
+
+        if filename is None:
+            filename = os.path.basename(self._path)
+        head = b"".join(
+            self._encode_part_header(name)
+            + str(value).encode("utf-8")
+            + b"\r\n"
+            for name, value in fields.items()
+        )
+        self._head = head + self._encode_part_header(file_field, filename)
+        self._tail = f"\r\n--{self.boundary}--\r\n".encode("ascii")
+        self._file_size = os.stat(self._path).st_size if size is None else size
+
+    @property
+    def content_type(self) -> str:
+        """The ``Content-Type`` header of the request."""
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self._head
+        remaining = self._file_size
+        with open(self._path, "rb") as f:
+            while remaining > 0:
+                chunk = self._read_chunk(f, remaining)
+                remaining -= len(chunk)
+                yield chunk
+        yield self._tail
+
+    async def aiter_body(
+        self, executor: Optional[Executor] = None
+    ) -> AsyncIterator[bytes]:
+        """Iterate over the body without blocking the event loop.
+
+        The file is opened and read in chunks in a thread pool, so the
+        event loop only waits on the network while the body is sent.
+
+        Parameters
+        ----------
+        executor : `concurrent.futures.Executor`, optional
+            The executor to read the file in. The default is the event
+            loop's default executor.
+
+        Yields
+        ------
+        chunk : `bytes`
+            A chunk of the body.
+        """
+        loop = asyncio.get_running_loop()
+        yield self._head
+        remaining = self._file_size
+        f = await loop.run_in_executor(executor, open, self._path, "rb")
+        try:
+            while remaining > 0:
+                chunk = await loop.run_in_executor(
+                    executor, self._read_chunk, f, remaining
+                )
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            f.close()
+        yield self._tail
+
+    def _read_chunk(self, f: BinaryIO, remaining: int) -> bytes:
+        chunk = f.read(min(self._chunk_size, remaining))
+        if not chunk:
+            raise OSError(
+                f"{self._path} is shorter than when its upload started"
+            )
+        return chunk
+
+    def _encode_part_header(
+        self, name: str, filename: Optional[str] = None
+    ) -> bytes:
+        disposition = f'form-data; name="{_quote(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{_quote(filename)}"'
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: {disposition}\r\n\r\n"
+        ).encode("utf-8")
+
+
+def _quote(value: str) -> str:
+    """Escape a ``Content-Disposition`` parameter value, as browsers do."""
+    return (
+        value.replace("\\", "\\\\")
+        .replace('"', "%22")
+        .replace("\r", "%0D")
+        .replace("\n", "%0A")
+    )
@@ -0,0 +1,236 @@
+"""A persistent cache of local file digests for repeated syncs."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any, Dict, List, Set, Union
+
+from ltdconveyor.s3.checksum import (
+    DEFAULT_MULTIPART_CHUNKSIZE,
+    DEFAULT_MULTIPART_THRESHOLD,
+    FileDigest,
+    compute_file_digest,
+)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (Windows)
+    fcntl = None  # type: ignore[assignment]
+
+__all__ = ["HashCache"]
+
+_VERSION = 1
+
+# A file modified this recently may be modified again within the
+# resolution of its mtime, without changing its stat signature.
+_RACY_INTERVAL_NS = 2_000_000_000
+
+# Cache entry: [size, mtime_ns, inode, multipart threshold,
+# multipart chunksize, md5, etag]
+_Entry = List[Any]
+
+
+class HashCache:
+    """An on-disk cache of the MD5 digests and multipart ETags of local
+    files.
+
+    Entries are keyed by a file's path (relative to the directory being
+    synced) and validated by the file's size, modification time
+    (``st_mtime_ns``), and inode, so unchanged files aren't hashed again
+    by the next sync.
+
+    Parameters
+    ----------
+    path : `str` or path-like
+        Path of the cache file. The file is created by `save` if it
+        doesn't exist.
+
+    Notes
+    -----
+    The cache is loaded when it's created and only written by `save`.
+    `save` holds an exclusive lock on a ``.lock`` file next to the cache
+    while it merges the entries with the cache file on disk, and replaces
+    the cache file atomically, so concurrent syncs can share a cache.
+
+    `digest` is thread-safe.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike[str]]) -> None:
+        self._path = os.fspath(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = self._read()
+        # Entries as they were last read from (or written to) the file
+        self._loaded: Dict[str, _Entry] = dict(self._entries)
+        self._updated: Dict[str, _Entry] = {}
+        self._seen: Set[str] = set()
+        self.hits = 0
+        """Number of digests that were found in the cache."""
+
+        self.misses = 0
+        """Number of digests that were computed."""
+
+    @property
+    def path(self) -> str:
+        """Path of the cache file."""
+        return self._path
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def digest(
+        self,
+        local_path: Union[str, os.PathLike[str]],
+        key: str,
+        *,
+        multipart_threshold: int = DEFAULT_MULTIPART_THRESHOLD,
+        multipart_chunksize: int = DEFAULT_MULTIPART_CHUNKSIZE,
+    ) -> FileDigest:
+        """Get the digest of a file, from the cache if the file is
+        unchanged.
+
+        Parameters
+        ----------
+        local_path : `str` or path-like
+            Path of the local file.
+        key : `str`
+            The file's key in the cache, such as its path relative to the
+            directory being synced.
+        multipart_threshold : `int`, optional
+            Size, in bytes, at which files are uploaded in multiple parts.
+        multipart_chunksize : `int`, optional
+            Size, in bytes, of each part of a multipart upload.
+
+        Returns
+        -------
+        digest : `ltdconveyor.s3.checksum.FileDigest`
+            The file's size and checksums.
+        """
+        st = os.stat(local_path)
+        signature = [
+            st.st_size,
+            st.st_mtime_ns,
+            st.st_ino,
+            multipart_threshold,
+            multipart_chunksize,
+        ]
+        with self._lock:
+            self._seen.add(key)
+            entry = self._entries.get(key)
+            if entry is not None and entry[:5] == signature:
+                self.hits += 1
+                return FileDigest(size=entry[0], md5=entry[5], etag=entry[6])
+            self.misses += 1
+
+        digest = compute_file_digest(
+            local_path,
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+        )
+        if (
+            digest.size == st.st_size
+            and time.time_ns() - st.st_mtime_ns > _RACY_INTERVAL_NS
+        ):
+            entry = signature + [digest.md5, digest.etag]
+            with self._lock:
+                self._entries[key] = entry
+                self._updated[key] = entry
+        return digest
+
+    def save(self, *, prune: bool = False) -> None:
+        """Write the cache to disk.
+
+        The entries are merged with the cache file's current entries, so
+        entries written by other syncs since this cache was loaded are
+        kept.
+
+        Parameters
+        ----------
+        prune : `bool`, optional
+            If `True`, remove the entries that this cache loaded but whose
+            digests weren't requested from it (such as the entries of files
+            that a full sync didn't find), unless another sync has updated
+            them since.
+        """
+        logger = logging.getLogger(__name__)
+        with self._file_lock():
+            with self._lock:
+                entries = self._read()
+                entries.update(self._updated)
+                if prune:
+                    for key, entry in self._loaded.items():
+                        if key not in self._seen and entries.get(key) == entry:
+                            del entries[key]
+                self._write(entries)
+                self._entries = entries
+                self._loaded = dict(entries)
+                self._updated = {}
+        logger.debug(
+            "Saved %d entries to hash cache %s (%d hits, %d misses)",
+            len(entries),
+            self._path,
+            self.hits,
+            self.misses,
+        )
+
+    def _read(self) -> Dict[str, _Entry]:
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.getLogger(__name__).warning(
+                "Ignoring unreadable hash cache %s: %s", self._path, e
+            )
+            return {}
+        if not isinstance(data, dict) or data.get("version") != _VERSION:
+            return {}
+        return dict(data.get("files", {}))
+
+    def _write(self, entries: Dict[str, _Entry]) -> None:
+        dirname = os.path.dirname(os.path.abspath(self._path))
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=dirname, prefix=".hashcache-", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": _VERSION, "files": entries},
+                    f,
+                    separators=(",", ":"),
+                )
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+
+    @contextlib.contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold an exclusive lock that serializes saves between processes.
+
+        Without `fcntl`, saves are still atomic but concurrent saves may
+        drop each other's new entries.
+        """
+        if fcntl is None:
+            yield
+            return
+        lock_path = self._path + ".lock"
+        os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,357 @@
+"""In-memory index of the objects stored under a bucket directory."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ltdconveyor.s3.listing import ObjectRecord
+
+__all__ = ["BucketIndex"]
+
+# Compact per-object payload stored in the tree: (size, etag). The key is
+# reconstructed from the object's position in the tree.
+_Entry = Tuple[int, str]
+
+
+class _DirectoryNode:
+    """A directory in the prefix tree."""
+
+    __slots__ = ("files", "dirs")
+
+    def __init__(self) -> None:
+        self.files: Dict[str, _Entry] = {}
+        self.dirs: Dict[str, _DirectoryNode] = {}
+
+
+class BucketIndex:
+    """A prefix tree of the objects that exist under a ``bucket_root``
+    directory in an S3 bucket.
+
+    The index is built from a single listing of the bucket (see
+    `ltdconveyor.s3.listing.iter_objects`) and then answers directory
+    queries, like "which files are in this directory," without further
+    requests to S3.
+
+    Parameters
+    ----------
+    bucket_root : `str`
+        The root directory in the bucket that is indexed. Object keys are
+        stored relative to this directory.
+
+    Notes
+    -----
+    *Directory redirect objects* are objects named after a directory
+    (``dir1/dir2``, without a trailing slash). In the tree they appear as
+    a file in the parent directory with the same name as a subdirectory.
+    `list_filenames` omits these objects and `remove_directory` removes
+    them along with the directory's contents. The directory redirect object
+    of ``bucket_root`` itself is indexed under the name ``""``.
+
+    The index holds a record of every object under ``bucket_root``, so its
+    memory use grows with the number of objects (each stores only its name,
+    size, and ETag). Only the listing that it's built from is streamed.
+    """
+
+    def __init__(self, bucket_root: str) -> None:
+        self._bucket_root = bucket_root.rstrip("/")
+        if self._bucket_root:
+            self._key_prefix = self._bucket_root + "/"
+        else:
+            self._key_prefix = ""
+        self._root = _DirectoryNode()
+        self._root_object: Optional[_Entry] = None
+        self._count = 0
+
+    @classmethod
+    def from_records(
+        cls, bucket_root: str, records: Iterable[ObjectRecord]
+    ) -> BucketIndex:
+        """Create an index from a stream of object records.
+
+        Parameters
+        ----------
+        bucket_root : `str`
+            The root directory in the bucket that is indexed.
+        records : iterable of `ObjectRecord`
+            Object records, such as from
+            `ltdconveyor.s3.listing.iter_objects`. Records for keys outside
+            of ``bucket_root`` are ignored.
+
+        Returns
+        -------
+        index : `BucketIndex`
+            The populated index.
+        """
+        index = cls(bucket_root)
+        for record in records:
+            index.add(record)
+        return index
+
+    @property
+    def bucket_root(self) -> str:
+        """The indexed directory in the bucket (without a trailing
+        slash).
+        """
+        return self._bucket_root
+
+    @property
+    def key_prefix(self) -> str:
+        """The key prefix shared by all objects under ``bucket_root``."""
+        return self._key_prefix
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[ObjectRecord]:
+        return self.iter_records()
+
+    def add(self, record: ObjectRecord) -> None:
+        """Add, or replace, an object in the index.
+
+        Parameters
+        ----------
+        record : `ObjectRecord`
+            The object's record. Objects outside ``bucket_root`` are
+            ignored. Keys ending in ``/`` (folder placeholders) create a
+            directory but are not indexed as files.
+        """
+        entry: _Entry = (record.size, record.etag)
+        if self._bucket_root and record.key == self._bucket_root:
+            if self._root_object is None:
+                self._count += 1
+            self._root_object = entry
+            return
+        if not record.key.startswith(self._key_prefix):
+            return
+
+        parts = record.key[len(self._key_prefix) :].split("/")
+        node = self._root
+        for part in parts[:-1]:
+            node = node.dirs.setdefault(part, _DirectoryNode())
+        filename = parts[-1]
+        if filename == "":
+            return
+        if filename not in node.files:
+            self._count += 1
+        node.files[filename] = entry
+
+    def get(self, path: str) -> Optional[ObjectRecord]:
+        """Get the record of an object.
+
+        Parameters
+        ----------
+        path : `str`
+            Path of the object relative to ``bucket_root``.
+
+        Returns
+        -------
+        record : `ObjectRecord` or `None`
+            The object's record, or `None` if the object is not indexed.
+        """
+        dir_parts, filename = self._split_path(path)
+        if not dir_parts and filename == "":
+            if self._root_object is None:
+                return None
+            return self._make_record("", self._root_object)
+        node = self._find_node(dir_parts)
+        if node is None or filename not in node.files:
+            return None
+        return self._make_record(path.strip("/"), node.files[filename])
+
+    def list_filenames(self, dirname: str) -> List[str]:
+        """List the names of files at the root of a directory.
+
+        Parameters
+        ----------
+        dirname : `str`
+            Directory name relative to ``bucket_root``.
+
+        Returns
+        -------
+        filenames : `list` of `str`
+            Names of files in the directory. Directory redirect objects for
+            subdirectories are not included.
+        """
+        node = self._find_node(self._split_dirname(dirname))
+        if node is None:
+            return []
+        return [name for name in node.files if name not in node.dirs]
+
+    def list_dirnames(self, dirname: str) -> List[str]:
+        """List the names of subdirectories at the root of a directory.
+
+        Parameters
+        ----------
+        dirname : `str`
+            Directory name relative to ``bucket_root``.
+
+        Returns
+        -------
+        dirnames : `list` of `str`
+            Names of the subdirectories.
+        """
+        node = self._find_node(self._split_dirname(dirname))
+        if node is None:
+            return []
+        return list(node.dirs)
+
+    def remove(self, path: str) -> Optional[ObjectRecord]:
+        """Remove an object from the index.
+
+        Parameters
+        ----------
+        path : `str`
+            Path of the object relative to ``bucket_root``.
+
+        Returns
+        -------
+        record : `ObjectRecord` or `None`
+            The removed object's record, or `None` if the object was not
+            indexed.
+        """
+        record = self.get(path)
+        if record is None:
+            return None
+        dir_parts, filename = self._split_path(path)
+        if not dir_parts and filename == "":
+            self._root_object = None
+        else:
+            node = self._find_node(dir_parts)
+            assert node is not None
+            del node.files[filename]
+        self._count -= 1
+        return record
+
+    def remove_directory(self, dirname: str) -> List[ObjectRecord]:
+        """Remove a directory, its contents, and its directory redirect
+        object from the index.
+
+        Parameters
+        ----------
+        dirname : `str`
+            Directory name relative to ``bucket_root``. Removing the root
+            directory empties the index.
+
+        Returns
+        -------
+        records : `list` of `ObjectRecord`
+            Records of all removed objects.
+        """
+        parts = self._split_dirname(dirname)
+        records = list(self.iter_records(dirname))
+        if not parts:
+            self._root = _DirectoryNode()
+            self._root_object = None
+            self._count = 0
+            return records
+
+        parent = self._find_node(parts[:-1])
+        if parent is None:
+            return records
+        parent.dirs.pop(parts[-1], None)
+        redirect_entry = parent.files.pop(parts[-1], None)
+        if redirect_entry is not None:
+            records.append(self._make_record("/".join(parts), redirect_entry))
+        self._count -= len(records)
+        return records
+
+    def iter_records(self, dirname: str = "") -> Iterator[ObjectRecord]:
+        """Iterate over the records of all objects in a directory and its
+        subdirectories.
+
+        Records are generated lazily from the tree, so the iteration does
+        not create a second copy of the index.
+
+        Parameters
+        ----------
+        dirname : `str`, optional
+            Directory name relative to ``bucket_root``. The default is the
+            root directory (which includes the root directory redirect
+            object).
+
+        Yields
+        ------
+        record : `ObjectRecord`
+            Object records, in depth-first order.
+        """
+        parts = self._split_dirname(dirname)
+        if not parts and self._root_object is not None:
+            yield self._make_record("", self._root_object)
+        node = self._find_node(parts)
+        if node is None:
+            return
+        stack: List[Tuple[str, _DirectoryNode]] = [("/".join(parts), node)]
+        while stack:
+            path, node = stack.pop()
+            base = f"{path}/" if path else ""
+            for name, entry in node.files.items():
+                yield self._make_record(base + name, entry)
+            for name in reversed(list(node.dirs)):
+                stack.append((base + name, node.dirs[name]))
+
+    def walk(
+        self, dirname: str = ""
+    ) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Walk the directory tree from the top down, like `os.walk`.
+
+        Parameters
+        ----------
+        dirname : `str`, optional
+            Directory to start from, relative to ``bucket_root``. The
+            default is the root directory.
+
+        Yields
+        ------
+        dirname : `str`
+            Directory name relative to ``bucket_root`` (``""`` for the root
+            directory).
+        dirnames : `list` of `str`
+            Names of subdirectories.
+        filenames : `list` of `str`
+            Names of files, excluding directory redirect objects.
+        """
+        parts = self._split_dirname(dirname)
+        node = self._find_node(parts)
+        if node is None:
+            return
+        stack: List[Tuple[str, _DirectoryNode]] = [("/".join(parts), node)]
+        while stack:
+            path, node = stack.pop()
+            yield (
+                path,
+                list(node.dirs),
+                [name for name in node.files if name not in node.dirs],
+            )
+            base = f"{path}/" if path else ""
+            for name in reversed(list(node.dirs)):
+                stack.append((base + name, node.dirs[name]))
+
+    def _make_record(self, path: str, entry: _Entry) -> ObjectRecord:
+        if path == "":
+            key = self._bucket_root
+        else:
+            key = self._key_prefix + path
+        return ObjectRecord(key=key, size=entry[0], etag=entry[1])
+
+    def _find_node(self, parts: Sequence[str]) -> Optional[_DirectoryNode]:
+        node = self._root
+        for part in parts:
+            child = node.dirs.get(part)
+            if child is None:
+                return None
+            node = child
+        return node
+
+    @staticmethod
+    def _split_dirname(dirname: str) -> List[str]:
+        dirname = dirname.strip("/")
+        if dirname in ("", "."):
+            return []
+        return [part for part in dirname.split("/") if part != "."]
+
+    @classmethod
+    def _split_path(cls, path: str) -> Tuple[List[str], str]:
+        parts = cls._split_dirname(path)
+        if not parts:
+            return [], ""
+        return parts[:-1], parts[-1]
@@ -0,0 +1,217 @@
+"""Streaming listings of objects in an S3 bucket."""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Any, Deque, Dict, Iterator, List, Mapping, NamedTuple
+
+__all__ = ["ObjectRecord", "iter_objects"]
+
+_DELIMITER = "/"
+
+
+class ObjectRecord(NamedTuple):
+    """Summary of an object in an S3 bucket, as reported by a bucket
+    listing.
+    """
+
+    key: str
+    """The object's full key name."""
+
+    size: int
+    """The object's size, in bytes."""
+
+    etag: str
+    """The object's ETag, without surrounding quotes."""
+
+    @classmethod
+    def from_listing_item(cls, item: Mapping[str, Any]) -> ObjectRecord:
+        """Create a record from an item in the ``Contents`` of a
+        ``list_objects_v2`` response.
+        """
+        return cls(
+            key=item["Key"],
+            size=item.get("Size", 0),
+            etag=item.get("ETag", "").strip('"'),
+        )
+
+
+def iter_objects(
+    client: Any,
+    bucket_name: str,
+    prefix: str = "",
+    *,
+    max_workers: int = 1,
+    ordered: bool = True,
+) -> Iterator[ObjectRecord]:
+    """Iterate over all objects in a bucket that share a key prefix.
+
+    The listing is made with the paginated ``list_objects_v2`` API and
+    records are yielded one page at a time, so memory use stays bounded
+    regardless of how many objects exist under the prefix.
+
+    With ``max_workers`` greater than one, the prefix is instead listed
+    with ``Delimiter="/"`` and each sub-prefix (directory) that's found is
+    listed concurrently, so large trees are listed in roughly
+    ``max_workers`` times fewer round trips.
+
+    Parameters
+    ----------
+    client : boto3 S3 client
+        An S3 client, such as ``session.client("s3")`` or
+        ``bucket.meta.client``.
+    bucket_name : `str`
+        Name of the S3 bucket.
+    prefix : `str`, optional
+        Key prefix to list. The default is to list the entire bucket.
+    max_workers : `int`, optional
+        Maximum number of concurrent ``list_objects_v2`` requests.
+    ordered : `bool`, optional
+        If `True` (default), records are yielded in lexicographic key
+        order. If `False`, a concurrent listing yields each directory's
+        records as soon as the directory is listed, which avoids holding
+        directories that are listed ahead of their turn in memory.
+
+    Yields
+    ------
+    record : `ObjectRecord`
+        A summary of each object.
+    """
+    if max_workers <= 1:
+        paginator = client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for item in page.get("Contents", []):
+                yield ObjectRecord.from_listing_item(item)
+        return
+
+    fan_out = _PrefixFanOut(client, bucket_name, max_workers)
+    try:
+        fan_out.add(prefix)
+        if ordered:
+            yield from _iter_ordered(fan_out, prefix)
+        else:
+            while fan_out.busy:
+                for listed_prefix in fan_out.wait():
+                    yield from fan_out.pop(listed_prefix).records
+    finally:
+        fan_out.close()
+
+
+class _Level(NamedTuple):
+    """The objects and sub-prefixes directly under a prefix."""
+
+    records: List[ObjectRecord]
+    prefixes: List[str]
+
+
+def _list_level(client: Any, bucket_name: str, prefix: str) -> _Level:
+    """List one level of a prefix, with ``Delimiter="/"``."""
+    records: List[ObjectRecord] = []
+    prefixes: List[str] = []
+    paginator = client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket_name, Prefix=prefix, Delimiter=_DELIMITER
+    ):
+        for item in page.get("Contents", []):
+            records.append(ObjectRecord.from_listing_item(item))
+        for item in page.get("CommonPrefixes", []):
+            prefixes.append(item["Prefix"])
+    return _Level(records=records, prefixes=prefixes)
+
+
+class _PrefixFanOut:
+    """Schedule concurrent listings of the levels of a prefix tree.
+
+    Each listed level's sub-prefixes are queued to be listed in turn. All
+    scheduling happens in the consuming thread; the worker threads only
+    make ``list_objects_v2`` requests.
+    """
+
+    def __init__(
+        self, client: Any, bucket_name: str, max_workers: int
+    ) -> None:
+        self._client = client
+        self._bucket_name = bucket_name
+        self._max_pending = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending: Dict[Future[_Level], str] = {}
+        self._queued: Deque[str] = deque()
+        self._results: Dict[str, _Level] = {}
+
+    @property
+    def busy(self) -> bool:
+        """Whether any prefixes are being listed or waiting to be listed."""
+        return bool(self._pending or self._queued)
+
+    def add(self, prefix: str) -> None:
+        """Queue a prefix to be listed."""
+        self._queued.append(prefix)
+        self._fill()
+
+    def wait(self) -> List[str]:
+        """Wait for at least one listing to finish, and queue the
+        sub-prefixes of each finished listing.
+
+        Returns
+        -------
+        prefixes : `list` of `str`
+            The prefixes that were listed, whose levels can be taken with
+            `pop`.
+        """
+        done, _ = wait_futures(self._pending, return_when=FIRST_COMPLETED)
+        listed: List[str] = []
+        for future in done:
+            prefix = self._pending.pop(future)
+            level = future.result()
+            self._results[prefix] = level
+            self._queued.extend(level.prefixes)
+            listed.append(prefix)
+        self._fill()
+        return listed
+
+    def pop(self, prefix: str) -> _Level:
+        """Take the listing of a prefix, waiting for it if necessary."""
+        while prefix not in self._results:
+            if prefix in self._queued:
+                # Needed now, so list it ahead of the queue
+                self._queued.remove(prefix)
+                self._submit(prefix)
+            self.wait()
+        return self._results.pop(prefix)
+
+    def close(self) -> None:
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _fill(self) -> None:
+        while self._queued and len(self._pending) < self._max_pending:
+            self._submit(self._queued.popleft())
+
+    def _submit(self, prefix: str) -> None:
+        future = self._executor.submit(
+            _list_level, self._client, self._bucket_name, prefix
+        )
+        self._pending[future] = prefix
+
+
+def _iter_ordered(
+    fan_out: _PrefixFanOut, prefix: str
+) -> Iterator[ObjectRecord]:
+    """Merge the listing of a prefix's level with the listings of its
+    sub-prefixes, in key order.
+
+    Every key under a sub-prefix such as ``"a/"`` sorts after the keys of
+    the level that precede ``"a/"`` and before those that follow it, so
+    each sub-prefix's records can be yielded in its place.
+    """
+    level = fan_out.pop(prefix)
+    items: List[Any] = [*level.records, *level.prefixes]
+    items.sort(key=lambda item: item if isinstance(item, str) else item.key)
+    for item in items:
+        if isinstance(item, str):
+            yield from _iter_ordered(fan_out, item)
+        else:
+            yield item
@@ -0,0 +1,267 @@
+"""Sync manifests: compact records of the objects under a bucket
+directory, stored as an object in that directory.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from botocore.exceptions import ClientError
+
+from ltdconveyor.s3.listing import ObjectRecord
+
+__all__ = [
+    "MANIFEST_FILENAME",
+    "DEFAULT_MANIFEST_MAX_AGE",
+    "ManifestEntry",
+    "SyncManifest",
+    "compute_metadata_hash",
+    "get_manifest_key",
+    "read_manifest",
+    "write_manifest",
+]
+
+MANIFEST_FILENAME = ".ltd-sync-manifest.json.gz"
+"""Name of the manifest object in the root of a synced directory."""
+
+DEFAULT_MANIFEST_MAX_AGE = timedelta(days=7)
+"""Default age after which a manifest is considered stale."""
+
+_VERSION = 1
+
+
+class ManifestEntry(NamedTuple):
+    """A manifest's record of an object."""
+
+    key: str
+    """The object's key."""
+
+    size: int
+    """Size of the object, in bytes."""
+
+    etag: str
+    """The object's ETag, without quotes."""
+
+    content_type: Optional[str] = None
+    """The object's ``Content-Type``, if known."""
+
+    metadata_hash: Optional[str] = None
+    """Hash of the object's headers (see `compute_metadata_hash`), if
+    known.
+    """
+
+    def to_record(self) -> ObjectRecord:
+        """Convert to an `~ltdconveyor.s3.listing.ObjectRecord`."""
+        return ObjectRecord(key=self.key, size=self.size, etag=self.etag)
+
+
+class SyncManifest(NamedTuple):
+    """A manifest of the objects under a bucket directory."""
+
+    bucket_root: str
+    """The directory in the bucket (without a trailing slash)."""
+
+    created: datetime
+    """When the manifest was created."""
+
+    entries: List[ManifestEntry]
+    """Records of the objects in the directory, excluding the manifest."""
+
+    def is_stale(
+        self,
+        bucket_root: str,
+        max_age: timedelta = DEFAULT_MANIFEST_MAX_AGE,
+    ) -> bool:
+        """Test if the manifest can't be used in place of a listing.
+
+        Parameters
+        ----------
+        bucket_root : `str`
+            The directory that the manifest is expected to describe. A
+            manifest copied from another directory is stale.
+        max_age : `datetime.timedelta`, optional
+            Maximum age of the manifest.
+
+        Returns
+        -------
+        stale : `bool`
+            `True` if the manifest is stale.
+        """
+        if self.bucket_root != bucket_root.rstrip("/"):
+            return True
+        return datetime.now(timezone.utc) - self.created > max_age
+
+    def records(self) -> Iterator[ObjectRecord]:
+        """Iterate over the manifest's entries as object records."""
+        for entry in self.entries:
+            yield entry.to_record()
+
+
+def get_manifest_key(bucket_root: str) -> str:
+    """Get the key of the manifest object of a bucket directory.
+
+    Parameters
+    ----------
+    bucket_root : `str`
+        The directory in the bucket.
+
+    Returns
+    -------
+    key : `str`
+        Key of the manifest object.
+    """
+    bucket_root = bucket_root.rstrip("/")
+    if bucket_root:
+        return f"{bucket_root}/{MANIFEST_FILENAME}"
+    return MANIFEST_FILENAME
+
+
+def compute_metadata_hash(
+    *,
+    content_type: Optional[str] = None,
+    metadata: Optional[Dict[str, str]] = None,
+    cache_control: Optional[str] = None,
+    acl: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+) -> str:
+    """Hash the headers that an object is uploaded with.
+
+    Parameters
+    ----------
+    content_type : `str`, optional
+        The ``Content-Type`` header.
+    metadata : `dict`, optional
+        The ``x-amz-meta-*`` headers.
+    cache_control : `str`, optional
+        The ``Cache-Control`` header.
+    acl : `str`, optional
+        The pre-canned ACL.
+    content_encoding : `str`, optional
+        The ``Content-Encoding`` header.
+
+    Returns
+    -------
+    metadata_hash : `str`
+        Hex-encoded SHA-256 hash of the headers.
+    """
+    headers: List[Any] = [content_type, metadata or {}, cache_control, acl]
+    if content_encoding is not None:
+        # Only appended when set, so hashes in existing manifests stay valid
+        headers.append(content_encoding)
+    data = json.dumps(headers, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def read_manifest(
+    client: Any, bucket_name: str, bucket_root: str
+) -> Optional[SyncManifest]:
+    """Read the manifest object of a bucket directory.
+
+    Parameters
+    ----------
+    client : boto3 S3 client
+        An S3 client.
+    bucket_name : `str`
+        Name of the S3 bucket.
+    bucket_root : `str`
+        The directory in the bucket.
+
+    Returns
+    -------
+    manifest : `SyncManifest` or `None`
+        The manifest, or `None` if it doesn't exist or can't be read.
+    """
+    logger = logging.getLogger(__name__)
+    key = get_manifest_key(bucket_root)
+    try:
+        response = client.get_object(Bucket=bucket_name, Key=key)
+        data = json.loads(gzip.decompress(response["Body"].read()))
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code not in ("NoSuchKey", "404"):
+            logger.warning("Can't read sync manifest %s: %s", key, e)
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Can't read sync manifest %s: %s", key, e)
+        return None
+
+    if not isinstance(data, dict) or data.get("version") != _VERSION:
+        logger.debug("Ignoring sync manifest %s with unknown version", key)
+        return None
+    try:
+        return SyncManifest(
+            bucket_root=data["bucket_root"],
+            created=datetime.fromisoformat(data["created"]),
+            entries=[ManifestEntry(*item) for item in data["objects"]],
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning("Can't read sync manifest %s: %s", key, e)
+        return None
+
+
+def write_manifest(
+    client: Any,
+    bucket_name: str,
+    bucket_root: str,
+    entries: Iterable[ManifestEntry],
+    *,
+    acl: Optional[str] = None,
+) -> SyncManifest:
+    """Write the manifest object of a bucket directory.
+
+    Parameters
+    ----------
+    client : boto3 S3 client
+        An S3 client.
+    bucket_name : `str`
+        Name of the S3 bucket.
+    bucket_root : `str`
+        The directory in the bucket.
+    entries : iterable of `ManifestEntry`
+        Records of the objects in the directory.
+    acl : `str`, optional
+        The pre-canned AWS access control list to apply to the manifest,
+        which should be the same as the directory's other objects.
+
+    Returns
+    -------
+    manifest : `SyncManifest`
+        The manifest that was written.
+    """
+    manifest = SyncManifest(
+        bucket_root=bucket_root.rstrip("/"),
+        created=datetime.now(timezone.utc),
+        entries=sorted(entries, key=lambda entry: entry.key),
+    )
+    data = {
+        "version": _VERSION,
+        "bucket_root": manifest.bucket_root,
+        "created": manifest.created.isoformat(),
+        "objects": [list(entry) for entry in manifest.entries],
+    }
+    body = gzip.compress(
+        json.dumps(data, separators=(",", ":")).encode("utf-8")
+    )
+    args: Dict[str, Any] = {}
+    if acl is not None:
+        args["ACL"] = acl
+    client.put_object(
+        Bucket=bucket_name,
+        Key=get_manifest_key(bucket_root),
+        Body=body,
+        ContentType="application/gzip",
+        CacheControl="no-store",
+        **args,
+    )
+    logging.getLogger(__name__).debug(
+        "Wrote sync manifest of %d objects (%d bytes)",
+        len(manifest.entries),
+        len(body),
+    )
+    return manifest
@@ -9,18 +9,25 @@ from __future__ import annotations
 
 import logging
 import mimetypes
+from collections.abc import Callable, Iterator
 from copy import deepcopy
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from ltdconveyor.exceptions import ConveyorError
+from ltdconveyor.s3.concurrency import DEFAULT_MAX_WORKERS, run_tasks
 from ltdconveyor.s3.exceptions import S3Error
+from ltdconveyor.s3.formdata import MultipartFileEncoder
+from ltdconveyor.site import SiteManifest, scan_site
 
 if TYPE_CHECKING:
     from pathlib import Path
 
 __all__ = [
+    "create_session",
     "prescan_directory",
     "upload_dir",
     "upload_file",
@@ -28,9 +35,31 @@ __all__ = [
 ]
 
 
-def prescan_directory(
-    base_dir: Path, _current_dir: Optional[Path] = None
-) -> List[str]:
+def create_session(max_workers: int = DEFAULT_MAX_WORKERS) -> requests.Session:
+    """Create an HTTP session for concurrent uploads with presigned POST
+    URLs.
+
+    Parameters
+    ----------
+    max_workers : `int`, optional
+        Number of concurrent uploads. The session keeps up to this many
+        connections open to each host, so uploads reuse connections.
+
+    Returns
+    -------
+    session : `requests.Session`
+        The session. Close it when the uploads are complete.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=max_workers, pool_maxsize=max_workers
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def prescan_directory(base_dir: Path) -> List[str]:
     """Make a list of all directories in a site, including the root
     directory.
 
@@ -48,15 +77,14 @@ def prescan_directory(
         A list of directory names, relative to the root directory. The root
         directory is represented by ``"/"``. All directory names end with
         ``"/"``.
+
+    See also
+    --------
+    ltdconveyor.site.scan_site
+        Scans the files as well, so that a site is only scanned once for
+        both registering and uploading a build.
     """
-    dirs = []
-    if _current_dir is None:
-        _current_dir = base_dir
-    dirs.append(format_relative_dirname(_current_dir, base_dir))
-    for path in _current_dir.iterdir():
-        if path.is_dir():
-            dirs.extend(prescan_directory(base_dir, _current_dir=path))
-    return dirs
+    return list(scan_site(base_dir).dirnames)
 
 
 def format_relative_dirname(directory: Path, base_directory: Path) -> str:
@@ -94,7 +122,9 @@ def upload_dir(
     *,
     post_urls: Dict[str, Any],
     base_dir: Path,
-    _current_dir: Optional[Path] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    session: Optional[requests.Session] = None,
+    site: Optional[SiteManifest] = None,
 ) -> None:
     """Upload a local directory of files to S3 for an LSST the Docs build.
 
@@ -108,6 +138,24 @@ def upload_dir(
         `~ltdconveyor.keeper.register_build`).
     base_dir : `pathlib.Path`
         Base directory of the site.
+    max_workers : `int`, optional
+        Maximum number of files uploaded concurrently, and of directories
+        scanned concurrently if ``site`` isn't given.
+    session : `requests.Session`, optional
+        HTTP session to upload with, such as one from `create_session`.
+        By default, a session is created for this upload.
+    site : `ltdconveyor.site.SiteManifest`, optional
+        The scanned contents of ``base_dir``, if already scanned. By default,
+        ``base_dir`` is scanned.
+
+    Raises
+    ------
+    ltdconveyor.exceptions.ConveyorError
+        Raised, before any files are uploaded, if a directory doesn't have a
+        presigned POST URL.
+    ltdconveyor.s3.S3BatchError
+        Raised if an upload fails. Uploads that haven't started are
+        cancelled.
 
     See also
     --------
@@ -115,34 +163,55 @@ def upload_dir(
     """
     logger = logging.getLogger(__name__)
 
-    if _current_dir is None:
-        _current_dir = base_dir
-
-    relative_dir = format_relative_dirname(_current_dir, base_dir)
-    try:
-        post_url = post_urls[relative_dir]
-    except KeyError:
-        logger.exception(
-            "A presigned POST URL is not available for the " "%s directory",
-            relative_dir,
-        )
-        raise ConveyorError
+    manifest = (
+        site
+        if site is not None
+        else scan_site(base_dir, max_workers=max_workers)
+    )
 
-    for path in _current_dir.iterdir():
-        if path.is_file():
-            upload_file(
-                local_path=path,
+    # Check that every directory has a URL before uploading anything
+    for relative_dir in manifest.dirnames:
+        if relative_dir not in post_urls:
+            logger.error(
+                "A presigned POST URL is not available for the "
+                "%s directory",
+                relative_dir,
+            )
+            raise ConveyorError
+
+    def iter_tasks() -> Iterator[Tuple[str, Callable[[], None]]]:
+        for site_file in manifest.files:
+            post_url = post_urls[site_file.dirname]
+            yield site_file.path, partial(
+                upload_file,
+                local_path=manifest.local_path(site_file),
                 post_url=post_url["url"],
                 post_fields=post_url["fields"],
-            )
-        elif path.is_dir():
-            upload_dir(
-                post_urls=post_urls, base_dir=base_dir, _current_dir=path
+                session=http_session,
+                content_type=site_file.content_type,
             )
 
+    http_session = session or create_session(max_workers)
+    try:
+        for _ in run_tasks(
+            iter_tasks(),
+            max_workers=max_workers,
+            description="Upload",
+            fail_fast=True,
+        ):
+            pass
+    finally:
+        if session is None:
+            http_session.close()
+
 
 def upload_file(
-    *, local_path: Path, post_url: str, post_fields: Dict[str, Any]
+    *,
+    local_path: Path,
+    post_url: str,
+    post_fields: Dict[str, Any],
+    session: Optional[requests.Session] = None,
+    content_type: Optional[str] = None,
 ) -> None:
     """Upload a file using a presigned POST URL to S3.
 
@@ -157,6 +226,11 @@ def upload_file(
     post_fields : `dict`
         Dictionary of fields for the POST. Generally these fields are created
         by the LST Keeper API server when it generates the presigned URLs.
+    session : `requests.Session`, optional
+        HTTP session to upload with, to reuse its connections.
+    content_type : `str`, optional
+        The file's ``Content-Type``. By default, it's guessed from the file
+        name.
 
     Raises
     ------
@@ -170,17 +244,18 @@ def upload_file(
     post_fields = deepcopy(post_fields)
 
     # Detect the Content-Type. This is a required field for the post URL.
-    content_type, content_encoding = mimetypes.guess_type(
-        filename, strict=False
-    )
+    if content_type is None:
+        content_type, _ = mimetypes.guess_type(filename, strict=False)
     if content_type is not None:
         post_fields["Content-Type"] = content_type
     else:
         post_fields["Content-Type"] = "application/octet-stream"
 
-    with open(local_path, "rb") as f:
-        files = {"file": (filename, f)}
-        http_response = requests.post(post_url, data=post_fields, files=files)
+    # Stream the file rather than encoding the whole body in memory
+    body = MultipartFileEncoder(post_fields, local_path, filename=filename)
+    http_response = (session or requests).post(
+        post_url, data=body, headers={"Content-Type": body.content_type}
+    )
     if http_response.status_code == 204:
         logger.debug(
             "Uploaded %s using presigned POST URL fields %s",
@@ -196,10 +271,17 @@ def upload_file(
             post_fields,
             http_response.text,
         )
-        raise S3Error
+        raise S3Error(
+            f"Error uploading {local_path} (code {http_response.status_code})"
+        )
 
 
-def upload_directory_objects(*, post_urls: Dict[str, Any]) -> None:
+def upload_directory_objects(
+    *,
+    post_urls: Dict[str, Any],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    session: Optional[requests.Session] = None,
+) -> None:
     """Upload directory redirect objects for an LSST the Docs product build.
 
     Parameters
@@ -210,6 +292,17 @@ def upload_directory_objects(*, post_urls: Dict[str, Any]) -> None:
         presigned post POST URLs and fields for each directory in the site
         being uploaded (see the ``dirnames`` parameter to
         `~ltdconveyor.keeper.register_build`).
+    max_workers : `int`, optional
+        Maximum number of objects uploaded concurrently.
+    session : `requests.Session`, optional
+        HTTP session to upload with, such as one from `create_session`.
+        By default, a session is created for this upload.
+
+    Raises
+    ------
+    ltdconveyor.s3.S3BatchError
+        Raised if an upload fails. Uploads that haven't started are
+        cancelled.
 
     See also
     --------
@@ -223,20 +316,50 @@ def upload_directory_objects(*, post_urls: Dict[str, Any]) -> None:
     Docs Fastly configuration looks for this header, and when detected,
     redirects the request to the associated ``*/index.html`` object.
     """
+    http_session = session or create_session(max_workers)
+    try:
+        for _ in run_tasks(
+            (
+                (
+                    dirname,
+                    partial(
+                        _upload_directory_object,
+                        dirname,
+                        post_url,
+                        http_session,
+                    ),
+                )
+                for dirname, post_url in post_urls.items()
+            ),
+            max_workers=max_workers,
+            description="Directory object upload",
+            fail_fast=True,
+        ):
+            pass
+    finally:
+        if session is None:
+            http_session.close()
+
+
+def _upload_directory_object(
+    dirname: str, post_url: Dict[str, Any], session: requests.Session
+) -> None:
     logger = logging.getLogger(__name__)
-    for dirname, post_url in post_urls.items():
-        url = post_url["url"]
-        fields = post_url["fields"]
-        files = {"file": ("", "")}
-        http_response = requests.post(url, data=fields, files=files)
-        if http_response.status_code == 204:
-            logger.debug("Uploaded directory object for %s", dirname)
-        else:
-            logger.error(
-                "Error uploading directory object for %s (code %i) using "
-                "presigned POST URL fields %s",
-                dirname,
-                http_response.status_code,
-                fields,
-            )
-            raise S3Error
+    url = post_url["url"]
+    fields = post_url["fields"]
+    files = {"file": ("", "")}
+    http_response = session.post(url, data=fields, files=files)
+    if http_response.status_code == 204:
+        logger.debug("Uploaded directory object for %s", dirname)
+    else:
+        logger.error(
+            "Error uploading directory object for %s (code %i) using "
+            "presigned POST URL fields %s",
+            dirname,
+            http_response.status_code,
+            fields,
+        )
+        raise S3Error(
+            f"Error uploading directory object for {dirname} "
+            f"(code {http_response.status_code})"
+        )
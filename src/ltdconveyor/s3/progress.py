@@ -0,0 +1,84 @@
+"""Progress and throughput logging for bulk S3 operations."""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Optional
+
+__all__ = ["ProgressLogger"]
+
+
+class ProgressLogger:
+    """Log the progress and throughput of a bulk S3 operation.
+
+    `update` should be called from a single thread, such as the thread that
+    consumes the results of `ltdconveyor.s3.concurrency.run_tasks`.
+
+    Parameters
+    ----------
+    description : `str`
+        Description of the operation, such as ``"Copied"``.
+    interval : `float`, optional
+        Minimum time, in seconds, between progress messages.
+    logger : `logging.Logger`, optional
+        The logger. The default is this module's logger.
+    """
+
+    def __init__(
+        self,
+        description: str,
+        *,
+        interval: float = 10.0,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.description = description
+        self.interval = interval
+        self.count = 0
+        """Number of objects processed."""
+
+        self.nbytes = 0
+        """Number of bytes processed."""
+
+        self._logger = logger or logging.getLogger(__name__)
+        self._start = time.monotonic()
+        self._last_log = self._start
+
+    @property
+    def elapsed(self) -> float:
+        """Time, in seconds, since the operation started."""
+        return time.monotonic() - self._start
+
+    def update(self, count: int = 1, nbytes: int = 0) -> None:
+        """Record processed objects, and log the progress if ``interval``
+        has passed since the last message.
+
+        Parameters
+        ----------
+        count : `int`, optional
+            Number of objects processed.
+        nbytes : `int`, optional
+            Number of bytes processed.
+        """
+        self.count += count
+        self.nbytes += nbytes
+        now = time.monotonic()
+        if now - self._last_log >= self.interval:
+            self._last_log = now
+            self._log()
+
+    def finish(self) -> None:
+        """Log the final totals and throughput."""
+        self._log()
+
+    def _log(self) -> None:
+        elapsed = max(self.elapsed, 1e-6)
+        self._logger.info(
+            "%s %d objects (%.1f MB) in %.1f s: %.1f objects/s, %.2f MB/s",
+            self.description,
+            self.count,
+            self.nbytes / 1e6,
+            elapsed,
+            self.count / elapsed,
+            self.nbytes / 1e6 / elapsed,
+        )
@@ -0,0 +1,114 @@
+"""Multipart transfer settings for uploads of large files."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+from boto3.s3.transfer import TransferConfig
+
+from ltdconveyor.s3.checksum import (
+    DEFAULT_MULTIPART_CHUNKSIZE,
+    DEFAULT_MULTIPART_THRESHOLD,
+    adjust_chunksize,
+)
+
+__all__ = ["TransferSettings"]
+
+_MiB = 1024 * 1024
+
+_TARGET_PARTS = 1000
+"""Target maximum number of parts when the part size is chosen
+automatically.
+"""
+
+
+@dataclass(frozen=True)
+class TransferSettings:
+    """Settings for multipart uploads of individual files.
+
+    These settings are used to create the boto3 `TransferConfig` for each
+    file and, in incremental syncs, to compute the multipart ETag that S3
+    assigns to the file, so the two always agree.
+    """
+
+    multipart_threshold: int = DEFAULT_MULTIPART_THRESHOLD
+    """Size, in bytes, at which files are uploaded in multiple parts."""
+
+    multipart_chunksize: Optional[int] = None
+    """Size, in bytes, of each part. If `None`, the part size is chosen by
+    file size: the default of 8 MiB, doubled until the file has no more than
+    1000 parts.
+    """
+
+    max_concurrency: int = 4
+    """Maximum number of parts of a single file that are uploaded
+    concurrently. This is in addition to the concurrency across files in
+    `ltdconveyor.s3.upload_dir`.
+    """
+
+    max_memory: int = 256 * _MiB
+    """Approximate cap, in bytes, on the part data of a single file that is
+    buffered in memory while it's uploaded.
+    """
+
+    def __post_init__(self) -> None:
+        if self.multipart_threshold < 5 * _MiB:
+            raise ValueError("multipart_threshold must be at least 5 MiB")
+        if (
+            self.multipart_chunksize is not None
+            and self.multipart_chunksize < 5 * _MiB
+        ):
+            raise ValueError("multipart_chunksize must be at least 5 MiB")
+        if self.max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+    def chunksize_for(self, size: int) -> int:
+        """Get the part size used to upload a file.
+
+        Parameters
+        ----------
+        size : `int`
+            Size of the file, in bytes.
+
+        Returns
+        -------
+        chunksize : `int`
+            Size of each part, in bytes, after the same adjustments that
+            boto3 applies to stay within S3's limits.
+        """
+        if self.multipart_chunksize is not None:
+            chunksize = self.multipart_chunksize
+        else:
+            chunksize = DEFAULT_MULTIPART_CHUNKSIZE
+            while -(-size // chunksize) > _TARGET_PARTS:
+                chunksize *= 2
+        return adjust_chunksize(chunksize, size)
+
+    def get_transfer_config(self, size: int) -> TransferConfig:
+        """Create the boto3 transfer configuration for a file.
+
+        Parameters
+        ----------
+        size : `int`
+            Size of the file, in bytes.
+
+        Returns
+        -------
+        config : `boto3.s3.transfer.TransferConfig`
+            The transfer configuration.
+        """
+        chunksize = self.chunksize_for(size)
+        # Parts in flight are held in memory, so bound them by max_memory.
+        max_chunks = max(1, self.max_memory // chunksize)
+        max_concurrency = min(self.max_concurrency, max_chunks)
+        config = TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=chunksize,
+            max_concurrency=max_concurrency,
+            use_threads=max_concurrency > 1,
+        )
+        # Not a TransferConfig argument, but read by s3transfer to bound
+        # the number of parts that are read ahead of their upload.
+        config.max_in_memory_upload_chunks = max_chunks
+        return config
@@ -1,14 +1,39 @@
 """S3 upload/sync utilities."""
 
+from __future__ import annotations
+
+import hashlib
 import logging
 import mimetypes
 import os
-from typing import Any, Dict, List, Optional, Union, cast
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 import boto3
-from mypy_boto3_s3.type_defs import DeleteTypeDef
 
-from ltdconveyor.s3.exceptions import S3Error
+from ltdconveyor.compression import CompressedFile, Precompressor
+from ltdconveyor.s3.checksum import FileDigest, compute_file_digest
+from ltdconveyor.s3.concurrency import DEFAULT_MAX_WORKERS, run_tasks
+from ltdconveyor.s3.context import S3Context, resolve_context
+from ltdconveyor.s3.delete import delete_keys
+from ltdconveyor.s3.hashcache import HashCache
+from ltdconveyor.s3.index import BucketIndex
+from ltdconveyor.s3.listing import ObjectRecord, iter_objects
+from ltdconveyor.s3.manifest import (
+    DEFAULT_MANIFEST_MAX_AGE,
+    ManifestEntry,
+    compute_metadata_hash,
+    get_manifest_key,
+    read_manifest,
+    write_manifest,
+)
+from ltdconveyor.s3.transfer import TransferSettings
+
+if TYPE_CHECKING:
+    from ltdconveyor.compression import CompressionSettings
 
 __all__ = [
     "upload_dir",
@@ -16,9 +41,24 @@ __all__ = [
     "upload_object",
     "create_dir_redirect_object",
     "ObjectManager",
+    "SyncResult",
 ]
 
 
+@dataclass
+class SyncResult:
+    """Summary of an `upload_dir` sync."""
+
+    uploaded: int = 0
+    """Number of objects uploaded (including directory redirect objects)."""
+
+    skipped: int = 0
+    """Number of objects that were already up to date and not uploaded."""
+
+    deleted: int = 0
+    """Number of stale objects deleted from the bucket."""
+
+
 def upload_dir(
     bucket_name: str,
     path_prefix: str,
@@ -31,7 +71,14 @@ def upload_dir(
     aws_access_key_id: Optional[str] = None,
     aws_secret_access_key: Optional[str] = None,
     aws_profile: Optional[str] = None,
-) -> None:
+    incremental: bool = False,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    transfer_settings: Optional[TransferSettings] = None,
+    s3_context: Optional[S3Context] = None,
+    hash_cache_path: Optional[Union[str, os.PathLike[str]]] = None,
+    use_manifest: bool = False,
+    compression: Optional[CompressionSettings] = None,
+) -> SyncResult:
     """Upload a directory of files to S3.
 
     This function places the contents of the Sphinx HTML build directory
@@ -87,9 +134,60 @@ def upload_dir(
         Name of AWS profile in :file:`~/.aws/credentials`. Use this instead
         of ``aws_access_key_id`` and ``aws_secret_access_key`` for file-based
         credentials.
+    incremental : `bool`, optional
+        If `True`, only upload files whose content differs from the object
+        already in the bucket. Each local file's size, MD5 digest, and
+        multipart ETag are compared with the object's size and ETag from the
+        bucket listing. Existing directory redirect objects are also kept.
+    max_workers : `int`, optional
+        Maximum number of files and directory redirect objects that are
+        uploaded concurrently. Set to ``1`` to upload sequentially.
+    transfer_settings : `ltdconveyor.s3.TransferSettings`, optional
+        Multipart upload settings for large files: the multipart threshold,
+        part size, per-file concurrency, and in-flight memory cap. The
+        default settings choose the part size by file size.
+    s3_context : `ltdconveyor.s3.S3Context`, optional
+        A shared S3 session and connection pool. If set, the AWS credential
+        parameters are ignored.
+    hash_cache_path : `str` or path-like, optional
+        Path of a `~ltdconveyor.s3.hashcache.HashCache` file for incremental
+        syncs. Local files whose size, modification time, and inode are
+        unchanged since the previous sync aren't hashed again. The cache
+        can be shared by concurrent syncs of the same ``source_dir``.
+    use_manifest : `bool`, optional
+        If `True`, write a compressed sync manifest object (see
+        `ltdconveyor.s3.manifest`) to ``path_prefix`` after a successful
+        sync, recording each object's key, size, ETag, content type, and
+        a hash of its headers. The next sync reads the manifest instead of
+        listing ``path_prefix``, and falls back to a listing if the
+        manifest is missing or stale. In incremental mode, objects whose
+        headers changed, according to the manifest, are uploaded again.
+    compression : `ltdconveyor.compression.CompressionSettings`, optional
+        If set, text files (such as HTML, CSS, and JavaScript) are
+        compressed in a process pool and uploaded with a
+        ``Content-Encoding`` header. Files that are small or don't compress
+        well are uploaded as-is. In incremental mode, the compressed content
+        is compared with the existing objects (compression is
+        deterministic). Clients, and the CDN, must accept the encoding.
+
+    Returns
+    -------
+    result : `SyncResult`
+        Counts of the objects that were uploaded, skipped, and deleted.
+
+    Raises
+    ------
+    ltdconveyor.s3.S3BatchError
+        Raised if any object fails to upload. Uploads of the other objects
+        are completed first, and the error lists every failed object.
 
     Notes
     -----
+    In ``incremental`` mode, only object *content* is compared. Objects
+    that are skipped keep the headers they were originally uploaded with,
+    so run a full (non-incremental) sync when ``surrogate_key``,
+    ``cache_control``, ``surrogate_control``, or ``acl`` change.
+
     ``cache_control`` and  ``surrogate_control`` can be used together.
     ``surrogate_control`` takes priority in setting Fastly's POP caching,
     while ``cache_control`` then sets the browser's caching. For example:
@@ -118,13 +216,18 @@ def upload_dir(
         )
     )
 
-    session = boto3.session.Session(
-        profile_name=aws_profile,
+    settings = transfer_settings or TransferSettings()
+    # Workers share the resource's underlying client, which is thread-safe.
+    # Each worker may upload several parts of a large file at once.
+    max_connections = max_workers * settings.max_concurrency
+    context = resolve_context(
+        s3_context,
         aws_access_key_id=aws_access_key_id,
         aws_secret_access_key=aws_secret_access_key,
+        aws_profile=aws_profile,
+        max_pool_connections=max(max_connections, 10),
     )
-    s3 = session.resource("s3")
-    bucket = s3.Bucket(bucket_name)
+    bucket = context.bucket(bucket_name)
 
     metadata = {}
     if surrogate_key is not None:
@@ -132,57 +235,266 @@ def upload_dir(
     if surrogate_control is not None:
         metadata["surrogate-control"] = surrogate_control
 
-    manager = ObjectManager(session, bucket_name, path_prefix)
-
-    for rootdir, dirnames, filenames in os.walk(source_dir):
-        # name of root directory on S3 bucket
-        bucket_root = os.path.relpath(rootdir, start=source_dir)
-        if bucket_root in (".", "/"):
-            bucket_root = ""
+    manager = ObjectManager(
+        context,
+        bucket_name,
+        path_prefix,
+        max_workers=max_workers,
+        use_manifest=use_manifest,
+    )
+    result = SyncResult()
+    hash_cache: Optional[HashCache] = None
+    if incremental and hash_cache_path is not None:
+        hash_cache = HashCache(hash_cache_path)
+    precompressor: Optional[Precompressor] = None
+    if compression is not None:
+        precompressor = Precompressor(compression)
+
+    def get_digest(
+        local_path: str, compressed: Optional[CompressedFile] = None
+    ) -> FileDigest:
+        if compressed is not None:
+            # The cache is keyed by the original file's stat, so it can't
+            # tell if the compression settings changed.
+            return compute_file_digest(
+                compressed.path,
+                multipart_threshold=settings.multipart_threshold,
+                multipart_chunksize=settings.chunksize_for(compressed.size),
+            )
+        chunksize = settings.chunksize_for(os.path.getsize(local_path))
+        if hash_cache is not None:
+            return hash_cache.digest(
+                local_path,
+                os.path.relpath(local_path, start=source_dir),
+                multipart_threshold=settings.multipart_threshold,
+                multipart_chunksize=chunksize,
+            )
+        return compute_file_digest(
+            local_path,
+            multipart_threshold=settings.multipart_threshold,
+            multipart_chunksize=chunksize,
+        )
 
-        # Delete bucket directories that no longer exist in source
-        bucket_dirnames = manager.list_dirnames_in_directory(bucket_root)
-        for bucket_dirname in bucket_dirnames:
-            if bucket_dirname not in dirnames:
-                logger.debug(
-                    ("Deleting bucket directory {0}".format(bucket_dirname))
-                )
-                manager.delete_directory(bucket_dirname)
-
-        # Delete files that no longer exist in source
-        bucket_filenames = manager.list_filenames_in_directory(bucket_root)
-        for bucket_filename in bucket_filenames:
-            if bucket_filename not in filenames:
-                bucket_filename = os.path.join(bucket_root, bucket_filename)
-                logger.debug(
-                    "Deleting bucket file {0}".format(bucket_filename)
-                )
-                manager.delete_file(bucket_filename)
-
-        # Upload files in directory
-        for filename in filenames:
-            local_path = os.path.join(rootdir, filename)
-            bucket_path = os.path.join(path_prefix, bucket_root, filename)
-            logger.debug("Uploading to {0}".format(bucket_path))
-            upload_file(
+    def sync_file(
+        local_path: str,
+        bucket_path: str,
+        record: Optional[ObjectRecord],
+        manifest_entry: Optional[ManifestEntry],
+    ) -> Tuple[bool, Optional[ManifestEntry]]:
+        """Upload a file, unless its content matches the existing object's
+        ``record`` (only given for incremental syncs) and its headers match
+        the object's ``manifest_entry`` (if known).
+
+        Returns `True` if the file is uploaded, and the object's manifest
+        entry if a manifest is written.
+        """
+        content_type = guess_content_type(local_path)
+        compressed: Optional[CompressedFile] = None
+        if precompressor is not None:
+            compressed = precompressor.compress(
+                local_path, content_type, os.path.getsize(local_path)
+            )
+        try:
+            return _sync_file(
                 local_path,
                 bucket_path,
-                bucket,
-                metadata=metadata,
-                acl=acl,
-                cache_control=cache_control,
+                record,
+                manifest_entry,
+                content_type,
+                compressed,
             )
+        finally:
+            if precompressor is not None:
+                precompressor.discard(compressed)
+
+    def _sync_file(
+        local_path: str,
+        bucket_path: str,
+        record: Optional[ObjectRecord],
+        manifest_entry: Optional[ManifestEntry],
+        content_type: Optional[str],
+        compressed: Optional[CompressedFile],
+    ) -> Tuple[bool, Optional[ManifestEntry]]:
+        content_encoding = compressed.encoding if compressed else None
+        metadata_hash = compute_metadata_hash(
+            content_type=content_type,
+            metadata=metadata,
+            cache_control=cache_control,
+            acl=acl,
+            content_encoding=content_encoding,
+        )
+        digest: Optional[FileDigest] = None
+        if record is not None:
+            digest = get_digest(local_path, compressed)
+            if digest.matches(record) and (
+                manifest_entry is None
+                or manifest_entry.metadata_hash in (None, metadata_hash)
+            ):
+                logger.debug("Skipping unchanged {0}".format(local_path))
+                if not use_manifest:
+                    return False, None
+                # Headers of the existing object are only known from the
+                # manifest.
+                return False, ManifestEntry(
+                    record.key,
+                    record.size,
+                    record.etag,
+                    content_type,
+                    manifest_entry.metadata_hash if manifest_entry else None,
+                )
+        logger.debug("Uploading to {0}".format(bucket_path))
+        upload_file(
+            local_path,
+            bucket_path,
+            bucket,
+            metadata=metadata,
+            acl=acl,
+            cache_control=cache_control,
+            transfer_settings=settings,
+            content_encoding=content_encoding,
+            body_path=compressed.path if compressed else None,
+        )
+        if not use_manifest:
+            return True, None
+        if digest is None:
+            digest = get_digest(local_path, compressed)
+        return True, ManifestEntry(
+            bucket_path, digest.size, digest.etag, content_type, metadata_hash
+        )
 
-        # Upload a directory redirect object
-        if upload_dir_redirect_objects is True:
-            bucket_dir_path = os.path.join(path_prefix, bucket_root)
-            create_dir_redirect_object(
-                bucket_dir_path,
-                bucket,
-                metadata=metadata,
-                acl=acl,
+    def sync_dir_redirect_object(
+        bucket_dir_path: str,
+    ) -> Tuple[bool, Optional[ManifestEntry]]:
+        create_dir_redirect_object(
+            bucket_dir_path,
+            bucket,
+            metadata=metadata,
+            acl=acl,
+            cache_control=cache_control,
+        )
+        if not use_manifest:
+            return True, None
+        return True, ManifestEntry(
+            bucket_dir_path.rstrip("/"),
+            0,
+            hashlib.md5(b"").hexdigest(),
+            None,
+            compute_metadata_hash(
+                metadata={**metadata, "dir-redirect": "true"},
                 cache_control=cache_control,
-            )
+                acl=acl,
+            ),
+        )
+
+    def iter_tasks() -> (
+        Iterator[
+            Tuple[str, Callable[[], Tuple[bool, Optional[ManifestEntry]]]]
+        ]
+    ):
+        """Walk the source directory, deleting stale objects and generating
+        upload tasks.
+        """
+        for rootdir, dirnames, filenames in os.walk(source_dir):
+            # name of root directory on S3 bucket
+            bucket_root = os.path.relpath(rootdir, start=source_dir)
+            if bucket_root in (".", "/"):
+                bucket_root = ""
+
+            # Schedule deletion of bucket directories that no longer exist
+            # in source
+            bucket_dirnames = manager.list_dirnames_in_directory(bucket_root)
+            for bucket_dirname in bucket_dirnames:
+                if bucket_dirname not in dirnames:
+                    bucket_dirname = os.path.join(bucket_root, bucket_dirname)
+                    logger.debug(
+                        "Deleting bucket directory {0}".format(bucket_dirname)
+                    )
+                    manager.schedule_directory_deletion(bucket_dirname)
+
+            # Schedule deletion of files that no longer exist in source
+            bucket_filenames = manager.list_filenames_in_directory(bucket_root)
+            for bucket_filename in bucket_filenames:
+                if bucket_filename not in filenames:
+                    bucket_filename = os.path.join(
+                        bucket_root, bucket_filename
+                    )
+                    logger.debug(
+                        "Deleting bucket file {0}".format(bucket_filename)
+                    )
+                    manager.schedule_file_deletion(bucket_filename)
+
+            # Upload files in directory
+            for filename in filenames:
+                local_path = os.path.join(rootdir, filename)
+                bucket_path = os.path.join(path_prefix, bucket_root, filename)
+                record = None
+                manifest_entry = None
+                if incremental:
+                    record = manager.index.get(
+                        os.path.join(bucket_root, filename)
+                    )
+                    manifest_entry = manager.get_manifest_entry(bucket_path)
+                # A stale directory redirect object may share this key
+                manager.cancel_deletion(bucket_path)
+                yield bucket_path, partial(
+                    sync_file, local_path, bucket_path, record, manifest_entry
+                )
+
+            # Upload a directory redirect object
+            if upload_dir_redirect_objects is True:
+                if incremental and manager.index.get(bucket_root) is not None:
+                    result.skipped += 1
+                else:
+                    bucket_dir_path = os.path.join(path_prefix, bucket_root)
+                    # A stale file may share this key
+                    manager.cancel_deletion(bucket_dir_path.rstrip("/"))
+                    yield bucket_dir_path, partial(
+                        sync_dir_redirect_object, bucket_dir_path
+                    )
+
+    # Syncs without a manifest delete it too, since it goes stale. It isn't
+    # one of the site's objects, so it isn't counted as deleted.
+    manager.invalidate_manifest()
+    manifest_entries: Dict[str, ManifestEntry] = {}
+    try:
+        for _, (uploaded, manifest_entry) in run_tasks(
+            iter_tasks(), max_workers=max_workers, description="Upload"
+        ):
+            if uploaded:
+                result.uploaded += 1
+            else:
+                result.skipped += 1
+            if manifest_entry is not None:
+                manifest_entries[manifest_entry.key] = manifest_entry
+    except Exception:
+        # Keep the digests computed so far
+        if hash_cache is not None:
+            hash_cache.save()
+        raise
+    finally:
+        if precompressor is not None:
+            precompressor.close()
+    if hash_cache is not None:
+        # Every local file was walked, so other entries are stale
+        hash_cache.save(prune=True)
+
+    # Delete stale objects once new objects are uploaded so that the site
+    # doesn't have missing pages in the meantime.
+    result.deleted = manager.delete_scheduled()
+
+    if use_manifest:
+        manager.write_manifest(manifest_entries, acl=acl)
+
+    logger.info(
+        "Synced %s to s3://%s/%s: %d uploaded, %d skipped, %d deleted",
+        source_dir,
+        bucket_name,
+        path_prefix,
+        result.uploaded,
+        result.skipped,
+        result.deleted,
+    )
+    return result
 
 
 def upload_file(
@@ -192,6 +504,9 @@ def upload_file(
     metadata: Optional[Dict[str, str]] = None,
     acl: Optional[str] = None,
     cache_control: Optional[str] = None,
+    transfer_settings: Optional[TransferSettings] = None,
+    content_encoding: Optional[str] = None,
+    body_path: Optional[str] = None,
 ) -> None:
     """Upload a file to the S3 bucket.
 
@@ -216,9 +531,25 @@ def upload_file(
         Default is `None`, mean that no ACL is applied to the object.
     cache_control : `str`, optional
         The cache-control header value. For example, ``'max-age=31536000'``.
+    transfer_settings : `ltdconveyor.s3.TransferSettings`, optional
+        Multipart upload settings. The default settings choose the part size
+        by file size.
+    content_encoding : `str`, optional
+        The ``Content-Encoding`` header value, such as ``'gzip'``, of a
+        precompressed ``body_path``.
+    body_path : `str`, optional
+        Path of the file whose content is uploaded, such as a compressed
+        copy of ``local_path`` (see `ltdconveyor.compression`). The
+        ``Content-Type`` is still guessed from ``local_path``. The default is
+        ``local_path``.
     """
     logger = logging.getLogger(__name__)
 
+    if body_path is None:
+        body_path = local_path
+    if transfer_settings is None:
+        transfer_settings = TransferSettings()
+
     extra_args: Dict[str, Any] = {}
     if acl is not None:
         extra_args["ACL"] = acl
@@ -227,18 +558,44 @@ def upload_file(
     if cache_control is not None:
         extra_args["CacheControl"] = cache_control
 
-    # guess_type returns None if it cannot detect a type
-    content_type, content_encoding = mimetypes.guess_type(
-        local_path, strict=False
-    )
+    content_type = guess_content_type(local_path)
     if content_type is not None:
         extra_args["ContentType"] = content_type
+    if content_encoding is not None:
+        extra_args["ContentEncoding"] = content_encoding
 
     logger.debug(str(extra_args))
 
-    obj = bucket.Object(bucket_path)
+    # Use the bucket's client, rather than an Object resource, so that
+    # uploads are thread-safe.
     # no return status from the upload_file api
-    obj.upload_file(local_path, ExtraArgs=extra_args)
+    bucket.meta.client.upload_file(
+        body_path,
+        bucket.name,
+        bucket_path,
+        ExtraArgs=extra_args,
+        Config=transfer_settings.get_transfer_config(
+            os.path.getsize(body_path)
+        ),
+    )
+
+
+def guess_content_type(local_path: str) -> Optional[str]:
+    """Guess the ``Content-Type`` that `upload_file` sets for a file.
+
+    Parameters
+    ----------
+    local_path : `str`
+        Path of a file on the local file system.
+
+    Returns
+    -------
+    content_type : `str` or `None`
+        The MIME type, or `None` if it can't be guessed from the file name.
+    """
+    # guess_type returns None if it cannot detect a type
+    content_type, _ = mimetypes.guess_type(local_path, strict=False)
+    return content_type
 
 
 def upload_object(
@@ -275,9 +632,7 @@ def upload_object(
         no MIME type is passed to boto3 (which defaults to
         ``binary/octet-stream``).
     """
-    obj = bucket.Object(bucket_path)
-
-    # Object.put seems to be sensitive to None-type kwargs, so we filter first
+    # put_object is sensitive to None-type kwargs, so we filter first
     args: Dict[str, Any] = {}
     if metadata is not None and len(metadata) > 0:  # avoid empty Metadata
         args["Metadata"] = metadata
@@ -288,7 +643,11 @@ def upload_object(
     if content_type is not None:
         args["ContentType"] = content_type
 
-    obj.put(Body=content, **args)
+    # Use the bucket's client, rather than an Object resource, so that
+    # uploads are thread-safe.
+    bucket.meta.client.put_object(
+        Bucket=bucket.name, Key=bucket_path, Body=content, **args
+    )
 
 
 def create_dir_redirect_object(
@@ -347,33 +706,122 @@ class ObjectManager:
     The ObjectManager maintains information about objects that exist in the
     bucket, and can delete objects that no longer exist in the source.
 
+    The bucket is listed once, on the first query, and the listing is kept
+    as a `~ltdconveyor.s3.index.BucketIndex` prefix tree that answers all
+    subsequent directory queries. The whole listing of ``bucket_root`` is
+    held in memory, since a sync needs it to find stale objects.
+
     Parameters
     ----------
-    session : :class:`boto3.session.Session`
-        A boto3 session instance provisioned with the correct identities.
+    session : :class:`boto3.session.Session` or `ltdconveyor.s3.S3Context`
+        A boto3 session instance provisioned with the correct identities,
+        or an S3 context whose client is shared.
     bucket_name : `str`
         Name of the S3 bucket.
     bucket_root : `str`
         The version slug is the name root directory in the bucket where
         documentation is stored.
+    max_workers : `int`, optional
+        Maximum number of concurrent ``DeleteObjects`` requests.
+    use_manifest : `bool`, optional
+        If `True`, build the index from the directory's sync manifest
+        object (see `ltdconveyor.s3.manifest`) rather than a listing, unless
+        the manifest is missing or stale. The manifest object itself is
+        never indexed, so it isn't counted with the directory's objects
+        (see `invalidate_manifest`).
+    manifest_max_age : `datetime.timedelta`, optional
+        Age after which the sync manifest is stale.
     """
 
     def __init__(
         self,
-        session: boto3.session.Session,
+        session: Union[boto3.session.Session, S3Context],
         bucket_name: str,
         bucket_root: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        use_manifest: bool = False,
+        manifest_max_age: timedelta = DEFAULT_MANIFEST_MAX_AGE,
     ) -> None:
         super().__init__()
         self._logger = logging.getLogger(__name__)
 
-        s3 = session.resource("s3")
-        bucket = s3.Bucket(bucket_name)
-        self._session = session
+        if isinstance(session, S3Context):
+            bucket = session.bucket(bucket_name)
+        else:
+            bucket = session.resource("s3").Bucket(bucket_name)
         self._bucket = bucket
         self._bucket_root = bucket_root
         # Strip trailing '/' from bucket_root for comparisons
         self._bucket_root = self._bucket_root.rstrip("/")
+        self._index: Optional[BucketIndex] = None
+        self._max_workers = max_workers
+        # Keys scheduled for deletion (a dict keeps them in order)
+        self._scheduled_deletions: Dict[str, None] = {}
+        self._use_manifest = use_manifest
+        self._manifest_max_age = manifest_max_age
+        self._manifest_key = get_manifest_key(self._bucket_root)
+        self._manifest_entries: Dict[str, ManifestEntry] = {}
+        self._manifest_exists = False
+
+    @property
+    def index(self) -> BucketIndex:
+        """The index of objects under ``bucket_root``.
+
+        The bucket is listed when this property is first accessed.
+        """
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    def _load_index(self) -> BucketIndex:
+        """Read the sync manifest, or list the bucket under ``bucket_root``,
+        to create an index.
+        """
+        index = BucketIndex(self._bucket_root)
+        client = self._bucket.meta.client
+        bucket_name = self._bucket.name
+        if self._use_manifest:
+            manifest = read_manifest(client, bucket_name, self._bucket_root)
+            if manifest is not None:
+                self._manifest_exists = True
+                if not manifest.is_stale(
+                    self._bucket_root, max_age=self._manifest_max_age
+                ):
+                    for entry in manifest.entries:
+                        index.add(entry.to_record())
+                        self._manifest_entries[entry.key] = entry
+                    self._logger.debug(
+                        "Indexed %d objects under %r from the sync manifest",
+                        len(index),
+                        self._bucket_root,
+                    )
+                    return index
+                self._logger.debug("Sync manifest is stale")
+        if self._bucket_root:
+            # The root directory's redirect object is named after
+            # bucket_root, so it doesn't share the "bucket_root/" key prefix.
+            # Since it sorts first, a one-key listing finds it without also
+            # listing sibling prefixes like "bucket_root-other/".
+            response = client.list_objects_v2(
+                Bucket=bucket_name, Prefix=self._bucket_root, MaxKeys=1
+            )
+            for item in response.get("Contents", []):
+                index.add(ObjectRecord.from_listing_item(item))
+        for record in iter_objects(
+            client,
+            bucket_name,
+            prefix=index.key_prefix,
+            max_workers=self._max_workers,
+            ordered=False,
+        ):
+            if record.key == self._manifest_key:
+                self._manifest_exists = True
+                continue
+            index.add(record)
+        self._logger.debug(
+            "Indexed %d objects under %r", len(index), self._bucket_root
+        )
+        return index
 
     def list_filenames_in_directory(self, dirname: str) -> List[str]:
         """List all file-type object names that exist at the root of this
@@ -388,19 +836,10 @@ class ObjectManager:
         -------
         filenames : `list`
             List of file names (`str`), relative to ``bucket_root/``, that
-            exist at the root of ``dirname``.
+            exist at the root of ``dirname``. Directory redirect objects
+            for subdirectories are not included.
         """
-        prefix = self._create_prefix(dirname)
-        filenames = []
-        for obj in self._bucket.objects.filter(Prefix=prefix):
-            if obj.key.endswith("/"):
-                # a directory redirect object, not a file
-                continue
-            obj_dirname = os.path.dirname(obj.key)
-            if obj_dirname == prefix:
-                # object is at root of directory
-                filenames.append(os.path.relpath(obj.key, start=prefix))
-        return filenames
+        return self.index.list_filenames(dirname)
 
     def list_dirnames_in_directory(self, dirname: str) -> List[str]:
         """List all names of directories that exist at the root of this
@@ -420,96 +859,191 @@ class ObjectManager:
             List of directory names (`str`), relative to ``bucket_root/``,
             that exist at the root of ``dirname``.
         """
-        prefix = self._create_prefix(dirname)
-        dirnames = []
-        for obj in self._bucket.objects.filter(Prefix=prefix):
-            # get directory name of every object under this path prefix
-            dirname = os.path.dirname(obj.key)
-
-            # dirname is empty if the object happens to be the directory
-            # redirect object object for the prefix directory (directory
-            # redirect objects are named after directories and have metadata
-            # that tells Fastly to redirect the browser to the index.html
-            # contained in the directory).
-            if dirname == "":
-                dirname = obj.key + "/"
-
-            # Strip out the path prefix from the directory name
-            rel_dirname = os.path.relpath(dirname, start=prefix)
-
-            # If there's only one part then this directory is at the root
-            # relative to the prefix. We want this.
-            dir_parts = rel_dirname.split("/")
-            if len(dir_parts) == 1:
-                dirnames.append(dir_parts[0])
-
-        # Above algorithm finds root directories for all *files* in sub
-        # subdirectories; trim down to the unique set.
-        dirnames = list(set(dirnames))
-
-        # Remove posix-like relative directory names that can appear
-        # in the bucket listing.
-        for filtered_dir in (".", ".."):
-            if filtered_dir in dirnames:
-                dirnames.remove(filtered_dir)
-
-        return dirnames
-
-    def _create_prefix(self, dirname: str) -> str:
-        """Make an absolute directory path in the bucker for dirname,
-        which is is assumed relative to the self._bucket_root prefix directory.
+        return self.index.list_dirnames(dirname)
+
+    def get_manifest_entry(self, key: str) -> Optional[ManifestEntry]:
+        """Get an object's entry in the sync manifest that the index was
+        built from.
+
+        Parameters
+        ----------
+        key : `str`
+            The object's full key in the bucket.
+
+        Returns
+        -------
+        entry : `ltdconveyor.s3.manifest.ManifestEntry` or `None`
+            The entry, or `None` if the index wasn't built from a manifest
+            or the object isn't in it.
+        """
+        self.index  # Read the manifest, if necessary
+        return self._manifest_entries.get(key)
+
+    def invalidate_manifest(self) -> None:
+        """Delete the sync manifest object, if it exists, before objects
+        are changed.
+
+        An interrupted sync then leaves no manifest behind, so the next
+        sync lists the bucket.
+        """
+        self.index  # Find the manifest, if necessary
+        if self._manifest_exists:
+            self._bucket.meta.client.delete_object(
+                Bucket=self._bucket.name, Key=self._manifest_key
+            )
+            self._manifest_exists = False
+
+    def write_manifest(
+        self, entries: Dict[str, ManifestEntry], *, acl: Optional[str] = None
+    ) -> None:
+        """Write a sync manifest of the indexed objects.
+
+        Parameters
+        ----------
+        entries : `dict`
+            Manifest entries, keyed by object key, of objects that were
+            uploaded or checked since the index was loaded. These entries
+            are added to the index. Other indexed objects keep their
+            previous manifest entries, if any.
+        acl : `str`, optional
+            The pre-canned AWS access control list of the manifest object.
+        """
+        for entry in entries.values():
+            self.index.add(entry.to_record())
+        manifest_entries = []
+        for record in self.index:
+            known = entries.get(record.key)
+            if known is None:
+                known = self._manifest_entries.get(record.key)
+            if known is None or known.to_record() != record:
+                known = ManifestEntry(record.key, record.size, record.etag)
+            manifest_entries.append(known)
+        manifest = write_manifest(
+            self._bucket.meta.client,
+            self._bucket.name,
+            self._bucket_root,
+            manifest_entries,
+            acl=acl,
+        )
+        self._manifest_entries = {e.key: e for e in manifest.entries}
+        self._manifest_exists = True
+
+    def schedule_file_deletion(self, filename: str) -> None:
+        """Schedule a file to be deleted by `delete_scheduled`.
+
+        The file is removed from the index immediately.
+
+        Parameters
+        ----------
+        filename : `str`
+            Name of the file, relative to ``bucket_root/``.
+        """
+        record = self.index.remove(filename)
+        if record is not None:
+            self._scheduled_deletions[record.key] = None
+
+    def schedule_directory_deletion(self, dirname: str) -> int:
+        """Schedule a directory (and contents) to be deleted by
+        `delete_scheduled`.
+
+        The directory is removed from the index immediately. The directory's
+        redirect object is also scheduled for deletion.
+
+        Parameters
+        ----------
+        dirname : `str`
+            Name of the directory, relative to ``bucket_root/``.
+
+        Returns
+        -------
+        count : `int`
+            Number of objects scheduled for deletion.
+        """
+        records = self.index.remove_directory(dirname)
+        for record in records:
+            self._scheduled_deletions[record.key] = None
+        return len(records)
+
+    def cancel_deletion(self, key: str) -> None:
+        """Cancel the scheduled deletion of an object, such as when a new
+        object is uploaded to the same key.
+
+        Parameters
+        ----------
+        key : `str`
+            The object's full key in the bucket.
+        """
+        self._scheduled_deletions.pop(key, None)
+
+    def delete_scheduled(self) -> int:
+        """Delete all objects that are scheduled for deletion.
+
+        Objects are deleted with concurrent ``DeleteObjects`` requests of up
+        to 1000 keys each (see `ltdconveyor.s3.delete.delete_keys`).
+
+        Returns
+        -------
+        count : `int`
+            Number of objects deleted.
+
+        Raises
+        ------
+        ltdconveyor.s3.S3BatchError
+            Raised if any object can't be deleted.
         """
-        if dirname in (".", "/"):
-            dirname = ""
-        # Strips trailing slash from dir prefix for comparisons
-        # os.path.dirname() returns directory names without a trailing /
-        prefix = os.path.join(self._bucket_root, dirname)
-        prefix = prefix.rstrip("/")
-        return prefix
-
-    def delete_file(self, filename: str) -> None:
+        keys = list(self._scheduled_deletions)
+        self._scheduled_deletions.clear()
+        if not keys:
+            return 0
+        count = delete_keys(
+            self._bucket.meta.client,
+            self._bucket.name,
+            keys,
+            max_workers=self._max_workers,
+        )
+        self._logger.debug("Deleted %d objects", count)
+        return count
+
+    def delete_file(self, filename: str) -> int:
         """Delete a file from the bucket.
 
         Parameters
         ----------
         filename : `str`
             Name of the file, relative to ``bucket_root/``.
+
+        Returns
+        -------
+        count : `int`
+            Number of objects deleted (``0`` if the file does not exist).
         """
-        key = os.path.join(self._bucket_root, filename)
-        objects = list(self._bucket.objects.filter(Prefix=key))
-        for obj in objects:
-            obj.delete()
+        self.schedule_file_deletion(filename)
+        return self.delete_scheduled()
 
-    def delete_directory(self, dirname: str) -> None:
+    def delete_directory(self, dirname: str) -> int:
         """Delete a directory (and contents) from the bucket.
 
+        The directory's redirect object is deleted as well.
+
         Parameters
         ----------
         dirname : `str`
             Name of the directory, relative to ``bucket_root/``.
 
+        Returns
+        -------
+        count : `int`
+            Number of objects deleted.
+
         Raises
         ------
         RuntimeError
             Raised when there are no objects to delete (directory
             does not exist).
+        ltdconveyor.s3.S3BatchError
+            Raised if any object can't be deleted.
         """
-        key = os.path.join(self._bucket_root, dirname)
-        if not key.endswith("/"):
-            key += "/"
-
-        key_objects = [
-            {"Key": obj.key} for obj in self._bucket.objects.filter(Prefix=key)
-        ]
-        if len(key_objects) == 0:
+        if self.schedule_directory_deletion(dirname) == 0:
             msg = "No objects in bucket directory {}".format(dirname)
             raise RuntimeError(msg)
-        delete_keys = {"Objects": key_objects}
-        # based on http://stackoverflow.com/a/34888103
-        s3 = self._session.resource("s3")
-        r = s3.meta.client.delete_objects(
-            Bucket=self._bucket.name, Delete=cast(DeleteTypeDef, delete_keys)
-        )
-        self._logger.debug(r)
-        if "Errors" in r:
-            raise S3Error("S3 could not delete {0}".format(key))
+        return self.delete_scheduled()
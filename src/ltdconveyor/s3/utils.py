@@ -2,7 +2,7 @@
 
 from typing import Any, Optional
 
-import boto3
+from ltdconveyor.s3.context import S3Context, resolve_context
 
 __all__ = ["open_bucket"]
 
@@ -12,6 +12,7 @@ def open_bucket(
     aws_access_key_id: Optional[str] = None,
     aws_secret_access_key: Optional[str] = None,
     aws_profile: Optional[str] = None,
+    s3_context: Optional[S3Context] = None,
 ) -> Any:
     """Open an S3 Bucket resource.
 
@@ -28,17 +29,19 @@ def open_bucket(
         Name of AWS profile in :file:`~/.aws/credentials`. Use this instead
         of ``aws_access_key_id`` and ``aws_secret_access_key`` for file-based
         credentials.
+    s3_context : `ltdconveyor.s3.S3Context`, optional
+        A shared S3 session and connection pool. If set, the AWS credential
+        parameters are ignored.
 
     Returns
     -------
     bucket : Boto3 S3 Bucket instance
         The S3 bucket as a Boto3 instance.
     """
-    session = boto3.session.Session(
-        profile_name=aws_profile,
+    context = resolve_context(
+        s3_context,
         aws_access_key_id=aws_access_key_id,
         aws_secret_access_key=aws_secret_access_key,
+        aws_profile=aws_profile,
     )
-    s3 = session.resource("s3")
-    bucket = s3.Bucket(bucket_name)
-    return bucket
+    return context.bucket(bucket_name)
@@ -0,0 +1,219 @@
+"""Bounded asyncio worker pools for uploads."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from contextlib import asynccontextmanager
+from typing import Deque, List, Optional, Sequence, TypeVar
+
+__all__ = [
+    "DEFAULT_MAX_CONCURRENCY",
+    "DEFAULT_MAX_IN_FLIGHT_BYTES",
+    "ByteLimiter",
+    "run_lanes",
+    "run_workers",
+]
+
+T = TypeVar("T")
+
+DEFAULT_MAX_CONCURRENCY = 16
+"""Default number of concurrent upload requests."""
+
+DEFAULT_MAX_IN_FLIGHT_BYTES = 256 * 1024 * 1024
+"""Default limit on the total size of files being uploaded at once."""
+
+
+class ByteLimiter:
+    """Limit the total size, in bytes, of concurrent operations.
+
+    Parameters
+    ----------
+    max_bytes : `int`
+        Maximum number of bytes reserved at once. A single reservation that
+        is larger than this waits until nothing else is reserved, so large
+        files are still uploaded (on their own).
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self._max_bytes = max_bytes
+        self._available = max_bytes
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def available(self) -> int:
+        """Number of bytes that aren't reserved."""
+        return self._available
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int) -> AsyncIterator[None]:
+        """Reserve bytes for the duration of a ``async with`` block,
+        waiting until they are available.
+        """
+        if self._condition is None:
+            # Created lazily so that it's bound to the running event loop
+            self._condition = asyncio.Condition()
+        condition = self._condition
+        nbytes = min(max(nbytes, 0), self._max_bytes)
+        async with condition:
+            await condition.wait_for(lambda: self._available >= nbytes)
+            self._available -= nbytes
+        try:
+            yield
+        finally:
+            async with condition:
+                self._available += nbytes
+                condition.notify_all()
+
+
+async def run_workers(
+    items: Iterable[T],
+    handler: Callable[[T], Awaitable[None]],
+    *,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    byte_limiter: Optional[ByteLimiter] = None,
+    size: Optional[Callable[[T], int]] = None,
+) -> None:
+    """Handle items with a fixed pool of asyncio workers.
+
+    A producer feeds items into a bounded `asyncio.Queue` that
+    ``max_concurrency`` workers consume, so only a few coroutines exist at
+    once regardless of the number of items.
+
+    Parameters
+    ----------
+    items : iterable
+        The items to handle. The iterable is consumed lazily.
+    handler : callable
+        Coroutine function that handles an item.
+    max_concurrency : `int`, optional
+        Number of workers, and so the maximum number of items handled at
+        once.
+    byte_limiter : `ByteLimiter`, optional
+        If set, each item reserves ``size(item)`` bytes from the limiter
+        while it's handled.
+    size : callable, optional
+        Function that gives the size of an item, in bytes. Required with
+        ``byte_limiter``.
+
+    Raises
+    ------
+    Exception
+        The first exception raised by ``handler``. The other workers are
+        cancelled.
+    """
+    if byte_limiter is not None and size is None:
+        raise ValueError("size is required with byte_limiter")
+    max_concurrency = max(max_concurrency, 1)
+    queue: asyncio.Queue[Optional[T]] = asyncio.Queue(
+        maxsize=2 * max_concurrency
+    )
+
+    async def produce() -> None:
+        for item in items:
+            await queue.put(item)
+        for _ in range(max_concurrency):
+            await queue.put(None)
+
+    async def consume() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            await _handle(item, handler, byte_limiter, size)
+
+    tasks: List[asyncio.Task[None]] = [asyncio.create_task(produce())]
+    tasks.extend(
+        asyncio.create_task(consume()) for _ in range(max_concurrency)
+    )
+    await _gather_or_cancel(tasks)
+
+
+async def run_lanes(
+    lanes: Sequence[Sequence[T]],
+    handler: Callable[[T], Awaitable[None]],
+    *,
+    workers: Sequence[int],
+    byte_limiter: Optional[ByteLimiter] = None,
+    size: Optional[Callable[[T], int]] = None,
+) -> None:
+    """Handle items from several lanes with a fixed pool of asyncio
+    workers.
+
+    Each lane has its own workers, which handle the lane's items in order,
+    so that, for example, a few workers upload large files while the
+    others upload small files, rather than every worker being held up by
+    large files at once. A worker whose lane is empty takes items from the
+    other lanes, in order, so no worker is idle while items remain.
+
+    Parameters
+    ----------
+    lanes : sequence of sequences
+        The items of each lane, in the order they're handled.
+    handler : callable
+        Coroutine function that handles an item.
+    workers : sequence of `int`
+        Number of workers of each lane.
+    byte_limiter : `ByteLimiter`, optional
+        If set, each item reserves ``size(item)`` bytes from the limiter
+        while it's handled.
+    size : callable, optional
+        Function that gives the size of an item, in bytes. Required with
+        ``byte_limiter``.
+
+    Raises
+    ------
+    Exception
+        The first exception raised by ``handler``. The other workers are
+        cancelled.
+    """
+    if len(workers) != len(lanes):
+        raise ValueError("workers must have a number for each lane")
+    if byte_limiter is not None and size is None:
+        raise ValueError("size is required with byte_limiter")
+    queues: List[Deque[T]] = [deque(lane) for lane in lanes]
+    if any(queues) and sum(workers) < 1:
+        raise ValueError("There must be at least one worker")
+
+    async def consume(lane: int) -> None:
+        # The worker's own lane first, then the others
+        order = [queues[lane]] + queues[:lane] + queues[lane + 1 :]
+        while True:
+            queue = next((q for q in order if q), None)
+            if queue is None:
+                return
+            await _handle(queue.popleft(), handler, byte_limiter, size)
+
+    tasks = [
+        asyncio.create_task(consume(lane))
+        for lane, count in enumerate(workers)
+        for _ in range(count)
+    ]
+    await _gather_or_cancel(tasks)
+
+
+async def _handle(
+    item: T,
+    handler: Callable[[T], Awaitable[None]],
+    byte_limiter: Optional[ByteLimiter],
+    size: Optional[Callable[[T], int]],
+) -> None:
+    if byte_limiter is not None and size is not None:
+        async with byte_limiter.reserve(size(item)):
+            await handler(item)
+    else:
+        await handler(item)
+
+
+async def _gather_or_cancel(tasks: List[asyncio.Task[None]]) -> None:
+    """Wait for tasks, cancelling the others if any of them fails."""
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
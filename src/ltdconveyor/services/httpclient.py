@@ -0,0 +1,120 @@
+"""Settings of the HTTP client that uploads builds."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from .concurrency import DEFAULT_MAX_CONCURRENCY
+
+__all__ = ["DEFAULT_TIMEOUT", "HTTPClientSettings"]
+
+DEFAULT_TIMEOUT = 5.0
+"""Default timeout, in seconds, of each network operation (the same as
+httpx's default).
+"""
+
+
+@dataclass(frozen=True)
+class HTTPClientSettings:
+    """Settings of the `httpx.AsyncClient` that uploads builds.
+
+    The connection limits default to the upload concurrency, plus a couple
+    of connections for LTD Keeper API requests, so that every concurrent
+    upload has its own connection and connections are reused between
+    files. httpx's own defaults (100 connections, of which only 20 are kept
+    alive) make connections churn when more than 20 files are uploaded at
+    once.
+    """
+
+    http2: bool = False
+    """Use HTTP/2 for servers that support it (this requires the ``h2``
+    package, from ``httpx[http2]``). Concurrent requests to the same host
+    are multiplexed over a single connection, so small files aren't held up
+    by a slow upload on the same connection.
+    """
+
+    max_connections: Optional[int] = None
+    """Maximum number of open connections. The default is the upload
+    concurrency plus two.
+    """
+
+    max_keepalive_connections: Optional[int] = None
+    """Maximum number of idle connections that are kept open. The default
+    is ``max_connections``.
+    """
+
+    keepalive_expiry: float = 5.0
+    """Time, in seconds, that idle connections are kept open."""
+
+    timeout: float = DEFAULT_TIMEOUT
+    """Timeout, in seconds, of each network operation: connecting, and
+    each read and write.
+    """
+
+    connect_timeout: Optional[float] = None
+    """Timeout, in seconds, for establishing a connection. The default is
+    ``timeout``.
+    """
+
+    def __post_init__(self) -> None:
+        if self.max_connections is not None and self.max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        if (
+            self.max_keepalive_connections is not None
+            and self.max_keepalive_connections < 0
+        ):
+            raise ValueError("max_keepalive_connections must not be negative")
+        if self.timeout <= 0:
+            raise ValueError("timeout must be positive")
+
+    def get_limits(
+        self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> httpx.Limits:
+        """Get the connection pool limits.
+
+        Parameters
+        ----------
+        max_concurrency : `int`, optional
+            The number of concurrent uploads.
+        """
+        max_connections = self.max_connections or max_concurrency + 2
+        max_keepalive = self.max_keepalive_connections
+        if max_keepalive is None:
+            max_keepalive = max_connections
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(max_keepalive, max_connections),
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def get_timeout(self) -> httpx.Timeout:
+        """Get the client's timeouts."""
+        connect = self.connect_timeout
+        if connect is None:
+            connect = self.timeout
+        return httpx.Timeout(self.timeout, connect=connect)
+
+    def create_client(
+        self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> httpx.AsyncClient:
+        """Create an HTTP client with these settings.
+
+        Parameters
+        ----------
+        max_concurrency : `int`, optional
+            The number of concurrent uploads.
+
+        Raises
+        ------
+        ImportError
+            Raised if ``http2`` is set, but the ``h2`` package isn't
+            installed.
+        """
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=self.get_limits(max_concurrency),
+            timeout=self.get_timeout(),
+        )
@@ -3,25 +3,78 @@
 from __future__ import annotations
 
 import asyncio
-import mimetypes
+import logging
+from collections.abc import Awaitable, Callable, Sequence
+from concurrent.futures import Executor, ThreadPoolExecutor
 from copy import deepcopy
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, TypeVar
 
 from httpx import AsyncClient, HTTPError
 
-from ..exceptions import S3PresignedUploadError
+from ..compression import CompressionSettings, Precompressor
+from ..exceptions import S3PresignedUploadBatchError, S3PresignedUploadError
+from ..s3.formdata import MultipartFileEncoder
+from ..site import SiteFile, SiteManifest, scan_site
 from ..storage.keeper import KeeperClient, PresignedPostUrl
+from .concurrency import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_IN_FLIGHT_BYTES,
+    ByteLimiter,
+    run_lanes,
+    run_workers,
+)
+from .retry import RetryPolicy
+from .scheduling import UploadPhase, plan_uploads
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+_UPLOAD_CHUNK_SIZE = 256 * 1024
+"""Size, in bytes, of each read of a file that's being uploaded."""
 
 
 class ProjectService:
-    """A service for managing LTD projects, including uploading builds."""
+    """A service for managing LTD projects, including uploading builds.
+
+    Parameters
+    ----------
+    keeper_client : `ltdconveyor.storage.keeper.KeeperClient`
+        Client for the LTD Keeper API.
+    http_client : `httpx.AsyncClient`
+        HTTP client for uploads. Its connection pool should allow at least
+        ``max_concurrency`` connections.
+    max_concurrency : `int`, optional
+        Maximum number of concurrent upload requests.
+    max_in_flight_bytes : `int`, optional
+        Maximum total size, in bytes, of the files being uploaded at once.
+        A file larger than this is uploaded on its own.
+    retry_policy : `ltdconveyor.services.retry.RetryPolicy`, optional
+        How uploads that fail with transient errors are retried.
+    compression : `ltdconveyor.compression.CompressionSettings`, optional
+        If set, text files are compressed in a process pool and uploaded
+        with a ``Content-Encoding`` field, which the presigned POST policy
+        must allow.
+    """
 
     def __init__(
-        self, *, keeper_client: KeeperClient, http_client: AsyncClient
+        self,
+        *,
+        keeper_client: KeeperClient,
+        http_client: AsyncClient,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_in_flight_bytes: int = DEFAULT_MAX_IN_FLIGHT_BYTES,
+        retry_policy: Optional[RetryPolicy] = None,
+        compression: Optional[CompressionSettings] = None,
     ) -> None:
         self._keeper_client = keeper_client
         self._http_client = http_client
+        self._max_concurrency = max_concurrency
+        self._max_in_flight_bytes = max_in_flight_bytes
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._compression = compression
 
     async def upload_build(
         self,
@@ -31,18 +84,40 @@ class ProjectService:
         git_ref: str,
         org: Optional[str] = None,
     ) -> None:
-        """Upload a new build to LSST the Docs."""
-        dirnames = self._prescan_directory(base_dir)
-        build_info = await self._keeper_client.register_build(
-            project=project,
-            git_ref=git_ref,
-            dirnames=dirnames,
-            org=org,
-        )
+        """Upload a new build to LSST the Docs.
 
-        await self._upload_files(
-            base_dir=base_dir, post_prefix_urls=build_info.post_prefix_urls
-        )
+        Raises
+        ------
+        ltdconveyor.exceptions.S3PresignedUploadBatchError
+            Raised if any file can't be uploaded after retries. The build
+            is registered, but not confirmed.
+        """
+        # File system access runs in this executor, so the event loop only
+        # waits on the network.
+        with ThreadPoolExecutor(
+            max_workers=self._max_concurrency,
+            thread_name_prefix="ltd-upload",
+        ) as executor:
+            loop = asyncio.get_running_loop()
+            site = await loop.run_in_executor(
+                executor,
+                partial(
+                    scan_site, base_dir, max_workers=self._max_concurrency
+                ),
+            )
+            logger.info("Uploading %s", site.describe())
+            build_info = await self._keeper_client.register_build(
+                project=project,
+                git_ref=git_ref,
+                dirnames=list(site.dirnames),
+                org=org,
+            )
+
+            await self._upload_files(
+                site=site,
+                post_prefix_urls=build_info.post_prefix_urls,
+                executor=executor,
+            )
 
         await self._upload_directory_objects(
             post_dir_urls=build_info.post_dir_urls
@@ -50,135 +125,230 @@ class ProjectService:
 
         await self._keeper_client.confirm_build(build_url=build_info.url)
 
-    def _prescan_directory(
-        self, base_dir: Path, _current_dir: Optional[Path] = None
-    ) -> List[str]:
-        """Make a list of all directories in a site, including the root
-        directory.
-
-        This function is used to the LTD Keeper API what presigned POST URLs to
-        create for a build (see `ltdconveyor.keeper.register_build`).
-
-        Parmameters
-        -----------
-        base_dir : `pathlib.Path`
-            The (local) root directory of a web site.
-
-        Returns
-        -------
-        dirnames : `list`
-            A list of directory names, relative to the root directory. The root
-            directory is represented by ``"/"``. All directory names end with
-            ``"/"``.
-        """
-        dirs = []
-        if _current_dir is None:
-            _current_dir = base_dir
-        dirs.append(self._format_relative_dirname(_current_dir, base_dir))
-        for path in _current_dir.iterdir():
-            if path.is_dir():
-                dirs.extend(
-                    self._prescan_directory(base_dir, _current_dir=path)
-                )
-        return dirs
-
-    def _format_relative_dirname(
-        self, directory: Path, base_directory: Path
-    ) -> str:
-        """Formats a relative directory path in a way that's compatible with
-        presigned POST URLs.
-
-        Parameters
-        ----------
-        directory : `pathlib.Path`
-            The directory to compute a relative path/name for.
-        base_directory : `pathlib.Path`
-            The base directory.
-
-        Returns
-        -------
-        name : `str`
-            The relative directory name.
-
-            Examples:
-
-            - ``"base/`` relative to ``"/base/"`` is ``"/"``.
-            - ``"base/a/`` relative to ``"/base/"`` is ``"a/"``.
-            - ``"base/a/b`` relative to ``"/base/"`` is ``"a/b/"``.
-        """
-        name = str(directory.relative_to(base_directory))
-        if name == ".":
-            return "/"
-        elif not name.endswith("/"):
-            return name + "/"
-        else:
-            return name
-
     async def _upload_files(
-        self, *, base_dir: Path, post_prefix_urls: Dict[str, PresignedPostUrl]
+        self,
+        *,
+        site: SiteManifest,
+        post_prefix_urls: Dict[str, PresignedPostUrl],
+        executor: Optional[Executor] = None,
     ) -> None:
-        """Upload files to a build."""
-        file_paths = base_dir.rglob("*")
-        tasks = []
-        for path in file_paths:
-            if path.is_dir():
-                continue
-            relative_dirname = self._format_relative_dirname(
-                path.parent, base_dir
+        """Upload files to a build, assets before pages and largest first
+        (see `ltdconveyor.services.scheduling.plan_uploads`).
+        """
+        for dirname in site.dirnames:
+            if dirname not in post_prefix_urls:
+                raise RuntimeError(f"Missing presigned post URL for {dirname}")
+
+        # Starting and stopping the precompressor's process pool, and
+        # removing compressed files, block, so they also run in the
+        # executor.
+        loop = asyncio.get_running_loop()
+        precompressor: Optional[Precompressor] = None
+        if self._compression is not None:
+            precompressor = await loop.run_in_executor(
+                executor, Precompressor, self._compression
             )
-            if relative_dirname not in post_prefix_urls:
-                raise RuntimeError(
-                    f"Missing presigned post URL for {relative_dirname}"
+
+        async def upload(site_file: SiteFile) -> None:
+            path = site.local_path(site_file)
+            if precompressor is None:
+                await self._upload_file(
+                    path=path,
+                    size=site_file.size,
+                    content_type=site_file.content_type,
+                    post_url=post_prefix_urls[site_file.dirname],
+                    executor=executor,
                 )
-            tasks.append(
-                asyncio.create_task(
-                    self._upload_file(
-                        path=path,
-                        post_url=post_prefix_urls[relative_dirname],
-                    )
+                return
+            # Each attempt compresses the file again, so that compressed
+            # files don't accumulate while uploads are retried.
+            compressed = await asyncio.wrap_future(
+                precompressor.submit(
+                    path, site_file.content_type, site_file.size
                 )
             )
-        await asyncio.gather(*tasks)
+            try:
+                await self._upload_file(
+                    path=Path(compressed.path) if compressed else path,
+                    size=compressed.size if compressed else site_file.size,
+                    content_type=site_file.content_type,
+                    post_url=post_prefix_urls[site_file.dirname],
+                    executor=executor,
+                    content_encoding=(
+                        compressed.encoding if compressed else None
+                    ),
+                    filename=path.name,
+                    display_path=path,
+                )
+            finally:
+                if compressed is not None:
+                    await loop.run_in_executor(
+                        executor, precompressor.discard, compressed
+                    )
 
-    async def _upload_file(
-        self, *, path: Path, post_url: PresignedPostUrl
+        phases = plan_uploads(site.files)
+        byte_limiter = ByteLimiter(self._max_in_flight_bytes)
+
+        async def schedule(
+            handle: Callable[[SiteFile], Awaitable[None]]
+        ) -> None:
+            for phase in phases:
+                await self._run_phase(phase, handle, byte_limiter)
+
+        try:
+            await self._run_uploads(
+                site.files,
+                upload,
+                name=lambda site_file: site_file.path,
+                description="Upload",
+                schedule=schedule,
+            )
+        finally:
+            if precompressor is not None:
+                await loop.run_in_executor(executor, precompressor.close)
+
+    async def _run_phase(
+        self,
+        phase: UploadPhase,
+        handle: Callable[[SiteFile], Awaitable[None]],
+        byte_limiter: ByteLimiter,
     ) -> None:
-        """Upload a file to a presigned POST URL."""
-        fields = deepcopy(post_url.fields)
+        """Upload the files of a phase in large-file and small-file lanes."""
+        workers = phase.get_lane_workers(self._max_concurrency)
+        logger.debug(
+            "Uploading %s: %d large files with %d workers, %d small files "
+            "with %d workers",
+            phase.name,
+            len(phase.large),
+            workers[0],
+            len(phase.small),
+            workers[1],
+        )
+        await run_lanes(
+            [phase.large, phase.small],
+            handle,
+            workers=workers,
+            byte_limiter=byte_limiter,
+            size=lambda site_file: site_file.size,
+        )
 
-        content_type, _ = mimetypes.guess_type(str(path), strict=False)
-        if content_type is not None:
-            fields["Content-Type"] = content_type
-        else:
-            fields["Content-Type"] = "application/octet-stream"
+    async def _run_uploads(
+        self,
+        items: Sequence[T],
+        upload: Callable[[T], Awaitable[None]],
+        *,
+        name: Callable[[T], str],
+        description: str,
+        schedule: Optional[
+            Callable[[Callable[[T], Awaitable[None]]], Awaitable[None]]
+        ] = None,
+    ) -> None:
+        """Run uploads, retrying each upload with the retry policy.
 
-        with path.open("rb") as f:
+        ``schedule`` is a coroutine function that runs a handler for each
+        item. By default, items are handled in order by the worker pool.
+        The first upload that fails after retries cancels the others, and
+        all failures are reported together.
+        """
+        failures: List[Tuple[str, BaseException]] = []
+        uploaded = 0
+
+        async def handle(item: T) -> None:
+            nonlocal uploaded
+            item_name = name(item)
             try:
-                r = await self._http_client.post(
-                    post_url.url,
-                    data=fields,
-                    files={"file": (path.name, f)},
+                await self._retry_policy.run(
+                    partial(upload, item),
+                    description=f"{description.lower()} of {item_name}",
                 )
-                r.raise_for_status()
-            except HTTPError as e:
-                raise S3PresignedUploadError(
-                    f"Error uploading {path} to S3", e
-                ) from e
+            except Exception as e:
+                failures.append((item_name, e))
+                raise
+            uploaded += 1
+
+        try:
+            if schedule is None:
+                await run_workers(
+                    items, handle, max_concurrency=self._max_concurrency
+                )
+            else:
+                await schedule(handle)
+        except Exception:
+            if not failures:
+                raise
+            error = S3PresignedUploadBatchError(
+                f"{description} failed for {len(failures)} file(s)",
+                failures,
+                not_uploaded=len(items) - uploaded - len(failures),
+            )
+            logger.error("%s", error)
+            raise error from failures[0][1]
+
+    async def _upload_file(
+        self,
+        *,
+        path: Path,
+        size: int,
+        content_type: str,
+        post_url: PresignedPostUrl,
+        executor: Optional[Executor] = None,
+        content_encoding: Optional[str] = None,
+        filename: Optional[str] = None,
+        display_path: Optional[Path] = None,
+    ) -> None:
+        """Upload a file to a presigned POST URL.
+
+        The file is read in chunks in ``executor`` as the request body is
+        sent. A precompressed file is uploaded with its
+        ``content_encoding``, under the ``filename`` and ``display_path``
+        (for error messages) of the original file rather than those of the
+        temporary compressed file, since the presigned POST's key ends with
+        the file name.
+        """
+        fields = deepcopy(post_url.fields)
+        fields["Content-Type"] = content_type
+        if content_encoding is not None:
+            fields["Content-Encoding"] = content_encoding
+        body = MultipartFileEncoder(
+            fields,
+            path,
+            filename=filename,
+            chunk_size=_UPLOAD_CHUNK_SIZE,
+            size=size,
+        )
+
+        try:
+            r = await self._http_client.post(
+                post_url.url,
+                content=body.aiter_body(executor),
+                headers={
+                    "Content-Type": body.content_type,
+                    "Content-Length": str(len(body)),
+                },
+            )
+            r.raise_for_status()
+        except HTTPError as e:
+            raise S3PresignedUploadError(
+                f"Error uploading {display_path or path} to S3", e
+            ) from e
 
     async def _upload_directory_objects(
         self, post_dir_urls: Dict[str, PresignedPostUrl]
     ) -> None:
         """Upload directory objects to a build."""
-        tasks = []
-        for relative_dir, post_url in post_dir_urls.items():
-            tasks.append(
-                asyncio.create_task(
-                    self._upload_directory_object(
-                        relative_dir=relative_dir, post_url=post_url
-                    )
-                )
+
+        async def upload(item: Tuple[str, PresignedPostUrl]) -> None:
+            relative_dir, post_url = item
+            await self._upload_directory_object(
+                relative_dir=relative_dir, post_url=post_url
             )
-        await asyncio.gather(*tasks)
+
+        await self._run_uploads(
+            list(post_dir_urls.items()),
+            upload,
+            name=lambda item: item[0],
+            description="Directory object upload",
+        )
 
     async def _upload_directory_object(
         self, *, relative_dir: str, post_url: PresignedPostUrl
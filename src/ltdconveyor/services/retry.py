@@ -0,0 +1,124 @@
+"""Retries of uploads that fail with transient errors."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from httpx import HTTPStatusError, TransportError
+
+from ..exceptions import S3PresignedUploadError
+
+__all__ = ["RetryPolicy"]
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# S3 error codes, sent with 400 responses, for requests that can be retried
+_RETRYABLE_S3_CODES = (b"<Code>RequestTimeout</Code>",)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How uploads to presigned POST URLs are retried.
+
+    Uploads are retried after transport errors (such as connection resets
+    and timeouts) and after ``5xx``, ``429``, and S3 ``RequestTimeout``
+    responses, including S3's ``503 SlowDown``. Uploads to presigned POST
+    URLs are idempotent, so a retry has the same effect as the original
+    request.
+
+    Delays grow exponentially, with "full jitter": each delay is random,
+    between zero and ``base_delay * 2 ** (attempt - 1)`` (capped at
+    ``max_delay``), so that concurrent uploads that fail together don't
+    retry together.
+    """
+
+    max_attempts: int = 5
+    """Maximum number of attempts of each upload, including the first."""
+
+    base_delay: float = 0.5
+    """Upper bound of the first delay, in seconds."""
+
+    max_delay: float = 20.0
+    """Upper bound of any delay, in seconds."""
+
+    def __post_init__(self) -> None:
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Test if an upload that failed with an error can be retried."""
+        if isinstance(error, S3PresignedUploadError):
+            error = error.error
+        if isinstance(error, TransportError):
+            return True
+        if isinstance(error, HTTPStatusError):
+            status = error.response.status_code
+            if status >= 500 or status == 429:
+                return True
+            if status == 400:
+                return any(
+                    code in error.response.content
+                    for code in _RETRYABLE_S3_CODES
+                )
+        return False
+
+    def get_delay(self, attempt: int) -> float:
+        """Get the delay, in seconds, before retrying an upload.
+
+        Parameters
+        ----------
+        attempt : `int`
+            The number of the attempt that failed, starting from 1.
+        """
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, cap)
+
+    async def run(
+        self, func: Callable[[], Awaitable[T]], *, description: str
+    ) -> T:
+        """Call an upload coroutine function, retrying it on transient
+        errors.
+
+        Parameters
+        ----------
+        func : callable
+            Coroutine function that makes the upload. It's called again for
+            each attempt.
+        description : `str`
+            Description of the upload, for log messages.
+
+        Returns
+        -------
+        result
+            The result of ``func``.
+
+        Raises
+        ------
+        Exception
+            The error from the last attempt, or from the first attempt that
+            can't be retried.
+        """
+        attempt = 1
+        while True:
+            try:
+                return await func()
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_retryable(e):
+                    raise
+                delay = self.get_delay(attempt)
+                logger.warning(
+                    "Retrying %s in %.1f s after attempt %d failed: %s",
+                    description,
+                    delay,
+                    attempt,
+                    e,
+                )
+            await asyncio.sleep(delay)
+            attempt += 1
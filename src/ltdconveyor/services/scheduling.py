@@ -0,0 +1,118 @@
+"""Scheduling of the files of a build upload."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import List, NamedTuple, Tuple
+
+from ..site import SiteFile
+
+__all__ = [
+    "DEFAULT_LARGE_FILE_SIZE",
+    "PAGE_CONTENT_TYPES",
+    "UploadPhase",
+    "plan_uploads",
+]
+
+DEFAULT_LARGE_FILE_SIZE = 1024 * 1024
+"""Size, in bytes, from which files are uploaded in the large-file lane."""
+
+PAGE_CONTENT_TYPES = frozenset({"text/html", "application/xhtml+xml"})
+"""Content types of pages, which are uploaded after all other files."""
+
+
+class UploadPhase(NamedTuple):
+    """A group of files that are uploaded together, in two lanes."""
+
+    name: str
+    """Name of the phase, for log messages: ``"assets"`` or ``"pages"``."""
+
+    large: Tuple[SiteFile, ...]
+    """Large files, largest first."""
+
+    small: Tuple[SiteFile, ...]
+    """Small files, largest first."""
+
+    @property
+    def files(self) -> Tuple[SiteFile, ...]:
+        """All files of the phase."""
+        return self.large + self.small
+
+    def get_lane_workers(self, max_concurrency: int) -> Tuple[int, int]:
+        """Divide workers between the large-file and small-file lanes.
+
+        A quarter of the workers (at least one) upload large files, so that
+        large files, which take the longest, start early, while the other
+        workers get through the many small files. A lane without files
+        gets no workers.
+
+        Parameters
+        ----------
+        max_concurrency : `int`
+            The total number of workers.
+
+        Returns
+        -------
+        workers : `tuple` of `int`
+            Numbers of workers of the large-file and small-file lanes.
+        """
+        max_concurrency = max(max_concurrency, 1)
+        if not self.small:
+            return max_concurrency, 0
+        if not self.large:
+            return 0, max_concurrency
+        large = min(max(max_concurrency // 4, 1), len(self.large))
+        return large, max(max_concurrency - large, 1)
+
+
+def plan_uploads(
+    files: Iterable[SiteFile],
+    *,
+    large_file_size: int = DEFAULT_LARGE_FILE_SIZE,
+) -> List[UploadPhase]:
+    """Plan the order that files are uploaded in.
+
+    Assets (images, style sheets, scripts, and everything else) are
+    uploaded before HTML pages, so that pages don't link to assets that
+    aren't uploaded yet. Within each phase, files are uploaded largest
+    first (longest-processing-time-first scheduling), so that large files
+    don't start last and leave a long tail of uploads.
+
+    Parameters
+    ----------
+    files : iterable of `ltdconveyor.site.SiteFile`
+        The files of a site.
+    large_file_size : `int`, optional
+        Size, in bytes, from which files are uploaded in the large-file
+        lane.
+
+    Returns
+    -------
+    phases : `list` of `UploadPhase`
+        The phases, in order. Phases without files are left out.
+    """
+    assets: List[SiteFile] = []
+    pages: List[SiteFile] = []
+    for site_file in files:
+        if site_file.content_type in PAGE_CONTENT_TYPES:
+            pages.append(site_file)
+        else:
+            assets.append(site_file)
+
+    phases = []
+    for name, phase_files in (("assets", assets), ("pages", pages)):
+        if not phase_files:
+            continue
+        phase_files.sort(key=lambda f: (-f.size, f.path))
+        phases.append(
+            UploadPhase(
+                name=name,
+                large=tuple(
+                    f for f in phase_files if f.size >= large_file_size
+                ),
+                small=tuple(
+                    f for f in phase_files if f.size < large_file_size
+                ),
+            )
+        )
+    return phases
@@ -0,0 +1,226 @@
+"""Scan a local site directory into a manifest of its directories and
+files.
+"""
+
+from __future__ import annotations
+
+import logging
+import mimetypes
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterator, List, NamedTuple, Tuple, Union
+
+__all__ = ["SiteFile", "SiteManifest", "scan_site"]
+
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+"""Content type of files whose type can't be guessed from their name."""
+
+_DirectoryId = Tuple[int, int]
+"""A directory's device and inode numbers, which identify it across symbolic
+links.
+"""
+
+
+class SiteFile(NamedTuple):
+    """A file in a site."""
+
+    path: str
+    """Path of the file relative to the site's root directory, with ``/``
+    separators.
+    """
+
+    dirname: str
+    """Name of the file's directory, relative to the root directory and
+    formatted like the keys of presigned POST URLs: ``"/"`` for the root
+    directory, otherwise ending with ``"/"`` (see
+    `ltdconveyor.s3.presignedpost.format_relative_dirname`).
+    """
+
+    size: int
+    """Size of the file, in bytes."""
+
+    content_type: str
+    """The file's MIME type, guessed from its name."""
+
+
+@dataclass(frozen=True)
+class SiteManifest:
+    """The directories and files of a local site, from a single scan of
+    the file system.
+    """
+
+    base_dir: Path
+    """The site's root directory."""
+
+    dirnames: Tuple[str, ...]
+    """Relative names of all directories, including the root directory
+    (``"/"``), in sorted order.
+    """
+
+    files: Tuple[SiteFile, ...]
+    """All files, sorted by path."""
+
+    @property
+    def total_size(self) -> int:
+        """Total size of the files, in bytes."""
+        return sum(site_file.size for site_file in self.files)
+
+    def local_path(self, site_file: SiteFile) -> Path:
+        """Get the local path of a file in the site."""
+        return self.base_dir.joinpath(*site_file.path.split("/"))
+
+    def describe(self) -> str:
+        """Summarize the site, for log messages."""
+        return (
+            f"{len(self.files)} files ({self.total_size / 1e6:.1f} MB) in "
+            f"{len(self.dirnames)} directories"
+        )
+
+
+def scan_site(
+    base_dir: Union[str, os.PathLike[str]], *, max_workers: int = 1
+) -> SiteManifest:
+    """Scan a local site directory.
+
+    Each directory is read once with `os.scandir`, so directories aren't
+    stat'd again to tell them from files, and each file is stat'd once for
+    its size.
+
+    Parameters
+    ----------
+    base_dir : `str` or path-like
+        The (local) root directory of a web site.
+    max_workers : `int`, optional
+        Maximum number of directories scanned concurrently. Concurrent
+        scans help on network file systems, where each directory read is a
+        round trip.
+
+    Notes
+    -----
+    Symbolic links to directories are followed, except for links to a
+    directory that contains them, which would make the scan recurse
+    forever. Those links are skipped with a warning.
+
+    Returns
+    -------
+    manifest : `SiteManifest`
+        The site's directories and files.
+    """
+    start = time.monotonic()
+    base_path = Path(base_dir)
+    dirnames: List[str] = []
+    files: List[SiteFile] = []
+    if max_workers <= 1:
+        pending = [("", _get_root_ancestors(base_path))]
+        while pending:
+            rel_dir, ancestors = pending.pop()
+            subdirs, dir_files = _scan_directory(base_path, rel_dir)
+            dirnames.append(_format_dirname(rel_dir))
+            files.extend(dir_files)
+            pending.extend(_filter_cycles(subdirs, ancestors))
+    else:
+        for rel_dir, dir_files in _scan_concurrently(base_path, max_workers):
+            dirnames.append(_format_dirname(rel_dir))
+            files.extend(dir_files)
+
+    manifest = SiteManifest(
+        base_dir=base_path,
+        dirnames=tuple(sorted(dirnames, key=lambda d: "" if d == "/" else d)),
+        files=tuple(sorted(files, key=lambda f: f.path)),
+    )
+    logging.getLogger(__name__).debug(
+        "Scanned %s in %.2f s", manifest.describe(), time.monotonic() - start
+    )
+    return manifest
+
+
+def _scan_concurrently(
+    base_path: Path, max_workers: int
+) -> Iterator[Tuple[str, List[SiteFile]]]:
+    """Scan directories in a thread pool, scanning each subdirectory as
+    soon as it's found.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Dict[
+            Future[Tuple[List[Tuple[str, _DirectoryId]], List[SiteFile]]],
+            Tuple[str, AbstractSet[_DirectoryId]],
+        ] = {
+            executor.submit(_scan_directory, base_path, ""): (
+                "",
+                _get_root_ancestors(base_path),
+            )
+        }
+        while pending:
+            done, _ = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel_dir, ancestors = pending.pop(future)
+                subdirs, dir_files = future.result()
+                for subdir in _filter_cycles(subdirs, ancestors):
+                    pending[
+                        executor.submit(_scan_directory, base_path, subdir[0])
+                    ] = subdir
+                yield rel_dir, dir_files
+
+
+def _scan_directory(
+    base_path: Path, rel_dir: str
+) -> Tuple[List[Tuple[str, _DirectoryId]], List[SiteFile]]:
+    """Scan one directory, given by its path relative to the root directory
+    (``""`` for the root directory itself).
+
+    Returns the relative paths and IDs of its subdirectories, and its
+    files.
+    """
+    dirname = _format_dirname(rel_dir)
+    subdirs: List[Tuple[str, _DirectoryId]] = []
+    files: List[SiteFile] = []
+    with os.scandir(base_path / rel_dir) as entries:
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            # Like Path.is_dir, follow symbolic links
+            if entry.is_dir():
+                st = entry.stat()
+                subdirs.append((rel_path, (st.st_dev, st.st_ino)))
+            elif entry.is_file():
+                content_type, _ = mimetypes.guess_type(
+                    entry.name, strict=False
+                )
+                files.append(
+                    SiteFile(
+                        path=rel_path,
+                        dirname=dirname,
+                        size=entry.stat().st_size,
+                        content_type=content_type or DEFAULT_CONTENT_TYPE,
+                    )
+                )
+    return subdirs, files
+
+
+def _get_root_ancestors(base_path: Path) -> AbstractSet[_DirectoryId]:
+    st = os.stat(base_path)
+    return frozenset({(st.st_dev, st.st_ino)})
+
+
+def _filter_cycles(
+    subdirs: List[Tuple[str, _DirectoryId]],
+    ancestors: AbstractSet[_DirectoryId],
+) -> Iterator[Tuple[str, AbstractSet[_DirectoryId]]]:
+    """Yield the subdirectories of a directory that aren't also its
+    ancestors (through symbolic links), with their own ancestors.
+    """
+    for rel_path, directory_id in subdirs:
+        if directory_id in ancestors:
+            logging.getLogger(__name__).warning(
+                "Skipping %s, a symbolic link to a directory that contains it",
+                rel_path,
+            )
+            continue
+        yield rel_path, ancestors | {directory_id}
+
+
+def _format_dirname(rel_dir: str) -> str:
+    return f"{rel_dir}/" if rel_dir else "/"
@@ -0,0 +1,88 @@
+"""Small JSON cache files that are shared between ``ltd`` commands."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+__all__ = ["is_unexpired", "read_cache_file", "write_cache_file"]
+
+logger = logging.getLogger(__name__)
+
+
+def read_cache_file(path: str, version: int) -> Dict[str, Any]:
+    """Read the entries of a cache file.
+
+    Parameters
+    ----------
+    path : `str`
+        Path of the cache file.
+    version : `int`
+        Version of the file format. Files with other versions are ignored.
+
+    Returns
+    -------
+    entries : `dict`
+        The entries, or an empty `dict` if the file doesn't exist or can't
+        be read.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring cache file %s: %s", path, e)
+        return {}
+    if not isinstance(data, dict) or data.get("version") != version:
+        return {}
+    entries = data.get("entries", {})
+    return dict(entries) if isinstance(entries, dict) else {}
+
+
+def write_cache_file(path: str, version: int, entries: Dict[str, Any]) -> None:
+    """Write the entries of a cache file, atomically.
+
+    The file is only readable by its owner. Errors are logged rather than
+    raised, since the cache is only an optimization.
+
+    Parameters
+    ----------
+    path : `str`
+        Path of the cache file.
+    version : `int`
+        Version of the file format.
+    entries : `dict`
+        The entries, which must be serializable as JSON.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    try:
+        os.makedirs(dirname, mode=0o700, exist_ok=True)
+        # mkstemp creates the file with 0600 permissions
+        fd, tmp_path = tempfile.mkstemp(
+            dir=dirname, prefix=".ltd-cache-", suffix=".tmp"
+        )
+    except OSError as e:
+        logger.warning("Could not write cache file %s: %s", path, e)
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "entries": entries}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        logger.warning("Could not write cache file %s: %s", path, e)
+
+
+def is_unexpired(entry: Any) -> bool:
+    """Test if a cache entry has an ``expires_at`` time in the future."""
+    try:
+        return float(entry["expires_at"]) > time.time()
+    except (KeyError, TypeError, ValueError):
+        return False
@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 from urllib.parse import urljoin
 
 import uritemplate
@@ -16,6 +18,8 @@ from ltdconveyor.exceptions import (
     LtdKeeperHttpError,
     LtdKeeperParsingError,
 )
+from ltdconveyor.storage import versioncache
+from ltdconveyor.storage.tokencache import CachedToken, TokenCache
 
 version_type = Tuple[int, int, int]
 
@@ -23,6 +27,8 @@ _version_pattern = re.compile(r"(^\d+)\.(\d+)\.(\d+)")
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 @dataclass
 class PresignedPostUrl:
@@ -55,6 +61,28 @@ class KeeperClient:
         Username for LTD Keeper.
     password : `str`
         Password for LTD Keeper.
+    http_client : `httpx.AsyncClient`
+        The HTTP client.
+    token_cache : `ltdconveyor.storage.tokencache.TokenCache`, optional
+        A token cache file, which is shared with other clients (such as
+        later ``ltd`` commands) so that they don't authenticate again.
+    token_ttl : `float`, optional
+        Lifetime, in seconds, assumed for tokens whose expiration time
+        can't be read from the token itself. The default is
+        `ltdconveyor.storage.tokencache.DEFAULT_TOKEN_TTL`.
+    version_cache : `ltdconveyor.storage.versioncache.VersionCache`, optional
+        Cache of server API versions. The default is an in-memory cache
+        that's shared by the process.
+
+    Notes
+    -----
+    The client authenticates once, and reuses its token until the token is
+    about to expire or a request is rejected with a ``401`` status. When
+    several requests need a new token at once, only one of them requests
+    it.
+
+    The server's API version is also cached, and it's requested without
+    authentication, at the same time as the token.
     """
 
     def __init__(
@@ -64,6 +92,9 @@ class KeeperClient:
         username: str,
         password: str,
         http_client: AsyncClient,
+        token_cache: Optional[TokenCache] = None,
+        token_ttl: Optional[float] = None,
+        version_cache: Optional[versioncache.VersionCache] = None,
     ) -> None:
         """Initialize the client."""
         # Strip the trailing slash from the base URL so that we can
@@ -75,9 +106,46 @@ class KeeperClient:
         self._username = username
         self._password = password
         self._http_client = http_client
+        self._token_cache = token_cache
+        self._token_ttl = token_ttl
+        self._token: Optional[CachedToken] = None
+        self._token_cache_read = False
+        # Created lazily so that it's bound to the running event loop
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._version_cache = (
+            version_cache or versioncache.get_default_version_cache()
+        )
+        self._version_lock: Optional[asyncio.Lock] = None
 
     async def get_token(self) -> str:
-        """Get an authentication token."""
+        """Get an authentication token, reusing the current token while
+        it's valid.
+        """
+        token = self._get_current_token()
+        if token is not None:
+            return token
+        async with self._get_token_lock():
+            # Another request may have refreshed the token in the meantime
+            token = await self._get_cached_token()
+            if token is not None:
+                return token
+            self._token = await self._request_token()
+            if self._token_cache is not None:
+                await _run_in_thread(
+                    self._token_cache.set,
+                    self._base_url,
+                    self._username,
+                    self._token,
+                )
+            return self._token.token
+
+    def _get_token_lock(self) -> asyncio.Lock:
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        return self._token_lock
+
+    async def _request_token(self) -> CachedToken:
+        """Request a new token with the username and password."""
         endpoint = f"{self._base_url}/token"
         r = await self._http_client.get(
             endpoint, auth=(self._username, self._password)
@@ -87,8 +155,66 @@ class KeeperClient:
                 f"Could not authenticate to {self._base_url} as "
                 f"{self._username}"
             )
+        logger.debug("Got a token for %s", self._username)
+        return CachedToken.from_token(
+            r.json()["token"], default_ttl=self._token_ttl
+        )
+
+    def _get_current_token(self) -> Optional[str]:
+        """Get the current token, if it's still valid."""
+        if self._token is not None and self._token.is_valid():
+            return self._token.token
+        return None
+
+    async def _get_cached_token(self) -> Optional[str]:
+        """Get the current token, or a token from the cache file, if it's
+        still valid.
+
+        The cache file is only read once, in a thread, with the token lock
+        held.
+        """
+        if self._token is None and self._token_cache is not None:
+            if not self._token_cache_read:
+                self._token_cache_read = True
+                self._token = await _run_in_thread(
+                    self._token_cache.get, self._base_url, self._username
+                )
+        return self._get_current_token()
 
-        return r.json()["token"]
+    async def _invalidate_token(self, token: str) -> None:
+        """Discard a token that the server rejected, unless it's already
+        been replaced.
+        """
+        if self._token is not None and self._token.token == token:
+            logger.debug("Token for %s was rejected", self._username)
+            self._token = None
+            if self._token_cache is not None:
+                # Hold the lock so that a new token isn't cached first
+                async with self._get_token_lock():
+                    await _run_in_thread(
+                        self._token_cache.delete,
+                        self._base_url,
+                        self._username,
+                    )
+
+    async def _request(self, method: str, endpoint: str, **kwargs: Any) -> Any:
+        """Send an authenticated request, and get the JSON response.
+
+        A request that's rejected because the token expired is sent again
+        with a new token.
+        """
+        token = await self.get_token()
+        r = await self._http_client.request(
+            method, endpoint, auth=(token, ""), **kwargs
+        )
+        if r.status_code == 401:
+            await self._invalidate_token(token)
+            token = await self.get_token()
+            r = await self._http_client.request(
+                method, endpoint, auth=(token, ""), **kwargs
+            )
+        r.raise_for_status()
+        return r.json()
 
     async def get(
         self,
@@ -105,13 +231,7 @@ class KeeperClient:
         else:
             raise ValueError("Must provide a path or url argument")
 
-        token = await self.get_token()
-
-        r = await self._http_client.get(
-            endpoint, auth=(token, ""), headers=headers or {}
-        )
-        r.raise_for_status()
-        return r.json()
+        return await self._request("GET", endpoint, headers=headers or {})
 
     async def post(
         self,
@@ -129,13 +249,9 @@ class KeeperClient:
         else:
             raise ValueError("Must provide a path or url argument")
 
-        token = await self.get_token()
-
-        r = await self._http_client.post(
-            endpoint, json=data, auth=(token, ""), headers=headers or {}
+        return await self._request(
+            "POST", endpoint, json=data, headers=headers or {}
         )
-        r.raise_for_status
-        return r.json()
 
     async def patch(
         self,
@@ -153,18 +269,50 @@ class KeeperClient:
         else:
             raise ValueError("Must provide a path or url argument")
 
-        token = await self.get_token()
-
-        r = await self._http_client.patch(
-            endpoint, json=data, auth=(token, ""), headers=headers or {}
+        return await self._request(
+            "PATCH", endpoint, json=data, headers=headers or {}
         )
-        r.raise_for_status()
-        return r.json()
 
     async def get_api_version(self) -> tuple[int, int, int]:
-        """Get the API version of the LTD Keeper instance."""
+        """Get the API version of the LTD Keeper instance, from the version
+        cache if possible.
+        """
+        version = await self._call_version_cache(
+            self._version_cache.get, self._base_url
+        )
+        if version is not None:
+            return version
+        if self._version_lock is None:
+            self._version_lock = asyncio.Lock()
+        async with self._version_lock:
+            version = await self._call_version_cache(
+                self._version_cache.get, self._base_url
+            )
+            if version is None:
+                version = await self._request_api_version()
+                await self._call_version_cache(
+                    self._version_cache.set, self._base_url, version
+                )
+            return version
+
+    async def _call_version_cache(
+        self, func: Callable[..., T], *args: Any
+    ) -> T:
+        """Call a method of the version cache, in a thread if the cache has
+        a file.
+        """
+        if self._version_cache.path is None:
+            return func(*args)
+        return await _run_in_thread(func, *args)
+
+    async def _request_api_version(self) -> tuple[int, int, int]:
+        """Request the API version from the server's (public) metadata
+        endpoint.
+        """
         try:
-            data = await self.get(path="/")
+            r = await self._http_client.get(f"{self._base_url}/")
+            r.raise_for_status()
+            data = r.json()
         except HTTPError as e:
             raise LtdKeeperHttpError("Could not get server version.", e) from e
 
@@ -218,7 +366,10 @@ class KeeperClient:
         ltdconveyor.keeper.KeeperError
             Raised if there is an error communicating with the LTD Keeper API.
         """
-        version = await self.get_api_version()
+        # Get a token for the registration while negotiating the version
+        version, _ = await asyncio.gather(
+            self.get_api_version(), self.get_token()
+        )
         if version >= (2, 0, 0):
             if org is None:
                 raise ValueError(
@@ -353,3 +504,11 @@ class KeeperClient:
             raise LtdKeeperHttpError(
                 f"Failed to confirm build at {build_url}", e
             ) from e
+
+
+async def _run_in_thread(func: Callable[..., T], *args: Any) -> T:
+    """Run blocking file I/O, such as reading a cache file, in the event
+    loop's default executor (like `asyncio.to_thread` in Python 3.9+).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args))
@@ -0,0 +1,151 @@
+"""Cache of LTD Keeper authentication tokens."""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import time
+from typing import Any, Dict, NamedTuple, Optional, Union
+
+from ltdconveyor.storage.cachefile import (
+    is_unexpired,
+    read_cache_file,
+    write_cache_file,
+)
+
+__all__ = ["DEFAULT_TOKEN_TTL", "CachedToken", "TokenCache"]
+
+DEFAULT_TOKEN_TTL = 50 * 60
+"""Lifetime, in seconds, assumed for tokens that don't have an expiration
+time (LTD Keeper's tokens last an hour by default).
+"""
+
+_EXPIRY_MARGIN = 60.0
+"""Tokens are refreshed this many seconds before they expire, so that they
+don't expire while a request is in flight.
+"""
+
+_VERSION = 1
+"""Version of the cache file format."""
+
+
+class CachedToken(NamedTuple):
+    """An authentication token and its expiration time."""
+
+    token: str
+    """The token."""
+
+    expires_at: float
+    """Expiration time, in seconds since the epoch."""
+
+    @classmethod
+    def from_token(
+        cls, token: str, *, default_ttl: Optional[float] = None
+    ) -> CachedToken:
+        """Create a cached token, reading its expiration time from the
+        token itself if it's a JSON web signature with an ``exp`` claim.
+
+        Parameters
+        ----------
+        token : `str`
+            The token.
+        default_ttl : `float`, optional
+            Lifetime, in seconds, of a token without an expiration time.
+            The default is `DEFAULT_TOKEN_TTL`.
+        """
+        expires_at = _parse_expiry(token)
+        if expires_at is None:
+            if default_ttl is None:
+                default_ttl = DEFAULT_TOKEN_TTL
+            expires_at = time.time() + default_ttl
+        return cls(token=token, expires_at=expires_at)
+
+    def is_valid(self) -> bool:
+        """Test if the token can still be used, with a margin before it
+        expires.
+        """
+        return time.time() < self.expires_at - _EXPIRY_MARGIN
+
+
+class TokenCache:
+    """A token cache file, which lets consecutive ``ltd`` commands reuse a
+    token rather than authenticating again.
+
+    Tokens are keyed by the API's URL and the username. The file is only
+    readable by its owner, since its tokens grant the same access as the
+    passwords they were issued for.
+
+    Parameters
+    ----------
+    path : `str` or path-like
+        Path of the cache file, which may start with ``~``. It's created if
+        it doesn't exist.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike[str]]) -> None:
+        self._path = os.path.expanduser(os.fspath(path))
+
+    @property
+    def path(self) -> str:
+        """Path of the cache file."""
+        return self._path
+
+    def get(self, base_url: str, username: str) -> Optional[CachedToken]:
+        """Get a token, if one is cached and still valid."""
+        entry: Any = self._read().get(_get_key(base_url, username))
+        try:
+            token = CachedToken(
+                token=str(entry["token"]),
+                expires_at=float(entry["expires_at"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+        return token if token.is_valid() else None
+
+    def set(self, base_url: str, username: str, token: CachedToken) -> None:
+        """Cache a token, replacing any token for the same user."""
+        entries = {
+            key: entry
+            for key, entry in self._read().items()
+            if is_unexpired(entry)
+        }
+        entries[_get_key(base_url, username)] = token._asdict()
+        self._write(entries)
+
+    def delete(self, base_url: str, username: str) -> None:
+        """Remove a user's token, such as one that was rejected."""
+        entries = self._read()
+        if entries.pop(_get_key(base_url, username), None) is not None:
+            self._write(entries)
+
+    def _read(self) -> Dict[str, Any]:
+        return read_cache_file(self._path, _VERSION)
+
+    def _write(self, entries: Dict[str, Any]) -> None:
+        write_cache_file(self._path, _VERSION, entries)
+
+
+def _get_key(base_url: str, username: str) -> str:
+    return f"{username}@{base_url.rstrip('/')}"
+
+
+def _parse_expiry(token: str) -> Optional[float]:
+    """Get the ``exp`` claim of a JSON web signature token, from either its
+    header (as in LTD Keeper's tokens) or its payload.
+    """
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    for part in parts[:2]:
+        try:
+            data = json.loads(
+                base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+            )
+        except ValueError:
+            continue
+        if isinstance(data, dict) and isinstance(
+            data.get("exp"), (int, float)
+        ):
+            return float(data["exp"])
+    return None
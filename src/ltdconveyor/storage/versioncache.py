@@ -0,0 +1,112 @@
+"""Cache of the API versions of LTD Keeper servers."""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+from ltdconveyor.storage.cachefile import (
+    is_unexpired,
+    read_cache_file,
+    write_cache_file,
+)
+
+__all__ = [
+    "DEFAULT_VERSION_TTL",
+    "VersionCache",
+    "get_default_version_cache",
+]
+
+DEFAULT_VERSION_TTL = 60 * 60
+"""Time, in seconds, that a server's version is cached for."""
+
+_VERSION = 1
+"""Version of the cache file format."""
+
+version_type = Tuple[int, int, int]
+
+
+class VersionCache:
+    """Server API versions, by base URL, cached in memory and optionally in
+    a file that's shared between ``ltd`` commands.
+
+    Parameters
+    ----------
+    path : `str` or path-like, optional
+        Path of the cache file, which may start with ``~``. It's created if
+        it doesn't exist. If `None`, versions are only cached in memory.
+    ttl : `float`, optional
+        Time, in seconds, that versions are cached for.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, os.PathLike[str]]] = None,
+        *,
+        ttl: float = DEFAULT_VERSION_TTL,
+    ) -> None:
+        self._path = (
+            os.path.expanduser(os.fspath(path)) if path is not None else None
+        )
+        self._ttl = ttl
+        self._entries: Dict[str, Tuple[version_type, float]] = {}
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path of the cache file, or `None` if versions are only cached in
+        memory.
+        """
+        return self._path
+
+    def get(self, base_url: str) -> Optional[version_type]:
+        """Get a server's version, if it's cached and hasn't expired."""
+        key = _get_key(base_url)
+        entry = self._entries.get(key)
+        if entry is None and self._path is not None:
+            entry = _parse_entry(
+                read_cache_file(self._path, _VERSION).get(key)
+            )
+            if entry is not None:
+                self._entries[key] = entry
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def set(self, base_url: str, version: version_type) -> None:
+        """Cache a server's version."""
+        key = _get_key(base_url)
+        expires_at = time.time() + self._ttl
+        self._entries[key] = (version, expires_at)
+        if self._path is not None:
+            entries = {
+                k: entry
+                for k, entry in read_cache_file(self._path, _VERSION).items()
+                if is_unexpired(entry)
+            }
+            entries[key] = {"version": list(version), "expires_at": expires_at}
+            write_cache_file(self._path, _VERSION, entries)
+
+    def clear(self) -> None:
+        """Forget the versions cached in memory."""
+        self._entries.clear()
+
+
+_default_cache = VersionCache()
+
+
+def get_default_version_cache() -> VersionCache:
+    """Get the in-memory version cache that's shared by the process."""
+    return _default_cache
+
+
+def _get_key(base_url: str) -> str:
+    return base_url.rstrip("/")
+
+
+def _parse_entry(entry: Any) -> Optional[Tuple[version_type, float]]:
+    try:
+        major, minor, patch = (int(part) for part in entry["version"])
+        return (major, minor, patch), float(entry["expires_at"])
+    except (KeyError, TypeError, ValueError):
+        return None
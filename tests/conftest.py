@@ -1,13 +1,80 @@
 from __future__ import annotations
 
-from typing import Iterator
+from collections.abc import AsyncIterator, Callable
+from typing import Any, Iterator, cast
 
 import pytest
+import pytest_asyncio
 import respx
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
 
+from ltdconveyor.factory import Factory
+from ltdconveyor.s3 import S3Context
+from ltdconveyor.services.projects import ProjectService
+from ltdconveyor.storage.versioncache import get_default_version_cache
 from tests.support.keepermock import MockKeeper, patch_factory_keeper
+from tests.support.s3mock import MockS3Client, MockSession
+
+
+@pytest.fixture(autouse=True)
+def clear_version_cache() -> Iterator[None]:
+    """Don't share cached server versions between tests."""
+    yield
+    get_default_version_cache().clear()
 
 
 @pytest.fixture
 def mock_keeper(respx_mock: respx.Router) -> Iterator[MockKeeper]:
     yield from patch_factory_keeper(respx_mock=respx_mock)
+
+
+@pytest_asyncio.fixture
+async def http_client() -> AsyncIterator[AsyncClient]:
+    async with AsyncClient() as client:
+        yield client
+
+
+@pytest.fixture
+def create_project_service(
+    http_client: AsyncClient, mock_keeper: MockKeeper
+) -> Callable[..., ProjectService]:
+    """Create project services that upload builds to the mock LTD Keeper.
+
+    Keyword arguments are passed to `ltdconveyor.factory.Factory`.
+    """
+
+    def create(**kwargs: Any) -> ProjectService:
+        factory = Factory(
+            http_client=http_client,
+            api_base="https://keeper.example.com",
+            api_username="username",
+            api_password="password",
+            **kwargs,
+        )
+        return factory.get_project_service()
+
+    return create
+
+
+@pytest.fixture
+def s3_client() -> MockS3Client:
+    """An in-memory S3 client for a bucket named ``bucket``."""
+    return MockS3Client("bucket")
+
+
+@pytest.fixture
+def s3_context(s3_client: MockS3Client) -> S3Context:
+    """An S3 context whose client is ``s3_client``."""
+    return S3Context(session=cast(Any, MockSession(s3_client)))
+
+
+@pytest.fixture
+def mock_s3_session(s3_client: MockS3Client, mocker: MockerFixture) -> None:
+    """Make the boto3 sessions that ``upload_dir`` creates use
+    ``s3_client``.
+    """
+    mocker.patch(
+        "ltdconveyor.s3.upload.boto3.session.Session",
+        return_value=MockSession(s3_client),
+    )
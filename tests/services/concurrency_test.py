@@ -0,0 +1,107 @@
+"""Tests for ltdconveyor.services.concurrency."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+import pytest
+
+from ltdconveyor.services import concurrency
+from ltdconveyor.services.concurrency import ByteLimiter, run_workers
+
+
+@pytest.mark.asyncio
+async def test_run_workers_limits() -> None:
+    state = {"running": 0, "max_running": 0, "max_bytes": 0}
+    limiter = ByteLimiter(100)
+    handled: List[int] = []
+
+    async def handle(item: int) -> None:
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        state["max_bytes"] = max(state["max_bytes"], 100 - limiter.available)
+        await asyncio.sleep(0.001)
+        handled.append(item)
+        state["running"] -= 1
+
+    # Sizes are the items; 500 is larger than the limit
+    items = [10, 30, 50, 500, 20, 40] * 10
+    await run_workers(
+        iter(items),
+        handle,
+        max_concurrency=4,
+        byte_limiter=limiter,
+        size=lambda item: item,
+    )
+
+    assert sorted(handled) == sorted(items)
+    assert state["max_running"] <= 4
+    assert state["max_bytes"] <= 100
+    assert limiter.available == 100
+
+
+@pytest.mark.asyncio
+async def test_run_workers_failure() -> None:
+    handled: List[int] = []
+
+    async def handle(item: int) -> None:
+        if item == 5:
+            raise RuntimeError("failed")
+        await asyncio.sleep(0.001)
+        handled.append(item)
+
+    with pytest.raises(RuntimeError):
+        await run_workers(range(1000), handle, max_concurrency=4)
+
+    # The other workers are cancelled and the producer stops
+    await asyncio.sleep(0.01)
+    assert len(handled) < 100
+
+
+@pytest.mark.asyncio
+async def test_run_lanes() -> None:
+    """Each lane's workers start with its items, and move on to other lanes
+    once their lane is empty.
+    """
+    started: List[str] = []
+    finished: List[str] = []
+
+    async def handle(item: str) -> None:
+        if item == "large2":
+            assert "large0" not in finished
+        started.append(item)
+        await asyncio.sleep(0.1 if item.startswith("large") else 0.001)
+        finished.append(item)
+
+    large = [f"large{i}" for i in range(3)]
+    small = [f"small{i}" for i in range(20)]
+    await concurrency.run_lanes([large, small], handle, workers=[1, 3])
+
+    assert sorted(started) == sorted(large + small)
+    # One worker starts on the large files, the others on the small files
+    assert started[:4] == ["large0", "small0", "small1", "small2"]
+    # Small-file workers finish the small files, then take the remaining
+    # large files (before the first large file is done)
+    assert started.index("large1") > started.index("small19")
+    assert [item for item in started if item in large] == large
+
+
+@pytest.mark.asyncio
+async def test_run_lanes_failure() -> None:
+    handled: List[int] = []
+
+    async def handle(item: int) -> None:
+        if item == 5:
+            raise RuntimeError("failed")
+        await asyncio.sleep(0.001)
+        handled.append(item)
+
+    with pytest.raises(RuntimeError):
+        await concurrency.run_lanes(
+            [range(0, 500), range(500, 1000)], handle, workers=[2, 2]
+        )
+    assert len(handled) < 100
+
+    with pytest.raises(ValueError):
+        await concurrency.run_lanes([[1], [2]], handle, workers=[0, 0])
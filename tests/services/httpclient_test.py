@@ -0,0 +1,38 @@
+"""Tests for ltdconveyor.services.httpclient."""
+
+from __future__ import annotations
+
+import pytest
+
+from ltdconveyor.factory import Factory
+from ltdconveyor.services.httpclient import HTTPClientSettings
+
+
+def test_limits_match_concurrency() -> None:
+    """By default, each concurrent upload keeps its own connection."""
+    limits = HTTPClientSettings().get_limits(max_concurrency=32)
+    assert limits.max_connections == 34
+    assert limits.max_keepalive_connections == 34
+
+    settings = HTTPClientSettings(
+        max_connections=8, max_keepalive_connections=100
+    )
+    limits = settings.get_limits(max_concurrency=32)
+    assert limits.max_connections == 8
+    assert limits.max_keepalive_connections == 8
+
+
+def test_timeout() -> None:
+    timeout = HTTPClientSettings(timeout=30.0).get_timeout()
+    assert (timeout.connect, timeout.read, timeout.write) == (30, 30, 30)
+    timeout = HTTPClientSettings(connect_timeout=2.0).get_timeout()
+    assert (timeout.connect, timeout.read) == (2.0, 5.0)
+
+    with pytest.raises(ValueError):
+        HTTPClientSettings(timeout=0)
+
+
+@pytest.mark.asyncio
+async def test_create_http_client() -> None:
+    async with Factory.create_http_client(upload_concurrency=4) as client:
+        assert client.timeout.read == 5.0
@@ -2,43 +2,256 @@
 
 from __future__ import annotations
 
+import gzip
+import re
+import threading
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any, List, Tuple
 
+import httpx
 import pytest
 import respx
-from httpx import AsyncClient
+from pytest_mock import MockerFixture
 
-from ltdconveyor.factory import Factory
+from ltdconveyor.compression import CompressionSettings, Precompressor
+from ltdconveyor.exceptions import S3PresignedUploadBatchError
+from ltdconveyor.services.projects import ProjectService
+from ltdconveyor.services.retry import RetryPolicy
+from ltdconveyor.storage.keeper import BuildInfo
 from tests.support.keepermock import MockKeeper
 
+_TEST_SITE_DIR = Path(__file__).parent.parent / "data" / "test-site"
+
+
+def _get_object_key(request: httpx.Request) -> str:
+    """Get the key of the object that a presigned POST request uploads,
+    as S3 does by replacing ``${filename}`` in the key field.
+    """
+    key = re.search(rb'name="key"\r\n\r\n(.*?)\r\n', request.content)
+    filename = re.search(rb'; filename="(.*?)"', request.content)
+    assert key is not None
+    assert filename is not None
+    return key[1].decode().replace("${filename}", filename[1].decode())
+
 
 @pytest.mark.asyncio
 async def test_upload(
     respx_mock: respx.Router,
     mock_keeper: MockKeeper,
+    create_project_service: Callable[..., ProjectService],
 ) -> None:
     """Test uploading a build to a v1 API."""
-    async with AsyncClient() as http_client:
-        factory = Factory(
-            http_client=http_client,
-            api_base="https://keeper.example.com",
-            api_username="username",
-            api_password="password",
-        )
-        project_service = factory.get_project_service()
+    project_service = create_project_service()
+    await project_service.upload_build(
+        base_dir=_TEST_SITE_DIR,
+        project="test-project",
+        git_ref="main",
+    )
+
+    for route in respx_mock.routes:
+        if not route.called:
+            print(f"Not called: {route.name}")
+    respx_mock.assert_all_called()
+
+    build_keys = list(mock_keeper.builds.keys())
+    assert len(build_keys) == 1
+    assert mock_keeper.builds[build_keys[0]].uploaded is True
+
+
+@pytest.mark.asyncio
+async def test_upload_streams_files(
+    respx_mock: respx.Router,
+    mock_keeper: MockKeeper,
+    create_project_service: Callable[..., ProjectService],
+) -> None:
+    """Files are sent as multipart form data with a Content-Length."""
+    project_service = create_project_service(upload_concurrency=2)
+    await project_service.upload_build(
+        base_dir=_TEST_SITE_DIR,
+        project="test-project",
+        git_ref="main",
+    )
+
+    index_html = (_TEST_SITE_DIR / "index.html").read_bytes()
+    route = respx_mock.routes["POST https://example.com/presigned-url/"]
+    request = route.calls.last.request
+    assert "transfer-encoding" not in request.headers
+    assert int(request.headers["Content-Length"]) == len(request.content)
+    assert request.headers["Content-Type"].startswith("multipart/form-data")
+    assert b'name="Content-Type"\r\n\r\ntext/html\r\n' in request.content
+    assert b'filename="index.html"\r\n\r\n' + index_html in request.content
+
+
+def _patch_upload_route(
+    mock_keeper: MockKeeper,
+    respx_mock: respx.Router,
+    responses: List[httpx.Response],
+) -> None:
+    """Make the presigned POST URL of the root directory respond with a
+    sequence of responses once the build is registered.
+    """
+    register_build = mock_keeper.register_build
+
+    async def register(**kwargs: Any) -> BuildInfo:
+        build_info = await register_build(**kwargs)
+        route = respx_mock.routes["POST https://example.com/presigned-url/"]
+        route.side_effect = responses
+        return build_info
+
+    mock_keeper.register_build = register  # type: ignore[method-assign]
+
+
+@pytest.mark.asyncio
+async def test_upload_retries(
+    respx_mock: respx.Router,
+    mock_keeper: MockKeeper,
+    mocker: MockerFixture,
+    create_project_service: Callable[..., ProjectService],
+) -> None:
+    """A transient error is retried."""
+    mocker.patch("ltdconveyor.services.retry.asyncio.sleep")
+    _patch_upload_route(
+        mock_keeper,
+        respx_mock,
+        [httpx.Response(503), httpx.Response(200)],
+    )
+    project_service = create_project_service()
+    await project_service.upload_build(
+        base_dir=_TEST_SITE_DIR,
+        project="test-project",
+        git_ref="main",
+    )
+
+    build = list(mock_keeper.builds.values())[0]
+    assert build.uploaded is True
 
-        test_site_dir = Path(__file__).parent.parent / "data" / "test-site"
+
+@pytest.mark.asyncio
+async def test_upload_fails_after_retries(
+    respx_mock: respx.Router,
+    mock_keeper: MockKeeper,
+    mocker: MockerFixture,
+    create_project_service: Callable[..., ProjectService],
+) -> None:
+    """Failures are reported once retries run out."""
+    mocker.patch("ltdconveyor.services.retry.asyncio.sleep")
+    _patch_upload_route(mock_keeper, respx_mock, [httpx.Response(503)] * 3)
+    project_service = create_project_service(
+        upload_retry_policy=RetryPolicy(max_attempts=3)
+    )
+    with pytest.raises(S3PresignedUploadBatchError) as exc_info:
         await project_service.upload_build(
-            base_dir=test_site_dir,
+            base_dir=_TEST_SITE_DIR,
             project="test-project",
             git_ref="main",
         )
 
-        for route in respx_mock.routes:
-            if not route.called:
-                print(f"Not called: {route.name}")
-        respx_mock.assert_all_called()
+    assert [path for path, _ in exc_info.value.failures] == ["index.html"]
+    assert "index.html" in str(exc_info.value)
+    build = list(mock_keeper.builds.values())[0]
+    assert build.uploaded is False
+
+
+@pytest.mark.asyncio
+async def test_upload_compressed(
+    respx_mock: respx.Router,
+    mock_keeper: MockKeeper,
+    tmp_path: Path,
+    create_project_service: Callable[..., ProjectService],
+) -> None:
+    """Text files are uploaded compressed, with a Content-Encoding field."""
+    html = b"<p>Hello, world!</p>\n" * 200
+    (tmp_path / "index.html").write_bytes(html)
+    project_service = create_project_service(
+        upload_compression=CompressionSettings(max_workers=1)
+    )
+    await project_service.upload_build(
+        base_dir=tmp_path,
+        project="test-project",
+        git_ref="main",
+    )
+
+    route = respx_mock.routes["POST https://example.com/presigned-url/"]
+    request = route.calls.last.request
+    assert int(request.headers["Content-Length"]) == len(request.content)
+    assert b'name="Content-Encoding"\r\n\r\ngzip\r\n' in request.content
+    # The compressed file is uploaded under the original file's name
+    assert b'filename="index.html"' in request.content
+    assert _get_object_key(request) == "builds/1/index.html"
+    assert b'name="Content-Type"\r\n\r\ntext/html\r\n' in request.content
+    assert html not in request.content
+    _, _, body = request.content.partition(b'filename="')
+    _, _, body = body.partition(b"\r\n\r\n")
+    compressed, _, _ = body.rpartition(b"\r\n--")
+    assert gzip.decompress(compressed) == html
+    assert list(mock_keeper.builds.values())[0].uploaded is True
+
+
+@pytest.mark.asyncio
+async def test_upload_compressed_off_event_loop(
+    respx_mock: respx.Router,
+    mocker: MockerFixture,
+    tmp_path: Path,
+    create_project_service: Callable[..., ProjectService],
+) -> None:
+    """The precompressor is started, cleaned up, and stopped in the upload
+    executor, rather than blocking the event loop.
+    """
+    (tmp_path / "index.html").write_bytes(b"<p>Hello, world!</p>\n" * 200)
+    threads: List[Tuple[str, str]] = []
+
+    def record(name: str, method: Any) -> Any:
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            threads.append((name, threading.current_thread().name))
+            return method(*args, **kwargs)
+
+        return wrapper
+
+    for name in ("__init__", "discard", "close"):
+        mocker.patch.object(
+            Precompressor, name, record(name, getattr(Precompressor, name))
+        )
+    project_service = create_project_service(
+        upload_compression=CompressionSettings(max_workers=0)
+    )
+    await project_service.upload_build(
+        base_dir=tmp_path,
+        project="test-project",
+        git_ref="main",
+    )
+
+    assert [name for name, _ in threads] == ["__init__", "discard", "close"]
+    for _, thread_name in threads:
+        assert thread_name.startswith("ltd-upload")
+
+
+@pytest.mark.asyncio
+async def test_upload_assets_before_pages(
+    respx_mock: respx.Router,
+    tmp_path: Path,
+    create_project_service: Callable[..., ProjectService],
+) -> None:
+    """Pages are uploaded once all the assets are uploaded."""
+    (tmp_path / "index.html").write_bytes(b"<p>Home</p>")
+    (tmp_path / "about.html").write_bytes(b"<p>About</p>")
+    (tmp_path / "app.css").write_bytes(b"p {}" * 10)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" * 100)
+    project_service = create_project_service(upload_concurrency=1)
+    await project_service.upload_build(
+        base_dir=tmp_path,
+        project="test-project",
+        git_ref="main",
+    )
 
-        build_keys = list(mock_keeper.builds.keys())
-        assert len(build_keys) == 1
-        assert mock_keeper.builds[build_keys[0]].uploaded is True
+    route = respx_mock.routes["POST https://example.com/presigned-url/"]
+    filenames = [
+        call.request.content.partition(b'filename="')[2].partition(b'"')[0]
+        for call in route.calls
+    ]
+    assert filenames == [
+        b"logo.png",
+        b"app.css",
+        b"about.html",
+        b"index.html",
+    ]
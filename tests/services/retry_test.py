@@ -0,0 +1,89 @@
+"""Tests for ltdconveyor.services.retry."""
+
+from __future__ import annotations
+
+from typing import List
+
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+
+from ltdconveyor.exceptions import S3PresignedUploadError
+from ltdconveyor.services.retry import RetryPolicy
+
+
+def make_status_error(status_code: int, content: bytes = b"") -> Exception:
+    request = httpx.Request("POST", "https://example.com/")
+    response = httpx.Response(status_code, content=content, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def test_is_retryable() -> None:
+    policy = RetryPolicy()
+    request = httpx.Request("POST", "https://example.com/")
+
+    assert policy.is_retryable(httpx.ConnectError("reset", request=request))
+    assert policy.is_retryable(httpx.ReadTimeout("timeout", request=request))
+    assert policy.is_retryable(make_status_error(503, b"<Code>SlowDown"))
+    assert policy.is_retryable(make_status_error(500))
+    assert policy.is_retryable(make_status_error(429))
+    assert policy.is_retryable(
+        make_status_error(400, b"<Error><Code>RequestTimeout</Code></Error>")
+    )
+    # Wrapped errors are unwrapped
+    error = make_status_error(502)
+    assert isinstance(error, httpx.HTTPStatusError)
+    assert policy.is_retryable(S3PresignedUploadError("upload", error))
+
+    assert not policy.is_retryable(make_status_error(403))
+    assert not policy.is_retryable(make_status_error(400))
+    assert not policy.is_retryable(OSError("missing file"))
+
+
+def test_get_delay() -> None:
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    for _ in range(100):
+        assert 0 <= policy.get_delay(1) <= 1.0
+        assert 0 <= policy.get_delay(3) <= 4.0
+        assert 0 <= policy.get_delay(10) <= 5.0
+
+
+@pytest.mark.asyncio
+async def test_run_retries(mocker: MockerFixture) -> None:
+    sleep = mocker.patch("ltdconveyor.services.retry.asyncio.sleep")
+    errors: List[Exception] = [make_status_error(503), make_status_error(500)]
+
+    async def upload() -> str:
+        if errors:
+            raise errors.pop(0)
+        return "done"
+
+    assert await RetryPolicy().run(upload, description="test") == "done"
+    assert sleep.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_run_gives_up(mocker: MockerFixture) -> None:
+    mocker.patch("ltdconveyor.services.retry.asyncio.sleep")
+    calls = 0
+
+    async def upload() -> None:
+        nonlocal calls
+        calls += 1
+        raise make_status_error(503)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await RetryPolicy(max_attempts=3).run(upload, description="test")
+    assert calls == 3
+
+    # Errors that can't be retried are raised immediately
+    calls = 0
+
+    async def forbidden() -> None:
+        nonlocal calls
+        calls += 1
+        raise make_status_error(403)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await RetryPolicy(max_attempts=3).run(forbidden, description="test")
+    assert calls == 1
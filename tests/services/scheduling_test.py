@@ -0,0 +1,58 @@
+"""Tests for ltdconveyor.services.scheduling."""
+
+from __future__ import annotations
+
+from ltdconveyor.services.scheduling import plan_uploads
+from ltdconveyor.site import SiteFile
+
+
+def _file(path: str, size: int, content_type: str) -> SiteFile:
+    return SiteFile(
+        path=path, dirname="/", size=size, content_type=content_type
+    )
+
+
+def test_plan_uploads() -> None:
+    """Assets are uploaded before pages, largest first in each lane."""
+    files = [
+        _file("index.html", 20_000, "text/html"),
+        _file("big.html", 3_000_000, "text/html"),
+        _file("app.css", 5_000, "text/css"),
+        _file("video.mp4", 50_000_000, "video/mp4"),
+        _file("logo.png", 40_000, "image/png"),
+        _file("paper.pdf", 2_000_000, "application/pdf"),
+        _file("about.html", 20_000, "text/html"),
+    ]
+
+    assets, pages = plan_uploads(files)
+
+    assert assets.name == "assets"
+    assert [f.path for f in assets.large] == ["video.mp4", "paper.pdf"]
+    assert [f.path for f in assets.small] == ["logo.png", "app.css"]
+    assert pages.name == "pages"
+    assert [f.path for f in pages.large] == ["big.html"]
+    # Ties are broken by path, so the order is deterministic
+    assert [f.path for f in pages.small] == ["about.html", "index.html"]
+    assert len(pages.files) == 3
+
+
+def test_plan_uploads_without_assets() -> None:
+    (pages,) = plan_uploads([_file("index.html", 100, "text/html")])
+    assert pages.name == "pages"
+    assert plan_uploads([]) == []
+
+
+def test_lane_workers() -> None:
+    assets, pages = plan_uploads(
+        [
+            _file("a.pdf", 2_000_000, "application/pdf"),
+            _file("b.pdf", 3_000_000, "application/pdf"),
+            _file("a.png", 1_000, "image/png"),
+            _file("index.html", 100, "text/html"),
+        ]
+    )
+
+    assert assets.get_lane_workers(16) == (2, 14)
+    assert assets.get_lane_workers(1) == (1, 1)
+    # Lanes without files get no workers
+    assert pages.get_lane_workers(16) == (0, 16)
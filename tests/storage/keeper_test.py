@@ -2,16 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
+import threading
 from pathlib import Path
 from typing import Any
 
+import httpx
 import pytest
 import respx
 from httpx import AsyncClient
 
 from ltdconveyor.storage.keeper import KeeperClient
+from ltdconveyor.storage.tokencache import CachedToken, TokenCache
+from ltdconveyor.storage.versioncache import VersionCache
 
 
 def load_keeper_response(filename: str) -> Any:
@@ -57,15 +62,11 @@ async def test_get_token(respx_mock: respx.Router) -> None:
 
 @pytest.mark.asyncio
 async def test_get_version(respx_mock: respx.Router) -> None:
-    """Test getting the API version."""
+    """Test getting the API version, which doesn't need a token."""
     base_url = "https://keeper.example.com"
     username = "username"
     password = "password"
-    expected_token = "1234"
 
-    respx_mock.get(f"{base_url}/token", name="GET /token").respond(
-        status_code=200, json={"token": expected_token}
-    )
     respx_mock.get(f"{base_url}/", name="GET /").respond(
         status_code=200, json=load_keeper_response("metadata_v1.json")
     )
@@ -202,3 +203,241 @@ async def test_confirm_build(respx_mock: respx.Router) -> None:
         assert json.loads(patch_build_endpoint.calls[0].request.content) == {
             "uploaded": True
         }
+
+
+@pytest.mark.asyncio
+async def test_token_reuse(respx_mock: respx.Router) -> None:
+    """The token is requested once, even by concurrent requests."""
+    base_url = "https://keeper.example.com"
+
+    async def respond_token(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"token": "1234"})
+
+    token_endpoint = respx_mock.get(f"{base_url}/token").mock(
+        side_effect=respond_token
+    )
+    respx_mock.get(f"{base_url}/products/").respond(
+        status_code=200, json={"products": []}
+    )
+
+    async with AsyncClient() as httpx_client:
+        client = KeeperClient(
+            base_url=base_url,
+            username="username",
+            password="password",
+            http_client=httpx_client,
+        )
+        responses = await asyncio.gather(
+            *(client.get(path="/products/") for _ in range(10))
+        )
+        assert responses == [{"products": []}] * 10
+        await client.get(path="/products/")
+
+    assert token_endpoint.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_token_refresh_on_401(respx_mock: respx.Router) -> None:
+    """A rejected token is replaced and the request is sent again."""
+    base_url = "https://keeper.example.com"
+    token_endpoint = respx_mock.get(f"{base_url}/token").mock(
+        side_effect=[
+            httpx.Response(200, json={"token": "old"}),
+            httpx.Response(200, json={"token": "new"}),
+        ]
+    )
+    products_endpoint = respx_mock.get(f"{base_url}/products/").mock(
+        side_effect=[
+            httpx.Response(401),
+            httpx.Response(200, json={"products": []}),
+            httpx.Response(200, json={"products": []}),
+        ]
+    )
+
+    async with AsyncClient() as httpx_client:
+        client = KeeperClient(
+            base_url=base_url,
+            username="username",
+            password="password",
+            http_client=httpx_client,
+        )
+        assert await client.get(path="/products/") == {"products": []}
+        assert await client.get(path="/products/") == {"products": []}
+
+    assert token_endpoint.call_count == 2
+    new_auth = base64.b64encode(b"new:").decode()
+    assert products_endpoint.calls[1].request.headers["Authorization"] == (
+        f"Basic {new_auth}"
+    )
+    assert products_endpoint.calls[2].request.headers["Authorization"] == (
+        f"Basic {new_auth}"
+    )
+
+
+@pytest.mark.asyncio
+async def test_token_cache_file(
+    respx_mock: respx.Router, tmp_path: Path
+) -> None:
+    """Clients that share a token cache file authenticate once."""
+    base_url = "https://keeper.example.com"
+    token_endpoint = respx_mock.get(f"{base_url}/token").respond(
+        status_code=200, json={"token": "1234"}
+    )
+    respx_mock.get(f"{base_url}/products/").respond(
+        status_code=200, json={"products": []}
+    )
+    cache_path = tmp_path / "tokens.json"
+
+    for _ in range(2):
+        async with AsyncClient() as httpx_client:
+            client = KeeperClient(
+                base_url=base_url,
+                username="username",
+                password="password",
+                http_client=httpx_client,
+                token_cache=TokenCache(cache_path),
+            )
+            assert await client.get(path="/products/") == {"products": []}
+
+    assert token_endpoint.call_count == 1
+
+
+class _ThreadRecordingTokenCache(TokenCache):
+    """A token cache that records the threads its file is accessed in."""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.threads: list[tuple[str, int]] = []
+
+    def get(self, base_url: str, username: str) -> CachedToken | None:
+        self.threads.append(("get", threading.get_ident()))
+        return super().get(base_url, username)
+
+    def set(self, base_url: str, username: str, token: CachedToken) -> None:
+        self.threads.append(("set", threading.get_ident()))
+        super().set(base_url, username, token)
+
+    def delete(self, base_url: str, username: str) -> None:
+        self.threads.append(("delete", threading.get_ident()))
+        super().delete(base_url, username)
+
+
+class _ThreadRecordingVersionCache(VersionCache):
+    """A version cache that records the threads it's accessed in."""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.threads: list[tuple[str, int]] = []
+
+    def get(self, base_url: str) -> tuple[int, int, int] | None:
+        self.threads.append(("get", threading.get_ident()))
+        return super().get(base_url)
+
+    def set(self, base_url: str, version: tuple[int, int, int]) -> None:
+        self.threads.append(("set", threading.get_ident()))
+        super().set(base_url, version)
+
+
+@pytest.mark.asyncio
+async def test_token_cache_file_io_in_thread(
+    respx_mock: respx.Router, tmp_path: Path
+) -> None:
+    """The token cache file isn't accessed in the event loop's thread."""
+    base_url = "https://keeper.example.com"
+    respx_mock.get(f"{base_url}/token").mock(
+        side_effect=[
+            httpx.Response(200, json={"token": "old"}),
+            httpx.Response(200, json={"token": "new"}),
+        ]
+    )
+    respx_mock.get(f"{base_url}/products/").mock(
+        side_effect=[
+            httpx.Response(401),
+            httpx.Response(200, json={"products": []}),
+        ]
+    )
+    token_cache = _ThreadRecordingTokenCache(tmp_path / "tokens.json")
+
+    async with AsyncClient() as httpx_client:
+        client = KeeperClient(
+            base_url=base_url,
+            username="username",
+            password="password",
+            http_client=httpx_client,
+            token_cache=token_cache,
+        )
+        assert await client.get(path="/products/") == {"products": []}
+
+    assert [method for method, _ in token_cache.threads] == [
+        "get",
+        "set",
+        "delete",
+        "set",
+    ]
+    loop_thread = threading.get_ident()
+    assert all(thread != loop_thread for _, thread in token_cache.threads)
+    cached = TokenCache(tmp_path / "tokens.json").get(base_url, "username")
+    assert cached is not None
+    assert cached.token == "new"
+
+
+@pytest.mark.asyncio
+async def test_version_cache(respx_mock: respx.Router, tmp_path: Path) -> None:
+    """The server version is requested once per cache, and clients that
+    share a version cache file don't request it again.
+    """
+    base_url = "https://keeper.example.com"
+    version_endpoint = respx_mock.get(f"{base_url}/").respond(
+        status_code=200, json=load_keeper_response("metadata_v1.json")
+    )
+    cache_path = tmp_path / "versions.json"
+
+    for _ in range(2):
+        async with AsyncClient() as httpx_client:
+            client = KeeperClient(
+                base_url=base_url,
+                username="username",
+                password="password",
+                http_client=httpx_client,
+                version_cache=VersionCache(cache_path),
+            )
+            versions = await asyncio.gather(
+                *(client.get_api_version() for _ in range(5))
+            )
+            assert versions == [(1, 23, 0)] * 5
+
+    assert version_endpoint.call_count == 1
+    assert "authorization" not in version_endpoint.calls[0].request.headers
+
+
+@pytest.mark.asyncio
+async def test_version_cache_file_io_in_thread(
+    respx_mock: respx.Router, tmp_path: Path
+) -> None:
+    """A version cache with a file isn't accessed in the event loop's
+    thread.
+    """
+    base_url = "https://keeper.example.com"
+    respx_mock.get(f"{base_url}/").respond(
+        status_code=200, json=load_keeper_response("metadata_v1.json")
+    )
+    version_cache = _ThreadRecordingVersionCache(tmp_path / "versions.json")
+
+    async with AsyncClient() as httpx_client:
+        client = KeeperClient(
+            base_url=base_url,
+            username="username",
+            password="password",
+            http_client=httpx_client,
+            version_cache=version_cache,
+        )
+        assert await client.get_api_version() == (1, 23, 0)
+
+    assert [method for method, _ in version_cache.threads] == [
+        "get",
+        "get",
+        "set",
+    ]
+    loop_thread = threading.get_ident()
+    assert all(thread != loop_thread for _, thread in version_cache.threads)
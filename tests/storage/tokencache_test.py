@@ -0,0 +1,68 @@
+"""Tests for the token cache."""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import stat
+import time
+from pathlib import Path
+
+from ltdconveyor.storage.tokencache import CachedToken, TokenCache
+
+
+def _make_jws(header: dict) -> str:
+    encoded = base64.urlsafe_b64encode(json.dumps(header).encode())
+    return encoded.decode().rstrip("=") + ".eyJpZCI6MX0.c2lnbmF0dXJl"
+
+
+def test_cached_token_expiry() -> None:
+    """The expiration time is read from tokens that have one."""
+    token = CachedToken.from_token(
+        _make_jws({"alg": "HS256", "exp": 2_000_000_000})
+    )
+    assert token.expires_at == 2_000_000_000
+    assert token.is_valid()
+
+    token = CachedToken.from_token("opaque-token", default_ttl=600)
+    assert 590 < token.expires_at - time.time() <= 600
+    assert token.is_valid()
+
+    # Tokens that are about to expire aren't used
+    assert not CachedToken("abc", time.time() + 10).is_valid()
+
+
+def test_token_cache(tmp_path: Path) -> None:
+    path = tmp_path / "cache" / "tokens.json"
+    cache = TokenCache(path)
+    base_url = "https://keeper.example.com"
+    assert cache.get(base_url, "user") is None
+
+    token = CachedToken("abc", time.time() + 3600)
+    cache.set(base_url, "user", token)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert TokenCache(path).get(base_url, "user") == token
+    assert cache.get(base_url, "other") is None
+    assert cache.get("https://other.example.com", "user") is None
+
+    # Expired tokens aren't returned, and are pruned
+    cache.set(base_url, "other", CachedToken("old", time.time() - 1))
+    assert cache.get(base_url, "other") is None
+    cache.set(base_url, "third", token)
+    assert "old" not in path.read_text()
+
+    cache.delete(base_url, "user")
+    assert cache.get(base_url, "user") is None
+    assert cache.get(base_url, "third") == token
+
+
+def test_token_cache_corrupt(tmp_path: Path) -> None:
+    path = tmp_path / "tokens.json"
+    path.write_text("{not json")
+    cache = TokenCache(path)
+    assert cache.get("https://keeper.example.com", "user") is None
+
+    token = CachedToken("abc", time.time() + 3600)
+    cache.set("https://keeper.example.com", "user", token)
+    assert cache.get("https://keeper.example.com", "user") == token
@@ -0,0 +1,63 @@
+"""Tests for the version cache."""
+
+from __future__ import annotations
+
+import json
+import os
+import stat
+import time
+from pathlib import Path
+
+from ltdconveyor.storage.versioncache import VersionCache
+
+
+def test_version_cache_in_memory() -> None:
+    cache = VersionCache()
+    assert cache.path is None
+    assert cache.get("https://keeper.example.com") is None
+
+    cache.set("https://keeper.example.com/", (2, 1, 0))
+    assert cache.get("https://keeper.example.com") == (2, 1, 0)
+    assert cache.get("https://other.example.com") is None
+
+    cache.clear()
+    assert cache.get("https://keeper.example.com") is None
+
+
+def test_version_cache_expiry() -> None:
+    cache = VersionCache(ttl=-1)
+    cache.set("https://keeper.example.com", (2, 1, 0))
+    assert cache.get("https://keeper.example.com") is None
+
+
+def test_version_cache_file(tmp_path: Path) -> None:
+    path = tmp_path / "cache" / "versions.json"
+    cache = VersionCache(path)
+    assert cache.path == str(path)
+    cache.set("https://keeper.example.com", (1, 22, 0))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    # A new cache, as in a later ``ltd`` command, reads the file
+    assert VersionCache(path).get("https://keeper.example.com") == (1, 22, 0)
+
+    # Expired and corrupt entries are ignored
+    path.write_text(
+        json.dumps(
+            {
+                "version": 1,
+                "entries": {
+                    "https://old.example.com": {
+                        "version": [1, 0, 0],
+                        "expires_at": time.time() - 1,
+                    },
+                    "https://bad.example.com": {"version": "1.0"},
+                },
+            }
+        )
+    )
+    cache = VersionCache(path)
+    assert cache.get("https://old.example.com") is None
+    assert cache.get("https://bad.example.com") is None
+
+    path.write_text("not json")
+    assert VersionCache(path).get("https://keeper.example.com") is None
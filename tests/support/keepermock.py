@@ -63,8 +63,11 @@ class MockKeeper:
             self._respx_mock.post(
                 prefix_url, name=f"POST {prefix_url}"
             ).respond(status_code=200)
+            # Like LTD Keeper, the key ends with the uploaded file's name
+            key_prefix = "" if dirname == "/" else dirname
             post_prefix_urls[dirname] = PresignedPostUrl(
-                url=prefix_url, fields={"key": "123"}
+                url=prefix_url,
+                fields={"key": f"builds/1/{key_prefix}${{filename}}"},
             )
 
             dir_url = f"{self._presigned_url_base}/dir{dirname}"
@@ -0,0 +1,393 @@
+"""An in-memory stand-in for the boto3 S3 client and resources."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from botocore.exceptions import ClientError
+
+
+@dataclass
+class MockObject:
+    body: bytes
+    metadata: Dict[str, str] = field(default_factory=dict)
+    content_type: str = "binary/octet-stream"
+    cache_control: Optional[str] = None
+    acl: Optional[str] = None
+    content_encoding: Optional[str] = None
+
+    @property
+    def etag(self) -> str:
+        return hashlib.md5(self.body).hexdigest()
+
+
+class MockPaginator:
+    def __init__(self, client: MockS3Client) -> None:
+        self._client = client
+
+    def paginate(self, **kwargs: Any) -> MockPageIterator:
+        return MockPageIterator(self._client, kwargs)
+
+
+class MockPageIterator:
+    def __init__(self, client: MockS3Client, kwargs: Dict[str, Any]) -> None:
+        self._client = client
+        self._kwargs = kwargs
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        kwargs = dict(self._kwargs)
+        while True:
+            page = self._client.list_objects_v2(**kwargs)
+            yield page
+            if not page["IsTruncated"]:
+                return
+            kwargs["ContinuationToken"] = page["NextContinuationToken"]
+
+    def search(self, expression: str) -> Iterator[Any]:
+        """Search pages for a top-level key, like botocore's JMESPath
+        search (which yields `None` for pages without the key).
+        """
+        for page in self:
+            result = page.get(expression)
+            if isinstance(result, list):
+                yield from result
+            else:
+                yield result
+
+
+class MockS3Client:
+    """A thread-safe, in-memory S3 client for a single bucket.
+
+    Every API call is recorded in ``calls`` as ``(method name, kwargs)``.
+    Set ``delete_failures[key]`` to the number of times that
+    ``delete_objects`` reports an error for that key before deleting it.
+    """
+
+    def __init__(self, bucket_name: str, page_size: int = 1000) -> None:
+        self.bucket_name = bucket_name
+        self.page_size = page_size
+        self.objects: Dict[str, MockObject] = {}
+        self.calls: List[Any] = []
+        self.delete_failures: Dict[str, int] = {}
+        self.multipart_uploads: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, method: str, kwargs: Dict[str, Any]) -> None:
+        with self._lock:
+            self.calls.append((method, kwargs))
+
+    def count_calls(self, method: str) -> int:
+        return len([c for c in self.calls if c[0] == method])
+
+    def add(self, key: str, body: bytes = b"content", **kwargs: Any) -> None:
+        """Add an object to the bucket without recording an API call."""
+        self.objects[key] = MockObject(body=body, **kwargs)
+
+    def get_paginator(self, operation_name: str) -> MockPaginator:
+        assert operation_name == "list_objects_v2"
+        return MockPaginator(self)
+
+    def list_objects_v2(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("list_objects_v2", kwargs)
+        assert kwargs["Bucket"] == self.bucket_name
+        prefix = kwargs.get("Prefix", "")
+        delimiter = kwargs.get("Delimiter")
+        start = kwargs.get("ContinuationToken") or kwargs.get("StartAfter", "")
+        max_keys = min(kwargs.get("MaxKeys", 1000), self.page_size)
+        with self._lock:
+            # Keys, and common prefixes (which end with the delimiter)
+            names = set()
+            prefixes = set()
+            for k in self.objects:
+                if not k.startswith(prefix):
+                    continue
+                if delimiter and delimiter in k[len(prefix) :]:
+                    end = k.index(delimiter, len(prefix)) + len(delimiter)
+                    names.add(k[:end])
+                    prefixes.add(k[:end])
+                else:
+                    names.add(k)
+            selected = sorted(name for name in names if name > start)
+            contents = []
+            common_prefixes = []
+            for name in selected[:max_keys]:
+                if name not in prefixes:
+                    obj = self.objects[name]
+                    contents.append(
+                        {
+                            "Key": name,
+                            "Size": len(obj.body),
+                            "ETag": f'"{obj.etag}"',
+                        }
+                    )
+                else:
+                    common_prefixes.append({"Prefix": name})
+        page: Dict[str, Any] = {"IsTruncated": len(selected) > max_keys}
+        if contents:
+            page["Contents"] = contents
+        if common_prefixes:
+            page["CommonPrefixes"] = common_prefixes
+        if page["IsTruncated"]:
+            page["NextContinuationToken"] = selected[max_keys - 1]
+        return page
+
+    def put_object(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("put_object", kwargs)
+        body = kwargs.get("Body", b"")
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        elif hasattr(body, "read"):
+            body = body.read()
+        obj = MockObject(
+            body=body,
+            metadata=dict(kwargs.get("Metadata", {})),
+            content_type=kwargs.get("ContentType", "binary/octet-stream"),
+            cache_control=kwargs.get("CacheControl"),
+            acl=kwargs.get("ACL"),
+        )
+        with self._lock:
+            self.objects[kwargs["Key"]] = obj
+        return {"ETag": f'"{obj.etag}"'}
+
+    def upload_file(
+        self,
+        Filename: str,
+        Bucket: str,
+        Key: str,
+        ExtraArgs: Optional[Dict[str, Any]] = None,
+        Config: Any = None,
+    ) -> None:
+        self._record(
+            "upload_file",
+            {
+                "Filename": Filename,
+                "Bucket": Bucket,
+                "Key": Key,
+                "ExtraArgs": ExtraArgs,
+                "Config": Config,
+            },
+        )
+        extra_args = ExtraArgs or {}
+        with open(Filename, "rb") as f:
+            body = f.read()
+        obj = MockObject(
+            body=body,
+            metadata=dict(extra_args.get("Metadata", {})),
+            content_type=extra_args.get("ContentType", "binary/octet-stream"),
+            cache_control=extra_args.get("CacheControl"),
+            acl=extra_args.get("ACL"),
+            content_encoding=extra_args.get("ContentEncoding"),
+        )
+        with self._lock:
+            self.objects[Key] = obj
+
+    def copy_object(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("copy_object", kwargs)
+        source = self._get(kwargs["CopySource"]["Key"], "CopyObject")
+        if kwargs.get("MetadataDirective", "COPY") == "REPLACE":
+            obj = MockObject(
+                body=source.body,
+                metadata=dict(kwargs.get("Metadata", {})),
+                content_type=kwargs.get("ContentType", "binary/octet-stream"),
+                cache_control=kwargs.get("CacheControl"),
+                acl=kwargs.get("ACL"),
+            )
+        else:
+            obj = MockObject(
+                body=source.body,
+                metadata=dict(source.metadata),
+                content_type=source.content_type,
+                cache_control=source.cache_control,
+                acl=kwargs.get("ACL"),
+            )
+        with self._lock:
+            self.objects[kwargs["Key"]] = obj
+        return {"CopyObjectResult": {"ETag": f'"{obj.etag}"'}}
+
+    def create_multipart_upload(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("create_multipart_upload", kwargs)
+        with self._lock:
+            upload_id = f"upload-{len(self.multipart_uploads)}"
+            self.multipart_uploads[upload_id] = {"args": kwargs, "parts": {}}
+        return {"UploadId": upload_id}
+
+    def upload_part_copy(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("upload_part_copy", kwargs)
+        source = self._get(kwargs["CopySource"]["Key"], "UploadPartCopy")
+        if kwargs.get("CopySourceIfMatch", source.etag).strip('"') != (
+            source.etag
+        ):
+            raise ClientError(
+                {"Error": {"Code": "PreconditionFailed", "Message": ""}},
+                "UploadPartCopy",
+            )
+        first, last = kwargs["CopySourceRange"][len("bytes=") :].split("-")
+        body = source.body[int(first) : int(last) + 1]
+        etag = hashlib.md5(body).hexdigest()
+        with self._lock:
+            upload = self.multipart_uploads[kwargs["UploadId"]]
+            upload["parts"][kwargs["PartNumber"]] = (etag, body)
+        return {"CopyPartResult": {"ETag": f'"{etag}"'}}
+
+    def complete_multipart_upload(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("complete_multipart_upload", kwargs)
+        with self._lock:
+            upload = self.multipart_uploads.pop(kwargs["UploadId"])
+            parts = kwargs["MultipartUpload"]["Parts"]
+            numbers = [part["PartNumber"] for part in parts]
+            assert numbers == sorted(upload["parts"])
+            body = b"".join(upload["parts"][n][1] for n in numbers)
+            args = upload["args"]
+            self.objects[kwargs["Key"]] = MockObject(
+                body=body,
+                metadata=dict(args.get("Metadata", {})),
+                content_type=args.get("ContentType", "binary/octet-stream"),
+                cache_control=args.get("CacheControl"),
+                acl=args.get("ACL"),
+            )
+        return {}
+
+    def abort_multipart_upload(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("abort_multipart_upload", kwargs)
+        with self._lock:
+            self.multipart_uploads.pop(kwargs["UploadId"], None)
+        return {}
+
+    def head_object(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("head_object", kwargs)
+        obj = self._get(kwargs["Key"], "HeadObject")
+        head: Dict[str, Any] = {
+            "ContentLength": len(obj.body),
+            "ContentType": obj.content_type,
+            "ETag": f'"{obj.etag}"',
+            "Metadata": dict(obj.metadata),
+        }
+        if obj.cache_control is not None:
+            head["CacheControl"] = obj.cache_control
+        return head
+
+    def get_object(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("get_object", kwargs)
+        obj = self._get(kwargs["Key"], "GetObject")
+        return {
+            "Body": io.BytesIO(obj.body),
+            "ContentLength": len(obj.body),
+            "ContentType": obj.content_type,
+            "ETag": f'"{obj.etag}"',
+            "Metadata": dict(obj.metadata),
+        }
+
+    def _get(self, key: str, operation: str) -> MockObject:
+        with self._lock:
+            obj = self.objects.get(key)
+        if obj is None:
+            raise ClientError(
+                {"Error": {"Code": "NoSuchKey", "Message": "Not found"}},
+                operation,
+            )
+        return obj
+
+    def delete_object(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("delete_object", kwargs)
+        with self._lock:
+            self.objects.pop(kwargs["Key"], None)
+        return {}
+
+    def delete_objects(self, **kwargs: Any) -> Dict[str, Any]:
+        self._record("delete_objects", kwargs)
+        objects = kwargs["Delete"]["Objects"]
+        assert len(objects) <= 1000
+        deleted = []
+        errors = []
+        with self._lock:
+            for item in objects:
+                key = item["Key"]
+                if self.delete_failures.get(key, 0) > 0:
+                    self.delete_failures[key] -= 1
+                    errors.append(
+                        {"Key": key, "Code": "SlowDown", "Message": "Retry"}
+                    )
+                    continue
+                self.objects.pop(key, None)
+                deleted.append({"Key": key})
+        response: Dict[str, Any] = {}
+        if not kwargs["Delete"].get("Quiet", False):
+            response["Deleted"] = deleted
+        if errors:
+            response["Errors"] = errors
+        return response
+
+
+class MockObjectResource:
+    def __init__(self, client: MockS3Client, key: str) -> None:
+        self.meta = _Meta(client)
+        self.key = key
+
+    def delete(self) -> None:
+        self.meta.client.delete_object(
+            Bucket=self.meta.client.bucket_name, Key=self.key
+        )
+
+    def put(self, **kwargs: Any) -> Dict[str, Any]:
+        return self.meta.client.put_object(
+            Bucket=self.meta.client.bucket_name, Key=self.key, **kwargs
+        )
+
+    def upload_file(
+        self,
+        Filename: str,
+        ExtraArgs: Optional[Dict[str, Any]] = None,
+        Config: Any = None,
+    ) -> None:
+        self.meta.client.upload_file(
+            Filename,
+            self.meta.client.bucket_name,
+            self.key,
+            ExtraArgs=ExtraArgs,
+            Config=Config,
+        )
+
+
+class MockBucket:
+    def __init__(self, client: MockS3Client, name: str) -> None:
+        self.meta = _Meta(client)
+        self.name = name
+
+    def Object(self, key: str) -> MockObjectResource:
+        return MockObjectResource(self.meta.client, key)
+
+
+class MockS3Resource:
+    def __init__(self, client: MockS3Client) -> None:
+        self.meta = _Meta(client)
+
+    def Bucket(self, name: str) -> MockBucket:
+        return MockBucket(self.meta.client, name)
+
+
+class MockSession:
+    """A stand-in for `boto3.session.Session` that always provides the
+    same mock client.
+    """
+
+    def __init__(self, client: MockS3Client) -> None:
+        self.s3_client = client
+        self.resource_calls: List[Dict[str, Any]] = []
+
+    def client(self, service_name: str, **kwargs: Any) -> MockS3Client:
+        assert service_name == "s3"
+        return self.s3_client
+
+    def resource(self, service_name: str, **kwargs: Any) -> MockS3Resource:
+        assert service_name == "s3"
+        self.resource_calls.append(kwargs)
+        return MockS3Resource(self.s3_client)
+
+
+@dataclass
+class _Meta:
+    client: MockS3Client
@@ -4,7 +4,9 @@ from typing import Any, List, Optional
 
 import click
 import pytest
+from click.testing import CliRunner
 
+from ltdconveyor.cli.main import main
 from ltdconveyor.cli.upload import _get_gh_actions_git_refs, _get_git_refs
 
 
@@ -53,3 +55,28 @@ def test_get_git_refs(
     monkeypatch.setattr(os, "getenv", lambda *args: env_var)
 
     assert _get_git_refs(ci_env, user_git_ref) == expected
+
+
+@pytest.mark.parametrize(
+    "args,package",
+    [
+        (["--uvloop"], "uvloop"),
+        (["--project", "test", "--git-ref", "main", "--http2"], "h2"),
+    ],
+)
+def test_upload_missing_optional_package(
+    args: List[str], package: str
+) -> None:
+    """Options that need an optional package that isn't installed are
+    usage errors.
+    """
+    try:
+        __import__(package)
+    except ImportError:
+        pass
+    else:
+        pytest.skip(f"{package} is installed")
+
+    result = CliRunner().invoke(main, ["upload", *args])
+    assert result.exit_code == 2
+    assert package in result.output
@@ -0,0 +1,104 @@
+"""Tests for ltdconveyor.compression."""
+
+from __future__ import annotations
+
+import gzip
+import os
+from pathlib import Path
+
+import pytest
+
+from ltdconveyor import compression
+from ltdconveyor.compression import CompressionSettings, Precompressor
+
+HTML = b"<p>Hello, world!</p>\n" * 200
+
+
+def test_is_eligible() -> None:
+    settings = CompressionSettings()
+    assert settings.is_eligible("text/html", 2048)
+    assert settings.is_eligible("text/css; charset=utf-8", 2048)
+    assert settings.is_eligible("application/javascript", 2048)
+    assert settings.is_eligible("image/svg+xml", 2048)
+    assert not settings.is_eligible("image/png", 2048)
+    assert not settings.is_eligible(None, 2048)
+    assert not settings.is_eligible("text/html", 100)
+
+
+def test_compress_file(tmp_path: Path) -> None:
+    """Compression is a deterministic gzip round trip."""
+    path = tmp_path / "index.html"
+    path.write_bytes(HTML)
+    settings = CompressionSettings()
+
+    compressed = compression.compress_file(path, tmp_path / "a.gz", settings)
+    assert compressed is not None
+    assert compressed.encoding == "gzip"
+    assert compressed.original_size == len(HTML)
+    assert compressed.size == os.path.getsize(compressed.path)
+    assert compressed.size < len(HTML) / 10
+    data = Path(compressed.path).read_bytes()
+    assert gzip.decompress(data) == HTML
+
+    os.utime(path, (0, 0))
+    again = compression.compress_file(path, tmp_path / "b.gz", settings)
+    assert again is not None
+    assert Path(again.path).read_bytes() == data
+
+
+def test_compress_file_incompressible(tmp_path: Path) -> None:
+    """Files that don't compress well are discarded."""
+    path = tmp_path / "random.js"
+    path.write_bytes(os.urandom(4096))
+    output_path = tmp_path / "random.js.gz"
+
+    assert (
+        compression.compress_file(path, output_path, CompressionSettings())
+        is None
+    )
+    assert not output_path.exists()
+
+
+def test_compress_file_brotli(tmp_path: Path) -> None:
+    """Brotli compression requires the brotli package."""
+    if compression.brotli is None:
+        with pytest.raises(ValueError):
+            CompressionSettings(encoding="br")
+        return
+    path = tmp_path / "index.html"
+    path.write_bytes(HTML)
+    settings = CompressionSettings(encoding="br")
+
+    compressed = compression.compress_file(path, tmp_path / "a.br", settings)
+    assert compressed is not None
+    assert compressed.encoding == "br"
+    data = Path(compressed.path).read_bytes()
+    assert compression.brotli.decompress(data) == HTML
+
+
+@pytest.mark.parametrize("max_workers", [0, 2])
+def test_precompressor(tmp_path: Path, max_workers: int) -> None:
+    """Eligible files are compressed, inline or in a process pool, and
+    compressed files are removed on close.
+    """
+    html_path = tmp_path / "index.html"
+    html_path.write_bytes(HTML)
+    png_path = tmp_path / "image.png"
+    png_path.write_bytes(HTML)
+    settings = CompressionSettings(max_workers=max_workers)
+
+    with Precompressor(settings) as precompressor:
+        assert precompressor.compress(png_path, "image/png", len(HTML)) is None
+        html = precompressor.submit(html_path, "text/html", len(HTML))
+        small = precompressor.submit(html_path, "text/html", 10)
+        compressed = html.result()
+        assert small.result() is None
+        assert compressed is not None
+        assert gzip.decompress(Path(compressed.path).read_bytes()) == HTML
+
+        precompressor.discard(compressed)
+        assert not os.path.exists(compressed.path)
+        compressed = precompressor.compress(html_path, "text/html", len(HTML))
+        assert compressed is not None
+
+    assert not os.path.exists(compressed.path)
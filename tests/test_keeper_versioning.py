@@ -1,8 +1,11 @@
 """Tests for the Keeper versioning module."""
 
+from pathlib import Path
+
 import responses
 
 from ltdconveyor.keeper.versioning import get_server_version
+from ltdconveyor.storage.versioncache import VersionCache
 
 
 @responses.activate
@@ -27,3 +30,24 @@ def test_parse_version() -> None:
     assert version == (1, 22, 0)
     assert version < (2, 0, 0)
     assert version > (1, 0, 0)
+
+
+@responses.activate
+def test_version_cache(tmp_path: Path) -> None:
+    """The version is requested once per base URL while it's cached."""
+    metadata_url = "https://example.com"
+    responses.add(
+        responses.GET,
+        metadata_url,
+        status=200,
+        json={"data": {"server_version": "2.0.0"}},
+    )
+    cache = VersionCache(tmp_path / "versions.json")
+    assert get_server_version(metadata_url, cache=cache) == (2, 0, 0)
+    assert get_server_version(metadata_url, cache=cache) == (2, 0, 0)
+    assert VersionCache(tmp_path / "versions.json").get(metadata_url) == (
+        2,
+        0,
+        0,
+    )
+    assert len(responses.calls) == 1
@@ -6,15 +6,16 @@ import cgi
 import sys
 from io import BytesIO
 from pathlib import Path, PosixPath
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple, cast
 
 import pytest
 import responses
 from requests import PreparedRequest
 
 from ltdconveyor.exceptions import ConveyorError
-from ltdconveyor.s3.exceptions import S3Error
+from ltdconveyor.s3.exceptions import S3BatchError, S3Error
 from ltdconveyor.s3.presignedpost import (
+    create_session,
     format_relative_dirname,
     prescan_directory,
     upload_dir,
@@ -102,7 +103,17 @@ def test_upload_file() -> None:
     post_url = "https://example.com"
     post_fields = {"key": "bucket/base/${filename}"}
 
-    responses.add(responses.POST, "https://example.com", status=204)
+    # The body is streamed, so read it while the request is sent
+    bodies: List[bytes] = []
+
+    def callback(request: PreparedRequest) -> Tuple[int, Dict[str, str], str]:
+        assert request.body is not None
+        bodies.append(b"".join(cast(Iterable[bytes], request.body)))
+        return 204, {}, ""
+
+    responses.add_callback(
+        responses.POST, "https://example.com", callback=callback
+    )
 
     upload_file(
         local_path=local_path, post_url=post_url, post_fields=post_fields
@@ -119,9 +130,9 @@ def test_upload_file() -> None:
             "ascii"
         ),
     }
-    assert hasattr(call.request, "body")
-    assert isinstance(call.request.body, bytes)
-    data = BytesIO(bytes(call.request.body))
+    assert "Transfer-Encoding" not in call.request.headers
+    assert int(call.request.headers["Content-Length"]) == len(bodies[0])
+    data = BytesIO(bodies[0])
     parsed_body = cgi.parse_multipart(data, pdict)
 
     if sys.version_info[:3] >= (3, 7, 0):
@@ -168,3 +179,41 @@ def test_upload_directory_objects() -> None:
     upload_directory_objects(post_urls=post_urls)
 
     assert len(responses.calls) == 4
+
+
+def _make_post_urls() -> Dict[str, Any]:
+    return {
+        dirname: {
+            "url": "https://example.com",
+            "fields": {"key": f"bucket/base/{dirname}${{filename}}"},
+        }
+        for dirname in ("/", "a/", "a/aa/", "b/")
+    }
+
+
+@responses.activate
+def test_upload_dir_concurrent() -> None:
+    base_dir = Path(__file__).parent / "data/test-site"
+    responses.add(responses.POST, "https://example.com", status=204)
+
+    with create_session(max_workers=4) as session:
+        upload_dir(
+            post_urls=_make_post_urls(),
+            base_dir=base_dir,
+            max_workers=4,
+            session=session,
+        )
+
+    assert len(responses.calls) == 4
+
+
+@responses.activate
+def test_upload_dir_failed() -> None:
+    base_dir = Path(__file__).parent / "data/test-site"
+    responses.add(responses.POST, "https://example.com", status=403)
+
+    with pytest.raises(S3BatchError) as exc_info:
+        upload_dir(post_urls=_make_post_urls(), base_dir=base_dir)
+
+    assert isinstance(exc_info.value, S3Error)
+    assert "code 403" in str(exc_info.value)
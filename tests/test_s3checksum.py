@@ -0,0 +1,55 @@
+"""Tests for ``ltdconveyor.s3.checksum``."""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from ltdconveyor.s3.checksum import adjust_chunksize, compute_file_digest
+from ltdconveyor.s3.listing import ObjectRecord
+
+
+def test_single_part_digest(tmp_path: Path) -> None:
+    path = tmp_path / "index.html"
+    path.write_bytes(b"<html></html>")
+    expected = hashlib.md5(b"<html></html>").hexdigest()
+
+    digest = compute_file_digest(path)
+    assert digest.size == 13
+    assert digest.md5 == expected
+    assert digest.etag == expected
+
+    assert digest.matches(ObjectRecord("a", 13, expected))
+    assert not digest.matches(ObjectRecord("a", 14, expected))
+    assert not digest.matches(ObjectRecord("a", 13, "0" * 32))
+
+
+def test_multipart_digest(tmp_path: Path) -> None:
+    content = bytes(range(256)) * 10  # 2560 bytes
+    path = tmp_path / "data.bin"
+    path.write_bytes(content)
+
+    digest = compute_file_digest(
+        path, multipart_threshold=1000, multipart_chunksize=1024
+    )
+    parts = [content[0:1024], content[1024:2048], content[2048:]]
+    combined = hashlib.md5(
+        b"".join(hashlib.md5(p).digest() for p in parts)
+    ).hexdigest()
+    assert digest.md5 == hashlib.md5(content).hexdigest()
+    assert digest.etag == f"{combined}-3"
+    assert digest.matches(ObjectRecord("a", 2560, f"{combined}-3"))
+
+    # A file that's exactly the threshold size is a one-part upload
+    digest = compute_file_digest(
+        path, multipart_threshold=2560, multipart_chunksize=4096
+    )
+    one_part = hashlib.md5(hashlib.md5(content).digest()).hexdigest()
+    assert digest.etag == f"{one_part}-1"
+
+
+def test_adjust_chunksize() -> None:
+    mib = 1024 * 1024
+    assert adjust_chunksize(8 * mib, 100 * mib) == 8 * mib
+    # 100 GiB needs more than 10,000 8 MiB parts
+    assert adjust_chunksize(8 * mib, 100 * 1024 * mib) == 16 * mib
@@ -0,0 +1,106 @@
+"""Tests for ``ltdconveyor.s3.concurrency``."""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Iterator, List, Tuple
+
+import pytest
+
+from ltdconveyor.s3.concurrency import run_tasks
+from ltdconveyor.s3.exceptions import S3BatchError
+
+
+def make_task(name: str, fail: bool = False) -> Callable[[], str]:
+    def task() -> str:
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        return name.upper()
+
+    return task
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_run_tasks(max_workers: int) -> None:
+    tasks = [(f"key{i}", make_task(f"key{i}")) for i in range(20)]
+    results = dict(run_tasks(tasks, max_workers=max_workers))
+    assert results == {f"key{i}": f"KEY{i}" for i in range(20)}
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_run_tasks_failures(max_workers: int) -> None:
+    tasks = [
+        (f"key{i:02d}", make_task(f"key{i:02d}", fail=i % 5 == 0))
+        for i in range(20)
+    ]
+    succeeded: List[str] = []
+    with pytest.raises(S3BatchError) as exc_info:
+        for name, _ in run_tasks(
+            tasks, max_workers=max_workers, description="Test"
+        ):
+            succeeded.append(name)
+
+    # Every other task still completes, and failures are sorted by name
+    assert len(succeeded) == 16
+    assert [name for name, _ in exc_info.value.failures] == [
+        "key00",
+        "key05",
+        "key10",
+        "key15",
+    ]
+    assert "Test failed for 4 object(s)" in str(exc_info.value)
+    assert "key05: key05 failed" in str(exc_info.value)
+
+
+def test_run_tasks_bounded_submission() -> None:
+    """The task iterable is consumed lazily."""
+    lock = threading.Lock()
+    state = {"generated": 0, "completed": 0, "max_outstanding": 0}
+
+    def task() -> None:
+        with lock:
+            state["completed"] += 1
+
+    def generate() -> Iterator[Tuple[str, Callable[[], None]]]:
+        for i in range(100):
+            with lock:
+                state["generated"] += 1
+                outstanding = state["generated"] - state["completed"]
+                state["max_outstanding"] = max(
+                    state["max_outstanding"], outstanding
+                )
+            yield str(i), task
+
+    list(run_tasks(generate(), max_workers=2, max_pending=4))
+    assert state["completed"] == 100
+    assert state["max_outstanding"] <= 5
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_run_tasks_fail_fast(max_workers: int) -> None:
+    """With fail_fast, no tasks are started after the first failure."""
+    started: List[str] = []
+    lock = threading.Lock()
+
+    def make_tracked_task(name: str) -> Callable[[], str]:
+        def task() -> str:
+            with lock:
+                started.append(name)
+            if name == "key03":
+                raise RuntimeError(f"{name} failed")
+            return name
+
+        return task
+
+    tasks = [
+        (f"key{i:02d}", make_tracked_task(f"key{i:02d}")) for i in range(100)
+    ]
+    with pytest.raises(S3BatchError) as exc_info:
+        list(
+            run_tasks(
+                tasks, max_workers=max_workers, max_pending=4, fail_fast=True
+            )
+        )
+
+    assert [name for name, _ in exc_info.value.failures] == ["key03"]
+    assert len(started) < 100
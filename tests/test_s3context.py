@@ -0,0 +1,53 @@
+"""Tests for ``ltdconveyor.s3.context``."""
+
+from __future__ import annotations
+
+from typing import Any, cast
+
+from pytest_mock import MockerFixture
+
+from ltdconveyor.s3 import S3Context, delete_dir, open_bucket
+from ltdconveyor.s3.context import resolve_context
+from tests.support.s3mock import MockS3Client, MockSession
+
+
+def test_context_shares_resource() -> None:
+    session = MockSession(MockS3Client("bucket"))
+    context = S3Context(
+        session=cast(Any, session),
+        max_pool_connections=64,
+        retry_mode="adaptive",
+        max_attempts=3,
+        read_timeout=5,
+    )
+
+    assert context.bucket("bucket").meta.client is context.client
+    assert open_bucket("bucket", s3_context=context).meta.client is (
+        context.client
+    )
+    assert len(session.resource_calls) == 1
+    config = session.resource_calls[0]["config"]
+    assert config.max_pool_connections == 64
+    assert config.retries == {"mode": "adaptive", "max_attempts": 3}
+    assert config.read_timeout == 5
+
+    assert resolve_context(context, max_pool_connections=128) is context
+
+
+def test_delete_dir_uses_profile(mocker: MockerFixture) -> None:
+    client = MockS3Client("bucket")
+    client.add("root/index.html")
+    client.add("other/index.html")
+    session_cls = mocker.patch(
+        "ltdconveyor.s3.context.boto3.session.Session",
+        return_value=MockSession(client),
+    )
+
+    delete_dir("bucket", "root/", aws_profile="ltd")
+
+    session_cls.assert_called_once_with(
+        profile_name="ltd",
+        aws_access_key_id=None,
+        aws_secret_access_key=None,
+    )
+    assert list(client.objects) == ["other/index.html"]
@@ -22,13 +22,22 @@ from __future__ import annotations
 
 import os
 import uuid
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Dict
 
 import boto3
 import pytest
+from pytest_mock import MockerFixture
 
-from ltdconveyor.s3 import copy_dir, delete_dir
+from ltdconveyor.s3 import (
+    S3BatchError,
+    S3Context,
+    TransferSettings,
+    copy_dir,
+    delete_dir,
+)
+from ltdconveyor.s3.manifest import get_manifest_key
 from ltdconveyor.testutils import upload_test_files
+from tests.support.s3mock import MockS3Client
 
 if TYPE_CHECKING:
     from _pytest.fixtures import FixtureRequest
@@ -146,3 +155,262 @@ def test_copy_dir_dest_in_src() -> None:
             aws_access_key_id="id",
             aws_secret_access_key="key",
         )
+
+
+def test_copy_dir_concurrent(
+    s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    """Objects are copied concurrently, each with its own headers."""
+    s3_client.page_size = 7
+    for i in range(30):
+        s3_client.add(
+            f"src/{i}.html",
+            body=b"x" * i,
+            metadata={"surrogate-key": "old"},
+            content_type="text/html",
+        )
+    s3_client.add("src/cached.css", cache_control="max-age=60")
+    s3_client.add("dest/stale.html")
+
+    result = copy_dir(
+        "bucket",
+        "src",
+        "dest",
+        surrogate_key="new",
+        s3_context=s3_context,
+        max_workers=4,
+    )
+
+    assert result.copied == 31
+    assert result.copied_bytes == sum(range(30)) + len(b"content")
+    assert "dest/stale.html" not in s3_client.objects
+    assert s3_client.objects["dest/3.html"].body == b"xxx"
+    assert s3_client.objects["dest/3.html"].metadata == {
+        "surrogate-key": "new"
+    }
+    assert s3_client.objects["dest/3.html"].content_type == "text/html"
+    # The Cache-Control header of one object isn't applied to others
+    assert s3_client.objects["dest/cached.css"].cache_control == "max-age=60"
+    assert s3_client.objects["dest/3.html"].cache_control is None
+    assert s3_client.objects["dest"].metadata == {"dir-redirect": "true"}
+
+
+def test_copy_dir_failures(
+    mocker: MockerFixture, s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    """Failed copies are reported together after other copies finish."""
+    for i in range(10):
+        s3_client.add(f"src/{i}.html")
+    copy_object = s3_client.copy_object
+
+    def flaky_copy_object(**kwargs: Any) -> Dict[str, Any]:
+        if kwargs["Key"].endswith(("3.html", "7.html")):
+            raise RuntimeError("copy failed")
+        return copy_object(**kwargs)
+
+    mocker.patch.object(
+        s3_client, "copy_object", side_effect=flaky_copy_object
+    )
+
+    with pytest.raises(S3BatchError) as exc_info:
+        copy_dir("bucket", "src", "dest", s3_context=s3_context)
+
+    assert [key for key, _ in exc_info.value.failures] == [
+        "src/3.html",
+        "src/7.html",
+    ]
+    assert len([k for k in s3_client.objects if k.startswith("dest/")]) == 8
+
+
+def test_copy_dir_without_overrides(
+    s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    """Without header overrides, objects are copied without reading their
+    headers.
+    """
+    s3_client.add(
+        "src/index.html",
+        metadata={"surrogate-key": "abc"},
+        content_type="text/html",
+        cache_control="max-age=60",
+    )
+    s3_client.add("src/style.css", content_type="text/css")
+
+    copy_dir("bucket", "src", "dest", s3_context=s3_context)
+
+    assert s3_client.count_calls("head_object") == 0
+    copied = s3_client.objects["dest/index.html"]
+    assert copied.metadata == {"surrogate-key": "abc"}
+    assert copied.content_type == "text/html"
+    assert copied.cache_control == "max-age=60"
+    assert copied.acl == "public-read"
+    assert s3_client.objects["dest/style.css"].cache_control is None
+
+
+def test_copy_dir_multipart(
+    mocker: MockerFixture, s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    """Large objects are copied in parts, and failed copies are aborted."""
+    MiB = 1024 * 1024
+    large = bytes(range(256)) * (12 * MiB // 256 + 1)
+    s3_client.add(
+        "src/data.tar",
+        body=large,
+        metadata={"surrogate-key": "old"},
+        content_type="application/x-tar",
+    )
+    s3_client.add("src/index.html")
+    settings = TransferSettings(
+        multipart_threshold=8 * MiB,
+        multipart_chunksize=5 * MiB,
+        max_concurrency=2,
+    )
+
+    copy_dir(
+        "bucket",
+        "src",
+        "dest",
+        surrogate_key="new",
+        s3_context=s3_context,
+        transfer_settings=settings,
+    )
+
+    copied = s3_client.objects["dest/data.tar"]
+    assert copied.body == large
+    assert copied.metadata == {"surrogate-key": "new"}
+    assert copied.content_type == "application/x-tar"
+    assert copied.acl == "public-read"
+    assert s3_client.count_calls("upload_part_copy") == 3
+    assert s3_client.count_calls("copy_object") == 1
+
+    # A failed part aborts the multipart upload
+    upload_part_copy = s3_client.upload_part_copy
+
+    def flaky_upload_part_copy(**kwargs: Any) -> Dict[str, Any]:
+        if kwargs["PartNumber"] == 2:
+            raise RuntimeError("part failed")
+        return upload_part_copy(**kwargs)
+
+    mocker.patch.object(
+        s3_client, "upload_part_copy", side_effect=flaky_upload_part_copy
+    )
+    with pytest.raises(S3BatchError) as exc_info:
+        copy_dir(
+            "bucket",
+            "src",
+            "dest",
+            s3_context=s3_context,
+            transfer_settings=settings,
+        )
+    assert [key for key, _ in exc_info.value.failures] == ["src/data.tar"]
+    assert s3_client.count_calls("abort_multipart_upload") == 1
+    assert s3_client.multipart_uploads == {}
+
+
+def test_copy_dir_incremental(
+    s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    """Incremental copies only copy changed objects and delete stale
+    objects last.
+    """
+    for name in ("a.html", "b.html", "c.html"):
+        s3_client.add(f"src/{name}", body=name.encode())
+    s3_client.add("dest/a.html", body=b"a.html")
+    s3_client.add("dest/b.html", body=b"old")
+    s3_client.add("dest/stale.html")
+
+    result = copy_dir(
+        "bucket", "src", "dest", s3_context=s3_context, incremental=True
+    )
+
+    assert (result.copied, result.skipped, result.deleted) == (2, 1, 1)
+    assert sorted(k for k in s3_client.objects if k.startswith("dest/")) == [
+        "dest/a.html",
+        "dest/b.html",
+        "dest/c.html",
+    ]
+    assert s3_client.objects["dest/b.html"].body == b"b.html"
+    copied_keys = [
+        c[1]["Key"] for c in s3_client.calls if c[0] == "copy_object"
+    ]
+    assert sorted(copied_keys) == ["dest/b.html", "dest/c.html"]
+    # Stale objects are deleted after copies
+    methods = [c[0] for c in s3_client.calls if c[0] != "put_object"]
+    assert methods[-1] == "delete_objects"
+
+    # With overrides, unchanged objects are only copied if their headers
+    # differ.
+    result = copy_dir(
+        "bucket",
+        "src",
+        "dest",
+        surrogate_key="key",
+        s3_context=s3_context,
+        incremental=True,
+    )
+    assert (result.copied, result.skipped, result.deleted) == (3, 0, 0)
+    result = copy_dir(
+        "bucket",
+        "src",
+        "dest",
+        surrogate_key="key",
+        s3_context=s3_context,
+        incremental=True,
+    )
+    assert (result.copied, result.skipped, result.deleted) == (0, 3, 0)
+
+
+def test_copy_dir_incremental_metadata(
+    s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    """Incremental copies copy unchanged content again if the source's
+    headers or metadata changed, and use the same keys as full copies.
+    """
+    s3_client.add("src/a.html", body=b"a", content_type="text/html")
+    s3_client.add("src/sub/b.css", body=b"b", content_type="text/css")
+    copy_dir("bucket", "src", "dest", s3_context=s3_context)
+    full_keys = sorted(k for k in s3_client.objects if k.startswith("dest/"))
+
+    result = copy_dir(
+        "bucket", "src", "dest", s3_context=s3_context, incremental=True
+    )
+    assert (result.copied, result.skipped) == (0, 2)
+
+    s3_client.objects["src/a.html"].cache_control = "max-age=60"
+    s3_client.objects["src/sub/b.css"].metadata["surrogate-key"] = "new"
+    result = copy_dir(
+        "bucket", "src", "dest", s3_context=s3_context, incremental=True
+    )
+    assert (result.copied, result.skipped, result.deleted) == (2, 0, 0)
+    assert s3_client.objects["dest/a.html"].cache_control == "max-age=60"
+    assert s3_client.objects["dest/sub/b.css"].metadata == {
+        "surrogate-key": "new"
+    }
+    assert s3_client.objects["dest/a.html"].content_type == "text/html"
+    assert (
+        sorted(k for k in s3_client.objects if k.startswith("dest/"))
+        == full_keys
+    )
+
+
+def test_copy_dir_skips_manifest(
+    s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    """The source's sync manifest isn't copied, and a destination's
+    manifest is deleted by incremental copies.
+    """
+    s3_client.add("src/index.html", body=b"index")
+    s3_client.add(get_manifest_key("src"), body=b"src manifest")
+    s3_client.add(get_manifest_key("dest"), body=b"old manifest")
+
+    result = copy_dir(
+        "bucket", "src", "dest", s3_context=s3_context, incremental=True
+    )
+    assert (result.copied, result.deleted) == (1, 1)
+    assert get_manifest_key("dest") not in s3_client.objects
+
+    copy_dir("bucket", "src", "dest2", s3_context=s3_context)
+    assert sorted(k for k in s3_client.objects if k.startswith("dest2")) == [
+        "dest2",
+        "dest2/index.html",
+    ]
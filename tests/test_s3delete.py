@@ -26,9 +26,12 @@ from typing import TYPE_CHECKING
 
 import boto3
 import pytest
+from pytest_mock import MockerFixture
 
-from ltdconveyor.s3 import delete_dir
+from ltdconveyor.s3 import S3BatchError, S3Context, S3Error, delete_dir
+from ltdconveyor.s3.delete import delete_keys
 from ltdconveyor.testutils import upload_test_files
+from tests.support.s3mock import MockS3Client
 
 if TYPE_CHECKING:
     from _pytest.fixtures import FixtureRequest
@@ -109,3 +112,81 @@ def test_delete_dir(request: FixtureRequest) -> None:
         aws_access_key_id=aws_access_key_id,
         aws_secret_access_key=aws_secret_access_key,
     )
+
+
+def test_delete_keys_batches() -> None:
+    client = MockS3Client("bucket")
+    keys = [f"root/{i}.html" for i in range(2500)]
+    for key in keys:
+        client.add(key)
+    client.add("other.html")
+
+    assert delete_keys(client, "bucket", iter(keys), max_workers=4) == 2500
+    assert list(client.objects) == ["other.html"]
+    assert client.count_calls("delete_objects") == 3
+    assert delete_keys(client, "bucket", []) == 0
+
+
+def test_delete_keys_retries_failed_keys(mocker: MockerFixture) -> None:
+    mocker.patch("ltdconveyor.s3.delete.time.sleep")
+    client = MockS3Client("bucket")
+    for i in range(5):
+        client.add(f"root/{i}.html")
+    client.delete_failures["root/1.html"] = 1
+    client.delete_failures["root/3.html"] = 5
+
+    with pytest.raises(S3BatchError) as excinfo:
+        delete_keys(client, "bucket", sorted(client.objects), max_attempts=3)
+
+    assert [name for name, _ in excinfo.value.failures] == ["root/3.html"]
+    assert "SlowDown" in str(excinfo.value)
+    assert list(client.objects) == ["root/3.html"]
+    # Only the failed keys are retried
+    calls = [c[1] for c in client.calls if c[0] == "delete_objects"]
+    assert [len(c["Delete"]["Objects"]) for c in calls] == [5, 2, 1]
+
+
+def test_delete_dir_pipelined(
+    s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    for i in range(2500):
+        s3_client.add(f"v1/{i}.html")
+    s3_client.add("v10/index.html")
+    s3_client.add("v1.html")
+
+    result = delete_dir("bucket", "v1", s3_context=s3_context, max_workers=4)
+
+    assert result.deleted == 2500
+    assert sorted(s3_client.objects) == ["v1.html", "v10/index.html"]
+    assert s3_client.count_calls("delete_objects") == 3
+
+
+def test_delete_dir_reports_failures(
+    mocker: MockerFixture, s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    mocker.patch("ltdconveyor.s3.delete.time.sleep")
+    for i in range(3):
+        s3_client.add(f"v1/{i}.html")
+    s3_client.delete_failures["v1/2.html"] = 5
+
+    with pytest.raises(S3BatchError) as excinfo:
+        delete_dir("bucket", "v1/", s3_context=s3_context)
+
+    assert isinstance(excinfo.value, S3Error)
+    assert [name for name, _ in excinfo.value.failures] == ["v1/2.html"]
+    assert list(s3_client.objects) == ["v1/2.html"]
+
+
+def test_delete_dir_redirect_object(
+    s3_client: MockS3Client, s3_context: S3Context
+) -> None:
+    """The directory's redirect object is deleted, but not siblings that
+    share its name as a prefix.
+    """
+    for key in ["v1", "v1/index.html", "v10", "v10/index.html"]:
+        s3_client.add(key)
+
+    result = delete_dir("bucket", "v1", s3_context=s3_context)
+
+    assert result.deleted == 2
+    assert sorted(s3_client.objects) == ["v10", "v10/index.html"]
@@ -0,0 +1,71 @@
+"""Tests for ``ltdconveyor.s3.formdata``."""
+
+from __future__ import annotations
+
+import cgi
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from ltdconveyor.s3.formdata import MultipartFileEncoder
+
+
+def test_multipart_file_encoder(tmp_path: Path) -> None:
+    path = tmp_path / 'say "hi".bin'
+    content = bytes(range(256)) * 1000
+    path.write_bytes(content)
+
+    encoder = MultipartFileEncoder(
+        {"key": "bucket/${filename}", "Content-Type": "text/plain"},
+        path,
+        chunk_size=1000,
+    )
+    chunks = list(encoder)
+    body = b"".join(chunks)
+
+    assert len(encoder) == len(body)
+    # The file is streamed in chunks, between the fields and the trailer
+    assert max(len(chunk) for chunk in chunks[1:-1]) == 1000
+    assert b"".join(chunks[1:-1]) == content
+    # Encoders can be iterated over again
+    assert b"".join(encoder) == body
+
+    mimetype, options = cgi.parse_header(encoder.content_type)
+    assert mimetype == "multipart/form-data"
+    parsed = cgi.parse_multipart(
+        BytesIO(body),
+        {
+            "boundary": options["boundary"].encode("ascii"),
+            "CONTENT-LENGTH": str(len(body)).encode("ascii"),
+        },
+    )
+    assert parsed["key"] == ["bucket/${filename}"]
+    assert parsed["Content-Type"] == ["text/plain"]
+    assert b'filename="say %22hi%22.bin"' in chunks[0]
+    assert body.endswith(f"\r\n--{encoder.boundary}--\r\n".encode())
+
+
+def test_multipart_file_encoder_empty_file(tmp_path: Path) -> None:
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+
+    encoder = MultipartFileEncoder({}, path)
+    assert len(encoder) == len(b"".join(encoder))
+
+
+@pytest.mark.asyncio
+async def test_multipart_file_encoder_aiter_body(tmp_path: Path) -> None:
+    path = tmp_path / "data.bin"
+    content = bytes(range(256)) * 100
+    path.write_bytes(content)
+
+    encoder = MultipartFileEncoder(
+        {"key": "value"}, path, chunk_size=1000, size=len(content)
+    )
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        chunks = [chunk async for chunk in encoder.aiter_body(executor)]
+
+    assert b"".join(chunks) == b"".join(encoder)
+    assert len(encoder) == len(b"".join(chunks))
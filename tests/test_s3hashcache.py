@@ -0,0 +1,110 @@
+"""Tests for ``ltdconveyor.s3.hashcache``."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from ltdconveyor.s3.hashcache import HashCache
+
+
+def _write(path: Path, content: bytes, age: float = 60.0) -> None:
+    """Write a file with a modification time ``age`` seconds ago."""
+    path.write_bytes(content)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_hash_cache(tmp_path: Path) -> None:
+    cache_path = tmp_path / "cache" / "hashes.json"
+    site = tmp_path / "site"
+    site.mkdir()
+    _write(site / "a.html", b"a")
+    _write(site / "b.html", b"b")
+
+    cache = HashCache(cache_path)
+    digest = cache.digest(site / "a.html", "a.html")
+    assert digest.md5 == hashlib.md5(b"a").hexdigest()
+    cache.digest(site / "b.html", "b.html")
+    assert (cache.hits, cache.misses) == (0, 2)
+    cache.save()
+    assert cache_path.exists()
+
+    # A new cache reads the saved digests
+    cache = HashCache(cache_path)
+    assert len(cache) == 2
+    assert cache.digest(site / "a.html", "a.html") == digest
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    # Changed files, and different multipart settings, are hashed again
+    _write(site / "a.html", b"changed")
+    digest = cache.digest(site / "a.html", "a.html")
+    assert digest.md5 == hashlib.md5(b"changed").hexdigest()
+    cache.digest(site / "b.html", "b.html", multipart_threshold=1)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # Pruning drops entries for files that weren't requested
+    cache = HashCache(cache_path)
+    cache.digest(site / "a.html", "a.html")
+    cache.save(prune=True)
+    assert len(HashCache(cache_path)) == 1
+
+
+def test_hash_cache_merges_concurrent_saves(tmp_path: Path) -> None:
+    cache_path = tmp_path / "hashes.json"
+    _write(tmp_path / "a.html", b"a")
+    _write(tmp_path / "b.html", b"b")
+
+    cache1 = HashCache(cache_path)
+    cache2 = HashCache(cache_path)
+    cache1.digest(tmp_path / "a.html", "a.html")
+    cache2.digest(tmp_path / "b.html", "b.html")
+    cache1.save()
+    cache2.save()
+
+    assert len(HashCache(cache_path)) == 2
+    assert not [p for p in os.listdir(tmp_path) if p.endswith(".tmp")]
+
+
+def test_hash_cache_prune_keeps_concurrent_entries(tmp_path: Path) -> None:
+    """Pruning only removes entries that the pruning cache loaded and didn't
+    see, not entries that another sync saved in the meantime.
+    """
+    cache_path = tmp_path / "hashes.json"
+    for name in ("a.html", "b.html", "c.html"):
+        _write(tmp_path / name, name.encode())
+    cache = HashCache(cache_path)
+    cache.digest(tmp_path / "a.html", "a.html")
+    cache.digest(tmp_path / "b.html", "b.html")
+    cache.save()
+
+    cache1 = HashCache(cache_path)
+    cache2 = HashCache(cache_path)
+    cache1.digest(tmp_path / "a.html", "a.html")
+    cache2.digest(tmp_path / "c.html", "c.html")
+    cache2.save()
+    cache1.save(prune=True)
+
+    cache = HashCache(cache_path)
+    cache.digest(tmp_path / "a.html", "a.html")
+    cache.digest(tmp_path / "b.html", "b.html")
+    cache.digest(tmp_path / "c.html", "c.html")
+    # b.html is gone for cache1, but c.html was saved by cache2
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_hash_cache_skips_recent_files(tmp_path: Path) -> None:
+    cache = HashCache(tmp_path / "hashes.json")
+    _write(tmp_path / "a.html", b"a", age=0)
+
+    cache.digest(tmp_path / "a.html", "a.html")
+    cache.digest(tmp_path / "a.html", "a.html")
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_hash_cache_ignores_corrupt_file(tmp_path: Path) -> None:
+    cache_path = tmp_path / "hashes.json"
+    cache_path.write_text("{not json")
+    assert len(HashCache(cache_path)) == 0
@@ -0,0 +1,163 @@
+"""Tests for ``ltdconveyor.s3.index`` and ``ltdconveyor.s3.listing``."""
+
+from __future__ import annotations
+
+from ltdconveyor.s3.index import BucketIndex
+from ltdconveyor.s3.listing import ObjectRecord, iter_objects
+from tests.support.s3mock import MockS3Client
+
+
+def make_index() -> BucketIndex:
+    keys = [
+        "root",
+        "root/index.html",
+        "root/a",
+        "root/a/index.html",
+        "root/a/aa",
+        "root/a/aa/index.html",
+        "root/b/index.html",
+        "root/b/style.css",
+        "root/empty/",
+        "rootother/index.html",
+    ]
+    records = [ObjectRecord(key=k, size=len(k), etag=k) for k in keys]
+    return BucketIndex.from_records("root/", records)
+
+
+def test_list_directories() -> None:
+    index = make_index()
+    assert len(index) == 8
+
+    assert sorted(index.list_dirnames("")) == ["a", "b", "empty"]
+    assert sorted(index.list_dirnames("/")) == ["a", "b", "empty"]
+    assert index.list_dirnames("a") == ["aa"]
+    assert index.list_dirnames("a/aa") == []
+    assert index.list_dirnames("missing") == []
+
+    # Directory redirect objects (root/a, root/a/aa) aren't files
+    assert index.list_filenames(".") == ["index.html"]
+    assert index.list_filenames("a/") == ["index.html"]
+    assert sorted(index.list_filenames("b")) == ["index.html", "style.css"]
+    assert index.list_filenames("empty") == []
+
+
+def test_get_and_remove() -> None:
+    index = make_index()
+
+    assert index.get("") == ObjectRecord("root", 4, "root")
+    assert index.get("a") == ObjectRecord("root/a", 6, "root/a")
+    assert index.get("b/style.css") == ObjectRecord(
+        "root/b/style.css", 16, "root/b/style.css"
+    )
+    assert index.get("b/missing.css") is None
+
+    assert index.remove("b/style.css") is not None
+    assert index.remove("b/style.css") is None
+    assert index.list_filenames("b") == ["index.html"]
+    assert len(index) == 7
+
+
+def test_remove_directory() -> None:
+    index = make_index()
+
+    removed = index.remove_directory("a")
+    assert sorted(r.key for r in removed) == [
+        "root/a",
+        "root/a/aa",
+        "root/a/aa/index.html",
+        "root/a/index.html",
+    ]
+    assert sorted(index.list_dirnames("")) == ["b", "empty"]
+    assert index.list_filenames("") == ["index.html"]
+    assert len(index) == 4
+
+    assert index.remove_directory("missing") == []
+
+    removed = index.remove_directory("")
+    assert len(removed) == 4
+    assert len(index) == 0
+    assert list(index) == []
+
+
+def test_walk() -> None:
+    index = make_index()
+    walked = {
+        dirname: (sorted(dirnames), sorted(filenames))
+        for dirname, dirnames, filenames in index.walk()
+    }
+    assert walked == {
+        "": (["a", "b", "empty"], ["index.html"]),
+        "a": (["aa"], ["index.html"]),
+        "a/aa": ([], ["index.html"]),
+        "b": ([], ["index.html", "style.css"]),
+        "empty": ([], []),
+    }
+    assert sorted(r.key for r in index.iter_records("b")) == [
+        "root/b/index.html",
+        "root/b/style.css",
+    ]
+
+
+def test_iter_objects_paginates() -> None:
+    client = MockS3Client("bucket", page_size=2)
+    for i in range(5):
+        client.add(f"prefix/{i}.html", body=b"x" * i)
+    client.add("other/0.html")
+
+    records = list(iter_objects(client, "bucket", prefix="prefix/"))
+    assert [r.key for r in records] == [f"prefix/{i}.html" for i in range(5)]
+    assert [r.size for r in records] == list(range(5))
+    assert client.count_calls("list_objects_v2") == 3
+
+
+def _add_tree(client: MockS3Client) -> list[str]:
+    keys = [
+        "root",
+        "root.html",
+        "root/a",
+        "root/a.html",
+        "root/a/index.html",
+        "root/a/aa/index.html",
+        "root/a/aa/style.css",
+        "root/a0/index.html",
+        "root/b/index.html",
+        "root/b/c/d/e/index.html",
+        "root/empty/",
+        "root/index.html",
+        "root-other/index.html",
+    ]
+    for key in keys:
+        client.add(key)
+    return sorted(keys)
+
+
+def test_iter_objects_fan_out_ordered() -> None:
+    client = MockS3Client("bucket", page_size=2)
+    keys = _add_tree(client)
+
+    records = list(iter_objects(client, "bucket", max_workers=4))
+    assert [r.key for r in records] == keys
+
+    records = list(iter_objects(client, "bucket", "root/", max_workers=4))
+    assert [r.key for r in records] == [
+        key for key in keys if key.startswith("root/")
+    ]
+    # Each directory is listed on its own
+    prefixes = {
+        call[1]["Prefix"]
+        for call in client.calls
+        if call[0] == "list_objects_v2"
+    }
+    assert "root/a/aa/" in prefixes
+    assert "root/b/c/d/" in prefixes
+
+
+def test_iter_objects_fan_out_unordered() -> None:
+    client = MockS3Client("bucket", page_size=3)
+    keys = _add_tree(client)
+
+    records = list(
+        iter_objects(client, "bucket", "root", max_workers=3, ordered=False)
+    )
+    assert sorted(r.key for r in records) == keys
+    assert len(records) == len(keys)
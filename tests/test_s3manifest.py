@@ -0,0 +1,52 @@
+"""Tests for ``ltdconveyor.s3.manifest``."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from ltdconveyor.s3.manifest import (
+    ManifestEntry,
+    compute_metadata_hash,
+    get_manifest_key,
+    read_manifest,
+    write_manifest,
+)
+from tests.support.s3mock import MockS3Client
+
+
+def test_manifest_round_trip() -> None:
+    client = MockS3Client("bucket")
+    entries = [
+        ManifestEntry("root/b.html", 2, "etag-b", "text/html", "hash"),
+        ManifestEntry("root/a.html", 1, "etag-a"),
+    ]
+    written = write_manifest(client, "bucket", "root/", entries)
+    assert [e.key for e in written.entries] == ["root/a.html", "root/b.html"]
+
+    manifest = read_manifest(client, "bucket", "root")
+    assert manifest == written
+    assert not manifest.is_stale("root/")
+    # Manifests copied from another directory, or too old, are stale
+    assert manifest.is_stale("other")
+    assert manifest.is_stale("root", max_age=timedelta(0))
+
+
+def test_read_missing_or_corrupt_manifest() -> None:
+    client = MockS3Client("bucket")
+    assert read_manifest(client, "bucket", "root") is None
+    client.add(get_manifest_key("root"), body=b"not gzip")
+    assert read_manifest(client, "bucket", "root") is None
+
+
+def test_metadata_hash() -> None:
+    base = compute_metadata_hash(
+        content_type="text/html", metadata={"a": "1", "b": "2"}
+    )
+    assert base == compute_metadata_hash(
+        content_type="text/html", metadata={"b": "2", "a": "1"}
+    )
+    assert base != compute_metadata_hash(
+        content_type="text/html",
+        metadata={"a": "1", "b": "2"},
+        cache_control="no-cache",
+    )
@@ -0,0 +1,50 @@
+"""Tests for ``ltdconveyor.s3.transfer``."""
+
+from __future__ import annotations
+
+import pytest
+
+from ltdconveyor.s3.transfer import TransferSettings
+
+MiB = 1024 * 1024
+GiB = 1024 * MiB
+
+
+def test_chunksize_by_file_size() -> None:
+    settings = TransferSettings()
+    assert settings.chunksize_for(10 * MiB) == 8 * MiB
+    assert settings.chunksize_for(500 * MiB) == 8 * MiB
+    assert settings.chunksize_for(8 * GiB) == 16 * MiB
+    assert settings.chunksize_for(100 * GiB) == 128 * MiB
+
+    # An explicit part size is only adjusted to stay within S3's limits
+    settings = TransferSettings(multipart_chunksize=16 * MiB)
+    assert settings.chunksize_for(8 * GiB) == 16 * MiB
+    assert settings.chunksize_for(200 * GiB) == 32 * MiB
+
+
+def test_transfer_config() -> None:
+    settings = TransferSettings(
+        multipart_threshold=64 * MiB, max_concurrency=8, max_memory=64 * MiB
+    )
+    config = settings.get_transfer_config(100 * GiB)
+    assert config.multipart_threshold == 64 * MiB
+    assert config.multipart_chunksize == 128 * MiB
+    # The memory cap limits the parts in flight
+    assert config.max_request_concurrency == 1
+    assert config.max_in_memory_upload_chunks == 1
+    assert config.use_threads is False
+
+    config = settings.get_transfer_config(100 * MiB)
+    assert config.multipart_chunksize == 8 * MiB
+    assert config.max_request_concurrency == 8
+    assert config.max_in_memory_upload_chunks == 8
+
+
+def test_invalid_settings() -> None:
+    with pytest.raises(ValueError):
+        TransferSettings(multipart_chunksize=MiB)
+    with pytest.raises(ValueError):
+        TransferSettings(multipart_threshold=MiB)
+    with pytest.raises(ValueError):
+        TransferSettings(max_concurrency=0)
@@ -19,11 +19,13 @@ Note that this test will create a random uuid4) directory at the root of
 
 from __future__ import annotations
 
+import gzip
 import logging
 import mimetypes
 import os
 import shutil
 import tempfile
+import time
 import uuid
 from typing import TYPE_CHECKING, Any, Dict, List, Sequence, cast
 
@@ -31,8 +33,19 @@ import boto3
 import pytest
 import requests
 from mypy_boto3_s3.type_defs import DeleteTypeDef
-
-from ltdconveyor.s3 import upload_dir
+from pytest_mock import MockerFixture
+
+from ltdconveyor.compression import CompressionSettings
+from ltdconveyor.s3 import (
+    ObjectManager,
+    S3BatchError,
+    SyncResult,
+    hashcache,
+    upload_dir,
+)
+from ltdconveyor.s3.manifest import get_manifest_key, read_manifest
+from ltdconveyor.s3.transfer import TransferSettings
+from tests.support.s3mock import MockS3Client, MockSession
 
 if TYPE_CHECKING:
     from _pytest.fixtures import FixtureRequest
@@ -290,3 +303,293 @@ def _clean_bucket(
     s3.meta.client.delete_objects(
         Bucket=bucket.name, Delete=cast(DeleteTypeDef, delete_keys)
     )
+
+
+def test_object_manager_lists_once() -> None:
+    """ObjectManager answers all directory queries from a single listing."""
+    client = MockS3Client("bucket", page_size=2)
+    for key in [
+        "root",
+        "root/index.html",
+        "root/a",
+        "root/a/index.html",
+        "root/a/aa/index.html",
+        "root/b/index.html",
+        "root-sibling/index.html",
+    ]:
+        client.add(key)
+    # A sequential listing, to count its pages
+    manager = ObjectManager(
+        cast(Any, MockSession(client)), "bucket", "root", max_workers=1
+    )
+
+    assert sorted(manager.list_dirnames_in_directory("")) == ["a", "b"]
+    assert manager.list_filenames_in_directory("") == ["index.html"]
+    assert manager.list_dirnames_in_directory("a") == ["aa"]
+    assert manager.list_filenames_in_directory("a") == ["index.html"]
+    assert manager.list_filenames_in_directory("a/aa") == ["index.html"]
+    assert manager.list_dirnames_in_directory("missing") == []
+
+    # One single-key listing for the root redirect object, then three
+    # pages for the five objects under "root/".
+    assert client.count_calls("list_objects_v2") == 4
+    assert all(
+        call[1]["Prefix"] in ("root", "root/")
+        for call in client.calls
+        if call[0] == "list_objects_v2"
+    )
+
+    manager.delete_directory("a")
+    assert "root/a" not in client.objects
+    assert "root/a/aa/index.html" not in client.objects
+    assert manager.list_dirnames_in_directory("") == ["b"]
+
+    manager.delete_file("b/index.html")
+    assert "root/b/index.html" not in client.objects
+    assert client.count_calls("list_objects_v2") == 4
+
+
+@pytest.mark.usefixtures("mock_s3_session")
+def test_upload_dir_incremental(
+    tmp_path: Any, s3_client: MockS3Client
+) -> None:
+    """An incremental sync only uploads changed files."""
+    _create_test_files(
+        str(tmp_path), ["index.html", "a/index.html", "a/b/index.html"]
+    )
+
+    result = upload_dir("bucket", "root", str(tmp_path), incremental=True)
+    assert (result.uploaded, result.skipped, result.deleted) == (6, 0, 0)
+    assert s3_client.count_calls("upload_file") == 3
+
+    # Change one file and remove a directory
+    _write_file(str(tmp_path), "index.html")
+    with open(tmp_path / "index.html", "a") as f:
+        f.write("changed")
+    shutil.rmtree(tmp_path / "a" / "b")
+
+    result = upload_dir("bucket", "root", str(tmp_path), incremental=True)
+    assert (result.uploaded, result.skipped, result.deleted) == (1, 3, 2)
+    assert s3_client.count_calls("upload_file") == 4
+    assert sorted(s3_client.objects) == [
+        "root",
+        "root/a",
+        "root/a/index.html",
+        "root/index.html",
+    ]
+
+
+@pytest.mark.usefixtures("mock_s3_session")
+def test_upload_dir_failures(
+    tmp_path: Any, mocker: MockerFixture, s3_client: MockS3Client
+) -> None:
+    """A failed upload fails the sync after other uploads complete."""
+    paths = [f"dir{i}/file{j}.txt" for i in range(4) for j in range(5)]
+    _create_test_files(str(tmp_path), paths)
+
+    upload_file = s3_client.upload_file
+
+    def flaky_upload_file(Filename: str, *args: Any, **kwargs: Any) -> None:
+        if Filename.endswith("file3.txt"):
+            raise RuntimeError("upload failed")
+        upload_file(Filename, *args, **kwargs)
+
+    mocker.patch.object(
+        s3_client, "upload_file", side_effect=flaky_upload_file
+    )
+
+    with pytest.raises(S3BatchError) as exc_info:
+        upload_dir("bucket", "root", str(tmp_path), max_workers=4)
+
+    assert [key for key, _ in exc_info.value.failures] == [
+        f"root/dir{i}/file3.txt" for i in range(4)
+    ]
+    # All other files and directory redirect objects were uploaded
+    assert len(s3_client.objects) == 16 + 5
+
+
+@pytest.mark.usefixtures("mock_s3_session")
+def test_upload_dir_deletes_stale_objects_last(
+    tmp_path: Any, s3_client: MockS3Client
+) -> None:
+    """Stale objects are deleted in one batch after all uploads."""
+    for key in [
+        "root",
+        "root/index.html",
+        "root/old.html",
+        "root/a",
+        "root/a/index.html",
+        "root/b",
+        "root/old/index.html",
+        "root/old/deep/index.html",
+    ]:
+        s3_client.add(key)
+    # "a" changes from a directory to a file, and "b" from a file (the
+    # directory redirect object) to a directory.
+    _create_test_files(str(tmp_path), ["index.html", "a", "b/index.html"])
+
+    result = upload_dir("bucket", "root", str(tmp_path))
+
+    assert result.deleted == 4
+    assert sorted(s3_client.objects) == [
+        "root",
+        "root/a",
+        "root/b",
+        "root/b/index.html",
+        "root/index.html",
+    ]
+    assert s3_client.count_calls("delete_objects") == 1
+    assert s3_client.calls[-1][0] == "delete_objects"
+
+
+@pytest.mark.usefixtures("mock_s3_session")
+def test_upload_dir_transfer_settings(
+    tmp_path: Any, s3_client: MockS3Client
+) -> None:
+    """Multipart transfer settings are passed to each file upload."""
+    _create_test_files(str(tmp_path), ["index.html"])
+    settings = TransferSettings(
+        multipart_threshold=16 * 1024 * 1024, max_concurrency=2
+    )
+
+    upload_dir("bucket", "root", str(tmp_path), transfer_settings=settings)
+
+    calls = [c[1] for c in s3_client.calls if c[0] == "upload_file"]
+    assert len(calls) == 1
+    assert calls[0]["Config"].multipart_threshold == 16 * 1024 * 1024
+    assert calls[0]["Config"].max_concurrency == 2
+
+
+@pytest.mark.usefixtures("mock_s3_session")
+def test_upload_dir_hash_cache(
+    tmp_path: Any, mocker: MockerFixture, s3_client: MockS3Client
+) -> None:
+    """Incremental syncs reuse cached digests of unchanged files."""
+    source_dir = tmp_path / "site"
+    paths = ["index.html", "a/index.html", "a/b/index.html"]
+    _create_test_files(str(source_dir), paths)
+    mtime = time.time() - 60
+    for path in paths:
+        os.utime(source_dir / path, (mtime, mtime))
+    cache_path = tmp_path / "hashes.json"
+    compute = mocker.spy(hashcache, "compute_file_digest")
+
+    def sync() -> SyncResult:
+        return upload_dir(
+            "bucket",
+            "root",
+            str(source_dir),
+            incremental=True,
+            hash_cache_path=cache_path,
+        )
+
+    # Files are only hashed once there are objects to compare with
+    sync()
+    assert compute.call_count == 0
+    assert sync().skipped == 6
+    assert compute.call_count == 3
+    assert sync().skipped == 6
+    assert compute.call_count == 3
+
+
+@pytest.mark.usefixtures("mock_s3_session")
+def test_upload_dir_manifest(
+    tmp_path: Any, mocker: MockerFixture, s3_client: MockS3Client
+) -> None:
+    """Syncs with a manifest read it instead of listing the bucket."""
+    _create_test_files(
+        str(tmp_path), ["index.html", "a/index.html", "a/b/index.html"]
+    )
+    manifest_key = get_manifest_key("root")
+
+    def sync(**kwargs: Any) -> SyncResult:
+        return upload_dir(
+            "bucket",
+            "root",
+            str(tmp_path),
+            incremental=True,
+            use_manifest=True,
+            **kwargs,
+        )
+
+    sync()
+    assert manifest_key in s3_client.objects
+    manifest = read_manifest(s3_client, "bucket", "root")
+    assert manifest is not None
+    assert [e.key for e in manifest.entries] == [
+        "root",
+        "root/a",
+        "root/a/b",
+        "root/a/b/index.html",
+        "root/a/index.html",
+        "root/index.html",
+    ]
+    assert manifest.entries[-1].content_type == "text/html"
+    list_calls = s3_client.count_calls("list_objects_v2")
+
+    # The next sync uses the manifest rather than a listing
+    shutil.rmtree(tmp_path / "a" / "b")
+    result = sync()
+    assert (result.uploaded, result.skipped, result.deleted) == (0, 4, 2)
+    assert s3_client.count_calls("list_objects_v2") == list_calls
+    manifest = read_manifest(s3_client, "bucket", "root")
+    assert manifest is not None
+    assert len(manifest.entries) == 4
+    assert "root/a/b" not in s3_client.objects
+
+    # Changed headers are detected from the manifest
+    result = sync(cache_control="max-age=60")
+    assert (result.uploaded, result.skipped, result.deleted) == (2, 2, 0)
+    assert s3_client.objects["root/index.html"].cache_control == "max-age=60"
+
+    # A stale manifest falls back to a listing
+    mocker.patch(
+        "ltdconveyor.s3.manifest.SyncManifest.is_stale", return_value=True
+    )
+    result = sync(cache_control="max-age=60")
+    assert (result.uploaded, result.skipped, result.deleted) == (0, 4, 0)
+    assert s3_client.count_calls("list_objects_v2") > list_calls
+
+    # The manifest has the same ACL as the synced objects
+    sync(acl="public-read")
+    assert s3_client.objects[manifest_key].acl == "public-read"
+
+    # Syncs without a manifest delete it, without counting it
+    result = upload_dir("bucket", "root", str(tmp_path))
+    assert (result.uploaded, result.skipped, result.deleted) == (4, 0, 0)
+    assert manifest_key not in s3_client.objects
+
+
+@pytest.mark.usefixtures("mock_s3_session")
+def test_upload_dir_compression(
+    tmp_path: Any, s3_client: MockS3Client
+) -> None:
+    """Text files are uploaded compressed, with a Content-Encoding."""
+    html = b"<p>Hello, world!</p>\n" * 200
+    (tmp_path / "index.html").write_bytes(html)
+    (tmp_path / "small.html").write_bytes(b"<p>Hi</p>")
+    (tmp_path / "image.png").write_bytes(html)
+    compression = CompressionSettings(max_workers=0)
+
+    def sync() -> SyncResult:
+        return upload_dir(
+            "bucket",
+            "root",
+            str(tmp_path),
+            incremental=True,
+            compression=compression,
+        )
+
+    sync()
+    index = s3_client.objects["root/index.html"]
+    assert index.content_encoding == "gzip"
+    assert index.content_type == "text/html"
+    assert gzip.decompress(index.body) == html
+    assert s3_client.objects["root/small.html"].content_encoding is None
+    assert s3_client.objects["root/image.png"].content_encoding is None
+    assert s3_client.objects["root/image.png"].body == html
+
+    # Compressed files are compared with the objects by their compressed
+    # content
+    result = sync()
+    assert (result.uploaded, result.skipped) == (0, 4)
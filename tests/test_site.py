@@ -0,0 +1,57 @@
+"""Tests for ``ltdconveyor.site``."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from ltdconveyor.site import SiteFile, scan_site
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_scan_site(tmp_path: Path, max_workers: int) -> None:
+    for rel_path, content in [
+        ("index.html", b"<html></html>"),
+        ("a/index.html", b"a"),
+        ("a/aa/data.unknownext", b"xyz"),
+        ("b/style.css", b"body {}"),
+    ]:
+        path = tmp_path.joinpath(*rel_path.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    (tmp_path / "empty").mkdir()
+
+    site = scan_site(tmp_path, max_workers=max_workers)
+
+    assert site.dirnames == ("/", "a/", "a/aa/", "b/", "empty/")
+    assert site.files == (
+        SiteFile(
+            "a/aa/data.unknownext", "a/aa/", 3, "application/octet-stream"
+        ),
+        SiteFile("a/index.html", "a/", 1, "text/html"),
+        SiteFile("b/style.css", "b/", 7, "text/css"),
+        SiteFile("index.html", "/", 13, "text/html"),
+    )
+    assert site.total_size == 24
+    assert site.local_path(site.files[0]) == tmp_path / "a/aa/data.unknownext"
+    assert site.describe() == "4 files (0.0 MB) in 5 directories"
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_scan_site_symlinks(tmp_path: Path, max_workers: int) -> None:
+    (tmp_path / "v1").mkdir()
+    (tmp_path / "v1" / "index.html").write_bytes(b"v1")
+    # A link to a sibling directory is followed, but links back to the
+    # directory containing them would recurse forever.
+    (tmp_path / "latest").symlink_to("v1", target_is_directory=True)
+    (tmp_path / "v1" / "parent").symlink_to("..", target_is_directory=True)
+    (tmp_path / "v1" / "self").symlink_to(".", target_is_directory=True)
+
+    site = scan_site(tmp_path, max_workers=max_workers)
+
+    assert site.dirnames == ("/", "latest/", "v1/")
+    assert [f.path for f in site.files] == [
+        "latest/index.html",
+        "v1/index.html",
+    ]